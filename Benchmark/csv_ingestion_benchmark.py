@@ -0,0 +1,73 @@
+"""
+Benchmark della lettura del CSV sorgente: lettura originale (tipi inferiti + conversione
+float -> str -> float delle colonne con la virgola decimale) contro la lettura tipizzata
+di read_typed_csv, con e senza esclusione delle colonne inutili in fase di parsing.
+Il CSV viene prodotto dal generatore sintetico (Benchmark.synthetic_wisconsin), con le stesse
+imperfezioni di version_1.csv.
+
+Esecuzione (dalla cartella principale del progetto):
+    python -m Benchmark.csv_ingestion_benchmark --rows 10000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from Benchmark.synthetic_wisconsin import write_synthetic_csv
+from Preprocessing.csv_reader import fastest_engine, read_typed_csv
+from Preprocessing.data_cleaner import COLS_TO_FIX, COLUMNS_TO_DROP, _fix_decimal_columns
+
+
+def legacy_read(path):
+    """Lettura come nella versione originale di clean_data."""
+    df = pd.read_csv(path)
+    for col in COLS_TO_FIX:
+        df[col] = df[col].astype(str).str.replace(',', '.')
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def typed_read(path, prune_columns):
+    df = read_typed_csv(path, string_columns=COLS_TO_FIX, skip_columns=COLUMNS_TO_DROP if prune_columns else ())
+    return _fix_decimal_columns(df, warn=False)
+
+
+def _time(label, func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = func()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<32} {best:8.2f} s   ({df.shape[1]} colonne, {df.memory_usage(deep=True).sum() / 1e6:,.0f} MB)")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark della lettura tipizzata del CSV sorgente.")
+    parser.add_argument('--rows', type=int, default=10_000_000, help="Numero di righe del CSV sintetico")
+    parser.add_argument('--repeat', type=int, default=1, help="Ripetizioni per misura (si tiene la migliore)")
+    parser.add_argument('--keep', action='store_true', help="Non cancellare il CSV sintetico alla fine")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='csv_bench_')
+    path = os.path.join(tmp_dir, 'synthetic.csv')
+    print(f"Generazione di {args.rows:,} righe in '{path}'...")
+    write_synthetic_csv(path, args.rows)
+    print(f"File: {os.path.getsize(path) / 1e6:,.0f} MB - parser: {fastest_engine()}\n")
+
+    baseline = _time('originale (tipi inferiti)', lambda: legacy_read(path), args.repeat)
+    typed = _time('tipizzata', lambda: typed_read(path, prune_columns=False), args.repeat)
+    pruned = _time('tipizzata + usecols', lambda: typed_read(path, prune_columns=True), args.repeat)
+    print(f"\nSpeedup: tipizzata x{baseline / typed:.2f}, tipizzata + usecols x{baseline / pruned:.2f}")
+
+    if args.keep:
+        print(f"CSV sintetico conservato in '{path}'")
+    else:
+        os.remove(path)
+        os.rmdir(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark della ricerca approssimata con LSH: per diverse combinazioni di tabelle e bit
+confronta con la ricerca esatta il tempo di ricerca, il recall@k (frazione dei k vicini esatti
+ritrovati) e l'accuratezza delle predizioni.
+
+Il dataset di partenza (version_1.csv pulito) viene ricampionato con rumore fino al numero
+di righe richiesto e, opzionalmente, esteso con colonne correlate, come nel benchmark della PCA.
+Nei validatori la stessa ricerca si attiva con knn_options={'lsh_tables': ..., 'lsh_bits': ...}.
+
+Esecuzione (dalla cartella principale del progetto):
+    python -m Benchmark.lsh_knn_benchmark --rows 500000 --configs 8x24 16x28 32x28
+"""
+import argparse
+import time
+
+import numpy as np
+
+from Benchmark.pca_knn_benchmark import extend_dataset, load_wisconsin
+from ModelDevelopment.knn_scratch import KNN
+from ModelDevelopment.lsh_index import recall_at_k
+
+
+def parse_config(value):
+    """Converte 'TABELLExBIT' (es. '8x24') nella coppia (tabelle, bit)."""
+    try:
+        n_tables, n_bits = (int(part) for part in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Configurazione non valida: {value} (atteso TABELLExBIT, es. 8x24)")
+    return n_tables, n_bits
+
+
+def timed_neighbors(model, x_test):
+    """Restituisce (secondi, vicini) della ricerca dei vicini di x_test."""
+    start = time.perf_counter()
+    neighbors = model.kneighbors(x_test)
+    return time.perf_counter() - start, neighbors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark della ricerca approssimata LSH per il KNN.")
+    parser.add_argument('--rows', type=int, default=200_000, help="Righe di training del dataset ricampionato")
+    parser.add_argument('--queries', type=int, default=2_000, help="Campioni di test")
+    parser.add_argument('--extra-columns', type=int, default=20, help="Colonne correlate aggiunte")
+    parser.add_argument('--k', type=int, default=5, help="Numero di vicini")
+    parser.add_argument('--configs', type=parse_config, nargs='+', default=[(8, 20), (8, 24), (16, 28), (32, 28)],
+                        help="Configurazioni TABELLExBIT da confrontare")
+    args = parser.parse_args()
+
+    dataset = extend_dataset(load_wisconsin(), args.rows + args.queries, args.extra_columns)
+    train = dataset.subset(np.arange(args.rows))
+    test = dataset.subset(np.arange(args.rows, len(dataset)))
+    print(f"Training: {len(train):,} righe, {train.n_features} feature; test: {len(test):,} campioni; k={args.k}\n")
+
+    exact_model = KNN(train, None, args.k)
+    exact_time, exact_neighbors = timed_neighbors(exact_model, test.X)
+    exact_accuracy = np.mean(exact_model._vote(exact_model._y[exact_neighbors]) == test.y)
+    print(f"  {'configurazione':<15} {'indice':>8} {'ricerca':>9} {'speedup':>8} {'candidati':>10} "
+          f"{'recall@k':>9} {'accuratezza':>12} {'delta':>8}")
+    print(f"  {'esatta':<15} {0:>7.2f}s {exact_time:>8.2f}s {1:>7.2f}x {len(train):>10,} "
+          f"{1:>9.2%} {exact_accuracy:>12.2%} {0:>+8.2%}")
+    for n_tables, n_bits in args.configs:
+        start = time.perf_counter()
+        model = KNN(train, None, args.k, lsh_tables=n_tables, lsh_bits=n_bits)
+        build_time = time.perf_counter() - start
+        search_time, neighbors = timed_neighbors(model, test.X)
+        accuracy = np.mean(model._vote(model._y[neighbors]) == test.y)
+        candidates = model.lsh.stats['candidates'] / max(1, model.lsh.stats['queries'])
+        print(f"  {f'{n_tables} x {n_bits} bit':<15} {build_time:>7.2f}s {search_time:>8.2f}s "
+              f"{exact_time / search_time:>7.2f}x {candidates:>10,.0f} {recall_at_k(neighbors, exact_neighbors):>9.2%} "
+              f"{accuracy:>12.2%} {accuracy - exact_accuracy:>+8.2%}")
+    print("\n(candidati = campioni di training riordinati in media per campione di test)")
+
+
+if __name__ == '__main__':
+    main()
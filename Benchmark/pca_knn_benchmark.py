@@ -0,0 +1,96 @@
+"""
+Benchmark della riduzione PCA prima della ricerca KNN: confronta tempo e accuratezza
+della K-Fold Cross Validation senza PCA e con diverse quote di varianza mantenute.
+
+Il dataset di partenza (version_1.csv pulito) viene esteso con colonne correlate
+(combinazioni lineari delle feature originali più rumore), come nei dataset estesi,
+e ricampionato fino al numero di righe richiesto. La PCA viene calcolata per ogni fold
+sul solo training set (opzione 'pca' del KNN).
+
+Esecuzione (dalla cartella principale del progetto):
+    python -m Benchmark.pca_knn_benchmark --rows 20000 --extra-columns 100
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from ModelDevelopment.knn_scratch import KNN
+from ModelEvaluation.cross_validation import evaluate_kfold
+from Preprocessing.data_cleaner import clean_data
+from Preprocessing.dataset import Dataset
+from Preprocessing.feature_target_variables import load_data
+from Preprocessing.pca import PCA
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_wisconsin(source_csv=os.path.join(PROJECT_ROOT, 'version_1.csv')):
+    """Pulisce e carica il dataset di esempio in una cartella temporanea."""
+    tmp_dir = tempfile.mkdtemp(prefix='pca_bench_')
+    try:
+        source_copy = shutil.copy(source_csv, tmp_dir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return load_data(clean_data(source_copy, use_cache=False), use_cache=False)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def extend_dataset(dataset, n_rows, extra_columns, noise=0.5, jitter=1.0, seed=0):
+    """
+    Ricampiona il dataset fino a n_rows righe (con rumore gaussiano di ampiezza jitter sulle
+    feature originali, per non avere copie esatte) e aggiunge extra_columns colonne correlate
+    alle feature originali (combinazioni lineari casuali più rumore gaussiano).
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(dataset), n_rows)
+    X = dataset.X[rows].astype(np.float64) + rng.normal(0, jitter, (n_rows, dataset.n_features))
+    mixing = rng.normal(0, 1, (dataset.n_features, extra_columns)) / np.sqrt(dataset.n_features)
+    extra = X @ mixing + rng.normal(0, noise, (n_rows, extra_columns))
+    feature_names = dataset.feature_names + [f'extra_{i}' for i in range(extra_columns)]
+    return Dataset(np.hstack([X, extra]), dataset.y[rows], feature_names, dataset.target_name)
+
+
+def run_kfold(dataset, k, k_folds, knn_options, seed=50):
+    """K-Fold con gli stessi fold per ogni configurazione; restituisce (secondi, accuratezza media)."""
+    random.seed(seed)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = evaluate_kfold(dataset, None, KNN, k, k_folds, knn_options=knn_options)
+    elapsed = time.perf_counter() - start
+    accuracy = np.mean([metrics['accuracy'] for metrics in results['all_fold_metrics']])
+    return elapsed, accuracy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark della riduzione PCA prima del KNN.")
+    parser.add_argument('--rows', type=int, default=20_000, help="Righe del dataset esteso")
+    parser.add_argument('--extra-columns', type=int, default=100, help="Colonne correlate aggiunte")
+    parser.add_argument('--k', type=int, default=5, help="Numero di vicini")
+    parser.add_argument('--folds', type=int, default=5, help="Numero di fold")
+    parser.add_argument('--variance', type=float, nargs='+', default=[0.99, 0.95, 0.9],
+                        help="Quote di varianza da confrontare")
+    args = parser.parse_args()
+
+    dataset = extend_dataset(load_wisconsin(), args.rows, args.extra_columns)
+    print(f"Dataset: {len(dataset):,} righe, {dataset.n_features} feature, k={args.k}, {args.folds} fold\n")
+
+    base_time, base_accuracy = run_kfold(dataset, args.k, args.folds, None)
+    print(f"  {'configurazione':<16} {'componenti':>10} {'tempo':>9} {'speedup':>8} {'accuratezza':>12} {'delta':>8}")
+    print(f"  {'senza PCA':<16} {dataset.n_features:>10} {base_time:>8.2f}s {1:>7.2f}x {base_accuracy:>12.2%} {0:>+8.2%}")
+    for variance in args.variance:
+        n_components = PCA(variance_ratio=variance).fit(dataset.X).n_components_
+        elapsed, accuracy = run_kfold(dataset, args.k, args.folds, {'pca': variance})
+        print(f"  {f'PCA {variance:.0%}':<16} {n_components:>10} {elapsed:>8.2f}s {base_time / elapsed:>7.2f}x "
+              f"{accuracy:>12.2%} {accuracy - base_accuracy:>+8.2%}")
+    print("\n(componenti calcolate sull'intero dataset; nei fold la PCA usa il solo training set)")
+
+
+if __name__ == '__main__':
+    main()
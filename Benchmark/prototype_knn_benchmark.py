@@ -0,0 +1,65 @@
+"""
+Benchmark della selezione dei prototipi: confronta per ogni metodo la frazione di campioni
+di training tenuti (compressione), il tempo di predizione e l'accuratezza della K-Fold
+Cross Validation rispetto al KNN sull'intero training set.
+
+Il dataset di partenza (version_1.csv pulito) viene ricampionato con rumore fino al numero
+di righe richiesto, come nel benchmark della PCA. Nei fold la selezione usa il solo
+training set (opzione 'prototypes' del KNN).
+
+Esecuzione (dalla cartella principale del progetto):
+    python -m Benchmark.prototype_knn_benchmark --rows 20000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from Benchmark.pca_knn_benchmark import extend_dataset, load_wisconsin, run_kfold
+from ModelDevelopment.knn_scratch import KNN
+from ModelDevelopment.prototype_selection import PROTOTYPE_METHODS
+
+
+def prediction_time(model, x_test):
+    """Secondi impiegati dal modello per predire x_test."""
+    start = time.perf_counter()
+    model.test(x_test)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark della selezione dei prototipi per il KNN.")
+    parser.add_argument('--rows', type=int, default=20_000, help="Righe del dataset ricampionato")
+    parser.add_argument('--k', type=int, default=5, help="Numero di vicini")
+    parser.add_argument('--folds', type=int, default=5, help="Numero di fold")
+    parser.add_argument('--methods', nargs='+', choices=PROTOTYPE_METHODS, default=list(PROTOTYPE_METHODS),
+                        help="Metodi di selezione da confrontare")
+    args = parser.parse_args()
+
+    dataset = extend_dataset(load_wisconsin(), args.rows, extra_columns=0)
+    # Divisione 80/20 per misurare compressione e tempo di predizione di un singolo modello
+    split = int(len(dataset) * 0.8)
+    train, test = dataset.subset(np.arange(split)), dataset.subset(np.arange(split, len(dataset)))
+    print(f"Dataset: {len(dataset):,} righe, {dataset.n_features} feature, k={args.k}, {args.folds} fold\n")
+
+    full_model = KNN(train, None, args.k)
+    base_predict = prediction_time(full_model, test.X)
+    _, base_accuracy = run_kfold(dataset, args.k, args.folds, None)
+    print(f"  {'metodo':<10} {'prototipi':>10} {'compressione':>13} {'selezione':>10} "
+          f"{'predizione':>11} {'speedup':>8} {'accuratezza':>12} {'delta':>8}")
+    print(f"  {'nessuno':<10} {len(train):>10} {1:>13.2%} {0:>9.2f}s {base_predict:>10.3f}s {1:>7.2f}x "
+          f"{base_accuracy:>12.2%} {0:>+8.2%}")
+    for method in args.methods:
+        start = time.perf_counter()
+        model = KNN(train, None, args.k, prototypes=method)
+        selection = time.perf_counter() - start
+        predict = prediction_time(model, test.X)
+        _, accuracy = run_kfold(dataset, args.k, args.folds, {'prototypes': method})
+        print(f"  {method:<10} {len(model.prototype_indices):>10} {model.compression_ratio:>13.2%} "
+              f"{selection:>9.2f}s {predict:>10.3f}s {base_predict / predict:>7.2f}x "
+              f"{accuracy:>12.2%} {accuracy - base_accuracy:>+8.2%}")
+    print("\n(compressione = frazione del training set tenuta come prototipi; accuratezza media dei fold)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,322 @@
+"""
+Suite di benchmark riproducibile della pipeline: KNN (addestramento, test, test_proba),
+ricerca del k ottimale, suddivisioni (k_fold_split, binary_stratified_shuffle_split),
+calculate_metrics e handler dei risultati, su una griglia di righe e numero di feature.
+
+Per ogni caso vengono registrati il tempo migliore su più ripetizioni, il throughput
+(righe o campioni al secondo) e il picco di memoria allocata (tracemalloc, misurato in
+un'esecuzione separata per non rallentare quelle cronometrate). I risultati vengono salvati
+in JSON e confrontati con un baseline salvato in precedenza: un caso è una regressione se
+è più lento (o usa più memoria) del baseline oltre la soglia. Con regressioni il codice di
+uscita è 1, così la suite si può usare come controllo in uno script.
+
+Il dataset di partenza (version_1.csv pulito) viene ricampionato con rumore fino al numero
+di righe richiesto ed esteso (o ridotto) al numero di feature richiesto, come negli altri
+benchmark; semi fissi rendono dati e suddivisioni uguali a ogni esecuzione. I tempi dipendono
+dalla macchina: il baseline va registrato e confrontato sulla stessa macchina.
+
+Esecuzione (dalla cartella principale del progetto):
+    python -m Benchmark.run_benchmarks --update-baseline          # registra il baseline
+    python -m Benchmark.run_benchmarks                            # confronta con il baseline
+    python -m Benchmark.run_benchmarks --rows 1000 10000 --features 9 --threshold 0.3
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from Benchmark.pca_knn_benchmark import PROJECT_ROOT, extend_dataset, load_wisconsin
+from ModelDevelopment.knn_scratch import KNN
+from ModelEvaluation.cross_validation import find_optimal_k, k_fold_split
+from ModelEvaluation.metrics import calculate_metrics
+from ModelEvaluation.results_handler import HoldoutResultsHandler, KFoldResultsHandler
+from ModelEvaluation.stratified_shuffle_split_validation import binary_stratified_shuffle_split
+from Monitoring.memory import MemoryTracker
+
+BENCHMARK_FORMAT_VERSION = 1
+BASELINE_PATH = os.path.join(PROJECT_ROOT, 'output', 'benchmarks', 'baseline.json')
+
+# Differenze di tempo sotto questa soglia (in secondi) non sono considerate regressioni:
+# i casi più piccoli durano pochi millisecondi e oscillano più della soglia relativa
+MIN_SECONDS_DELTA = 0.005
+# Come sopra, per il picco di memoria (in KB)
+MIN_PEAK_KB_DELTA = 256
+
+
+class BenchmarkCase:
+    """
+    Un caso della griglia: function() esegue il lavoro misurato su dati già preparati,
+    items è il numero di righe/campioni elaborati per esecuzione (per il throughput).
+    """
+    def __init__(self, name, function, items, unit, rows, features=None):
+        self.name = name
+        self.function = function
+        self.items = items
+        self.unit = unit
+        self.rows = rows
+        self.features = features
+
+    @property
+    def case_id(self):
+        size = f"rows={self.rows}" if self.features is None else f"rows={self.rows},features={self.features}"
+        return f"{self.name}[{size}]"
+
+
+def resize_dataset(base, n_rows, n_features, seed=0):
+    """Dataset di n_rows righe e n_features feature ricavato da base (vedi extend_dataset)."""
+    extra_columns = max(0, n_features - base.n_features)
+    dataset = extend_dataset(base, n_rows, extra_columns, seed=seed)
+    if n_features < dataset.n_features:
+        dataset = type(dataset)(dataset.X[:, :n_features], dataset.y, dataset.feature_names[:n_features],
+                                dataset.target_name)
+    return dataset
+
+
+def build_cases(base, rows, features, args):
+    """Casi della griglia per rows righe e features feature; i casi che non dipendono dalle feature
+    (suddivisione stratificata, metriche, handler) vengono creati solo per il primo valore di features."""
+    dataset = resize_dataset(base, rows + args.queries, features, seed=args.seed)
+    train = dataset.subset(np.arange(rows))
+    queries = dataset.X[rows:]
+    model = KNN(train, None, args.k)
+
+    def knn_fit():
+        KNN(train, None, args.k)
+
+    def optimal_k_search():
+        random.seed(args.seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            find_optimal_k(train, None, k_range=range(1, args.max_k + 1), k_folds=args.folds)
+
+    def kfold_split():
+        random.seed(args.seed)
+        k_fold_split(train, None, args.folds)
+
+    cases = [
+        BenchmarkCase('knn.fit', knn_fit, rows, 'righe/s', rows, features),
+        BenchmarkCase('knn.test', lambda: model.test(queries), args.queries, 'campioni/s', rows, features),
+        BenchmarkCase('knn.test_proba', lambda: model.test_proba(queries), args.queries, 'campioni/s', rows, features),
+        BenchmarkCase('data.k_fold_split', kfold_split, rows, 'righe/s', rows, features),
+    ]
+    if rows <= args.k_search_max_rows:
+        cases.append(BenchmarkCase('knn.find_optimal_k', optimal_k_search, rows, 'righe/s', rows, features))
+    if features != args.features[0]:
+        return cases
+
+    rng = np.random.default_rng(args.seed)
+    y_true = train.y
+    y_pred = np.where(rng.random(rows) < 0.05, 1 - y_true, y_true)
+    y_pred_proba = np.clip(y_pred + rng.normal(0, 0.3, rows), 0, 1)
+    fold_metrics = [calculate_metrics(y_true, y_pred, y_pred_proba)] * args.folds
+
+    def stratified_split():
+        list(binary_stratified_shuffle_split(y_true, args.experiments, random_seed=args.seed))
+
+    def holdout_handler():
+        with tempfile.TemporaryDirectory() as output_dir, contextlib.redirect_stdout(io.StringIO()):
+            HoldoutResultsHandler(fold_metrics[0], y_true, y_pred, y_pred_proba, 'benchmark', output_dir,
+                                  plots=args.plots).save_results()
+
+    def kfold_handler():
+        raw_data = [{'y_true': y_true, 'y_pred': y_pred, 'y_pred_proba': y_pred_proba}] * args.folds
+        with tempfile.TemporaryDirectory() as output_dir, contextlib.redirect_stdout(io.StringIO()):
+            KFoldResultsHandler(fold_metrics, 'benchmark', output_dir, all_fold_raw_data=raw_data,
+                                plots=args.plots).save_results()
+
+    cases += [
+        BenchmarkCase('data.stratified_shuffle_split', stratified_split, rows * args.experiments, 'righe/s', rows),
+        BenchmarkCase('metrics.calculate_metrics', lambda: calculate_metrics(y_true, y_pred, y_pred_proba),
+                      rows, 'righe/s', rows),
+        BenchmarkCase('results.holdout_handler', holdout_handler, rows, 'righe/s', rows),
+        BenchmarkCase('results.kfold_handler', kfold_handler, rows * args.folds, 'righe/s', rows),
+    ]
+    return cases
+
+
+def measure(case, repeat, memory=True):
+    """
+    Tempo migliore su repeat esecuzioni, throughput e (con memory) picco di memoria allocata
+    durante un'ulteriore esecuzione sotto tracemalloc.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case.function()
+        best = min(best, time.perf_counter() - start)
+    result = {
+        'name': case.name,
+        'rows': case.rows,
+        'features': case.features,
+        'seconds': best,
+        'throughput': case.items / best if best > 0 else None,
+        'unit': case.unit,
+        'peak_kb': None
+    }
+    if memory:
+        tracker = MemoryTracker(frames=1)
+        tracker.start()
+        try:
+            with tracker.stage(case.name):
+                case.function()
+        finally:
+            tracker.stop()
+        result['peak_kb'] = round(tracker.peaks[case.name][-1] / 1024, 1)
+    return result
+
+
+def environment():
+    """Descrizione della macchina e delle versioni, salvata con i risultati."""
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def run_suite(args, base=None):
+    """Esegue tutti i casi della griglia e restituisce il documento dei risultati."""
+    base = base if base is not None else load_wisconsin()
+    results = {}
+    for rows in args.rows:
+        for features in args.features:
+            for case in build_cases(base, rows, features, args):
+                result = measure(case, args.repeat, memory=not args.no_memory)
+                results[case.case_id] = result
+                peak = f"{result['peak_kb']:>12,.0f} KB" if result['peak_kb'] is not None else ''
+                print(f"  {case.case_id:<58} {result['seconds']:>9.4f}s {result['throughput']:>14,.0f} "
+                      f"{case.unit:<11}{peak}")
+    return {
+        'version': BENCHMARK_FORMAT_VERSION,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'environment': environment(),
+        'config': {'k': args.k, 'queries': args.queries, 'folds': args.folds, 'max_k': args.max_k,
+                   'experiments': args.experiments, 'repeat': args.repeat, 'seed': args.seed, 'plots': args.plots},
+        'results': results
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    Confronta i risultati con il baseline caso per caso.
+    Un caso è una regressione se il tempo (o il picco di memoria) supera quello del baseline di
+    oltre threshold (es. 0.25 = +25%) e di oltre MIN_SECONDS_DELTA (MIN_PEAK_KB_DELTA).
+
+    Returns:
+        list: un dizionario per caso con case, seconds, baseline_seconds, ratio, peak_kb,
+              baseline_peak_kb e status ('ok', 'migliorato', 'regressione', 'nuovo').
+    """
+    rows = []
+    for case_id, result in current['results'].items():
+        reference = baseline['results'].get(case_id)
+        row = {'case': case_id, 'seconds': result['seconds'], 'peak_kb': result['peak_kb'],
+               'baseline_seconds': None, 'baseline_peak_kb': None, 'ratio': None, 'status': 'nuovo'}
+        if reference is not None:
+            row['baseline_seconds'] = reference['seconds']
+            row['baseline_peak_kb'] = reference['peak_kb']
+            row['ratio'] = result['seconds'] / reference['seconds'] if reference['seconds'] > 0 else None
+            slower = result['seconds'] > reference['seconds'] * (1 + threshold) and \
+                result['seconds'] - reference['seconds'] > MIN_SECONDS_DELTA
+            faster = result['seconds'] * (1 + threshold) < reference['seconds'] and \
+                reference['seconds'] - result['seconds'] > MIN_SECONDS_DELTA
+            more_memory = result['peak_kb'] is not None and reference['peak_kb'] is not None and \
+                result['peak_kb'] > reference['peak_kb'] * (1 + threshold) and \
+                result['peak_kb'] - reference['peak_kb'] > MIN_PEAK_KB_DELTA
+            row['status'] = 'regressione' if slower or more_memory else 'migliorato' if faster else 'ok'
+        rows.append(row)
+    return rows
+
+
+def format_comparison(rows):
+    """Tabella testuale del confronto con il baseline."""
+    lines = [f"  {'caso':<58} {'baseline':>10} {'attuale':>10} {'rapporto':>9} {'memoria':>9}  stato"]
+    for row in rows:
+        baseline = f"{row['baseline_seconds']:.4f}s" if row['baseline_seconds'] is not None else '-'
+        ratio = f"x{row['ratio']:.2f}" if row['ratio'] is not None else '-'
+        memory = f"x{row['peak_kb'] / row['baseline_peak_kb']:.2f}" \
+            if row['peak_kb'] is not None and row['baseline_peak_kb'] else '-'
+        lines.append(f"  {row['case']:<58} {baseline:>10} {row['seconds']:>9.4f}s {ratio:>9} {memory:>9}  "
+                     f"{row['status'].upper() if row['status'] == 'regressione' else row['status']}")
+    return "\n".join(lines)
+
+
+def load_results(path):
+    """Legge un file di risultati; None se manca o ha un formato diverso."""
+    try:
+        with open(path) as f:
+            results = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return results if results.get('version') == BENCHMARK_FORMAT_VERSION else None
+
+
+def save_results(results, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Suite di benchmark di KNN, suddivisioni, metriche e handler.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000],
+                        help="Righe di training della griglia")
+    parser.add_argument('--features', type=int, nargs='+', default=[9, 30], help="Numero di feature della griglia")
+    parser.add_argument('--queries', type=int, default=1_000, help="Campioni di test per KNN.test/test_proba")
+    parser.add_argument('--k', type=int, default=5, help="Numero di vicini")
+    parser.add_argument('--max-k', type=int, default=10, help="La ricerca del k ottimale prova k da 1 a MAX_K")
+    parser.add_argument('--k-search-max-rows', type=int, default=10_000,
+                        help="Righe massime per cui eseguire la ricerca del k ottimale")
+    parser.add_argument('--folds', type=int, default=5, help="Numero di fold")
+    parser.add_argument('--experiments', type=int, default=10, help="Esperimenti dello Stratified Shuffle Split")
+    parser.add_argument('--repeat', type=int, default=3, help="Ripetizioni per caso (si tiene la migliore)")
+    parser.add_argument('--seed', type=int, default=0, help="Seme di dati e suddivisioni")
+    parser.add_argument('--plots', action='store_true', help="Includi i grafici negli handler dei risultati")
+    parser.add_argument('--no-memory', action='store_true', help="Non misurare il picco di memoria")
+    parser.add_argument('--output', help="File JSON dei risultati (default: output/benchmarks/benchmark_<data>.json)")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="File JSON del baseline da confrontare")
+    parser.add_argument('--update-baseline', action='store_true', help="Salva i risultati come nuovo baseline")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Rallentamento relativo oltre il quale un caso è una regressione (default: 0.25)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    print(f"Griglia: righe {args.rows}, feature {args.features}; k={args.k}, {args.repeat} ripetizioni\n")
+    results = run_suite(args)
+
+    output = args.output or os.path.join(PROJECT_ROOT, 'output', 'benchmarks',
+                                         f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    save_results(results, output)
+    print(f"\nRisultati salvati in '{output}'")
+
+    regressions = 0
+    baseline = load_results(args.baseline)
+    if baseline is None:
+        print(f"Nessun baseline valido in '{args.baseline}': confronto saltato.")
+    else:
+        if baseline['environment'] != results['environment']:
+            print("ATTENZIONE: il baseline è stato registrato su un'altra macchina o con altre versioni.")
+        rows = compare(results, baseline, args.threshold)
+        regressions = sum(row['status'] == 'regressione' for row in rows)
+        print(f"\nConfronto con il baseline del {baseline['created']} (soglia +{args.threshold:.0%}):")
+        print(format_comparison(rows))
+        print(f"\nRegressioni: {regressions}")
+
+    if args.update_baseline:
+        save_results(results, args.baseline)
+        print(f"Baseline aggiornato: '{args.baseline}'")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,352 @@
+"""
+Generatore di dataset sintetici con lo schema di version_1.csv, per i test di scalabilità
+senza dati dei pazienti.
+
+Il generatore riproduce anche le imperfezioni del file reale che la pulizia deve gestire:
+virgole decimali in 'Single Epithelial Cell Size'/'Bland Chromatin', valori mancanti (righe
+vuote, target mancante, 'nan' testuale nelle colonne con la virgola), valori scritti per 10
+(es. '30.0' invece di '3.0'), righe duplicate e codici campione ripetuti, colonne di rumore
+('Blood Pressure', 'Heart Rate').
+
+Le distribuzioni vengono stimate dal file reale (WisconsinProfile.fit) e salvate in un profilo
+JSON che contiene solo statistiche aggregate: il profilo si può portare nell'ambiente di misura
+al posto dei dati. Per ogni classe le feature ordinali seguono le frequenze osservate, con le
+correlazioni tra feature riprodotte da una copula gaussiana (soglie sulle variabili normali
+latenti, senza dipendenze da scipy).
+
+La scrittura è vettorizzata e a blocchi: ogni blocco viene generato con NumPy e trasformato
+direttamente nei byte del CSV (senza pandas né formattazione riga per riga), quindi la memoria
+dipende da block_rows e non dal numero di righe, e si possono produrre file da 100M di righe.
+
+Esecuzione (dalla cartella principale del progetto):
+    python -m Benchmark.synthetic_wisconsin --rows 100000000 --output big.csv
+    python -m Benchmark.synthetic_wisconsin --fit version_1.csv --save-profile wisconsin_profile.json --rows 0
+    python -m Benchmark.synthetic_wisconsin --profile wisconsin_profile.json --rows 1000000 --output 1m.csv
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from Preprocessing.data_cleaner import COLS_TO_FIX, TARGET_COLUMN
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILE_FORMAT_VERSION = 1
+# Colonna identificativa e colonne di rumore (interi uniformi, mai mancanti nel file reale)
+ID_COLUMN = 'Sample code number'
+NOISE_COLUMNS = ['Blood Pressure', 'Heart Rate']
+# Valori delle feature ordinali; i valori maggiori di MAX_LEVEL sono errori di scala (valore x 10)
+MAX_LEVEL = 10
+SCALE_ERROR_FACTOR = 10
+# Classi del target nel file sorgente (2 = benigno, 4 = maligno)
+CLASS_VALUES = (2, 4)
+
+
+def _parse(values):
+    """Stringhe del CSV -> float (virgola o punto decimale; vuoti e 'nan' -> NaN)."""
+    return pd.to_numeric(values.str.replace(',', '.', regex=False).replace('', None), errors='coerce').to_numpy()
+
+
+def _normal_scores(levels, probabilities, values):
+    """Punteggio normale (quantile del punto medio della massa di ogni livello) dei valori osservati."""
+    cumulative = np.cumsum(probabilities)
+    middle = np.clip(cumulative - np.asarray(probabilities) / 2, 1e-9, 1 - 1e-9)
+    scores = np.array([statistics.NormalDist().inv_cdf(p) for p in middle])
+    return scores[np.searchsorted(levels, values)]
+
+
+def _nearest_correlation(matrix):
+    """Rende la matrice di correlazione definita positiva (autovalori minimi limitati, diagonale 1)."""
+    matrix = np.nan_to_num(matrix, nan=0.0)
+    np.fill_diagonal(matrix, 1.0)
+    eigenvalues, eigenvectors = np.linalg.eigh(matrix)
+    matrix = eigenvectors @ np.diag(np.maximum(eigenvalues, 1e-6)) @ eigenvectors.T
+    scale = np.sqrt(np.diag(matrix))
+    return matrix / np.outer(scale, scale)
+
+
+class WisconsinProfile:
+    """
+    Statistiche aggregate del file reale usate dal generatore:
+
+    - columns: ordine delle colonne del CSV; features: feature ordinali (tutte tranne target, codice, rumore);
+    - class_prior: probabilità di ogni classe di CLASS_VALUES; levels: valori 1..MAX_LEVEL;
+    - feature_probabilities[classe][feature]: frequenze dei livelli per classe;
+    - correlations[classe]: correlazioni della copula gaussiana tra le feature;
+    - scale_error_rates[classe][feature]: quota dei valori da 2 in su scritti per SCALE_ERROR_FACTOR;
+    - comma_rate: quota di righe con la virgola decimale nelle colonne COLS_TO_FIX;
+    - missing_patterns: insiemi di colonne mancanti insieme, con la loro probabilità;
+      missing_tokens: come ogni colonna scrive i valori mancanti ('' o 'nan');
+    - duplicate_rate / id_reuse_rate: quota di righe duplicate (a meno del rumore) e di codici ripetuti;
+    - id_range / noise_ranges: intervalli (inclusi) del codice campione e delle colonne di rumore.
+    """
+    def __init__(self, data):
+        self.data = data
+
+    @classmethod
+    def fit(cls, csv_path):
+        """Stima il profilo da un CSV con lo schema di version_1.csv."""
+        raw = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+        columns = list(raw.columns)
+        features = [col for col in columns if col not in (TARGET_COLUMN, ID_COLUMN, *NOISE_COLUMNS)]
+        values = {col: _parse(raw[col]) for col in columns}
+        missing = pd.DataFrame({col: np.isnan(values[col]) for col in columns if col not in NOISE_COLUMNS})
+
+        patterns = missing.apply(lambda row: tuple(missing.columns[row.to_numpy()]), axis=1).value_counts(normalize=True)
+        missing_tokens = {}
+        for col in missing.columns:
+            tokens = raw.loc[missing[col], col].value_counts()
+            missing_tokens[col] = tokens.index[0] if len(tokens) else ''
+
+        levels = list(range(1, MAX_LEVEL + 1))
+        features_fixed = {}
+        for col in features:
+            fixed = np.where(values[col] > MAX_LEVEL, values[col] / SCALE_ERROR_FACTOR, values[col])
+            features_fixed[col] = np.clip(np.round(fixed), 1, MAX_LEVEL)
+
+        target = values[TARGET_COLUMN]
+        class_counts = [int(np.sum(target == value)) for value in CLASS_VALUES]
+        complete = ~missing.any(axis=1).to_numpy()
+        feature_probabilities, correlations, scale_error_rates = [], [], []
+        for value in CLASS_VALUES:
+            in_class = target == value
+            probabilities, scale_errors = {}, {}
+            for col in features:
+                observed = features_fixed[col][in_class & ~np.isnan(features_fixed[col])]
+                counts = np.array([np.sum(observed == level) for level in levels], dtype=np.float64)
+                probabilities[col] = (counts / counts.sum()).tolist()
+                # Il livello 1 scritto per 10 ('10.0') non si distingue dal livello 10: la quota degli
+                # errori di scala si stima (e si applica) sui soli livelli da 2 in su
+                scalable = in_class & (features_fixed[col] >= 2)
+                scale_errors[col] = float(np.mean(values[col][scalable] > MAX_LEVEL)) if scalable.any() else 0.0
+            scores = np.column_stack([
+                _normal_scores(levels, probabilities[col], features_fixed[col][in_class & complete]) for col in features
+            ])
+            feature_probabilities.append(probabilities)
+            scale_error_rates.append(scale_errors)
+            correlations.append(_nearest_correlation(np.corrcoef(scores, rowvar=False)).tolist())
+
+        comma_present = ~np.isnan(values[COLS_TO_FIX[0]])
+        comma_rows = np.any([raw[col].str.contains(',', regex=False).to_numpy() for col in COLS_TO_FIX], axis=0)
+        not_noise = raw.loc[complete, [col for col in columns if col not in NOISE_COLUMNS]]
+        duplicated = not_noise.duplicated()
+        ids = values[ID_COLUMN][~np.isnan(values[ID_COLUMN])]
+        return cls({
+            'version': PROFILE_FORMAT_VERSION,
+            'source_rows': len(raw),
+            'columns': columns,
+            'features': features,
+            'levels': levels,
+            'class_prior': [count / sum(class_counts) for count in class_counts],
+            'feature_probabilities': feature_probabilities,
+            'correlations': correlations,
+            'scale_error_rates': scale_error_rates,
+            'comma_rate': float(comma_rows[comma_present].mean()),
+            'missing_patterns': [[list(pattern), float(p)] for pattern, p in patterns.items()],
+            'missing_tokens': missing_tokens,
+            'duplicate_rate': float(duplicated.mean()),
+            'id_reuse_rate': float((not_noise[ID_COLUMN].duplicated() & ~duplicated).mean()),
+            'id_range': [int(ids.min()), int(ids.max())],
+            'noise_ranges': {col: [int(np.min(values[col])), int(np.max(values[col]))] for col in NOISE_COLUMNS}
+        })
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.data, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') != PROFILE_FORMAT_VERSION:
+            raise ValueError(f"Profilo '{path}' in un formato non supportato (versione {data.get('version')}).")
+        return cls(data)
+
+
+def _ascii(token):
+    return np.frombuffer(token.encode('ascii'), dtype=np.uint8)
+
+
+def _vocabulary_bytes(vocabulary, codes):
+    """
+    Byte dei token di un vocabolario scelti tramite codes: matrice (righe x token più lungo),
+    completata con byte nulli che _join_rows elimina.
+    """
+    table = np.zeros((len(vocabulary), max(1, max(len(token) for token in vocabulary))), dtype=np.uint8)
+    for i, token in enumerate(vocabulary):
+        table[i, :len(token)] = _ascii(token)
+    return table[codes]
+
+
+def _integer_bytes(values, suffix='', missing=None, missing_token=''):
+    """
+    Interi non negativi in decimale seguiti da suffix (es. '.0'), come matrice di byte con le
+    cifre allineate a destra (byte nulli al posto degli zeri iniziali); le righe indicate da
+    missing contengono missing_token.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    n_digits = len(str(int(values.max(initial=0))))
+    matrix = np.zeros((len(values), max(n_digits + len(suffix), len(missing_token))), dtype=np.uint8)
+    for j in range(n_digits):
+        digits = (values // 10 ** j) % 10 + ord('0')
+        matrix[:, n_digits - 1 - j] = np.where((values >= 10 ** j) | (j == 0), digits, 0)
+    matrix[:, n_digits:n_digits + len(suffix)] = _ascii(suffix)
+    if missing is not None and missing.any():
+        token = np.zeros(matrix.shape[1], dtype=np.uint8)
+        token[:len(missing_token)] = _ascii(missing_token)
+        matrix[missing] = token
+    return matrix
+
+
+def _join_rows(columns):
+    """
+    Concatena le matrici di byte delle colonne in righe CSV (separatori ',' e '\\n') ed elimina
+    i byte nulli di riempimento: due operazioni vettorizzate su tutto il blocco.
+    """
+    n_rows = columns[0].shape[0]
+    parts = []
+    for i, column in enumerate(columns):
+        parts += [column, np.full((n_rows, 1), ord('\n') if i == len(columns) - 1 else ord(','), dtype=np.uint8)]
+    rows = np.hstack(parts)
+    return rows[rows != 0]
+
+
+class SyntheticWisconsinGenerator:
+    """Genera blocchi di righe CSV dal profilo, in modo riproducibile dato il seme."""
+    def __init__(self, profile, seed=0):
+        self.profile = profile.data
+        self.rng = np.random.default_rng(seed)
+        levels = self.profile['levels']
+        features = self.profile['features']
+        self._cholesky = [np.linalg.cholesky(np.array(matrix)) for matrix in self.profile['correlations']]
+        # Soglie sulle variabili normali latenti che separano i livelli di ogni feature
+        self._thresholds = [
+            [np.array([statistics.NormalDist().inv_cdf(p)
+                       for p in np.clip(np.cumsum(probabilities[col])[:-1], 1e-12, 1 - 1e-12)])
+             for col in features]
+            for probabilities in self.profile['feature_probabilities']
+        ]
+        # Vocabolario delle feature: livello, livello x 10, con la virgola, con la virgola x 10, mancante
+        self._feature_vocabulary = {}
+        for col in features:
+            missing_token = self.profile['missing_tokens'].get(col, '')
+            vocabulary = [f"{level}.0" for level in levels] + [f"{level * SCALE_ERROR_FACTOR}.0" for level in levels]
+            vocabulary += [f'"{token.replace(".", ",")}"' for token in vocabulary]  # tra virgolette, come nel CSV reale
+            self._feature_vocabulary[col] = vocabulary + [missing_token]
+        self._target_vocabulary = [f"{value}.0" for value in CLASS_VALUES] + \
+            [self.profile['missing_tokens'].get(TARGET_COLUMN, '')]
+
+    def _feature_codes(self, classes):
+        """Livelli (indici 0..MAX_LEVEL-1) delle feature per ogni riga, dalla copula gaussiana della classe."""
+        n_rows, features = len(classes), self.profile['features']
+        codes = np.empty((n_rows, len(features)), dtype=np.int64)
+        for class_index, cholesky in enumerate(self._cholesky):
+            rows = np.flatnonzero(classes == class_index)
+            latent = self.rng.standard_normal((len(rows), len(features))) @ cholesky.T
+            for f, thresholds in enumerate(self._thresholds[class_index]):
+                codes[rows, f] = np.searchsorted(thresholds, latent[:, f])
+        return codes
+
+    def block(self, n_rows):
+        """Byte CSV (senza intestazione) di n_rows righe sintetiche."""
+        profile, rng = self.profile, self.rng
+        features = profile['features']
+        n_levels = len(profile['levels'])
+
+        classes = rng.choice(len(CLASS_VALUES), n_rows, p=profile['class_prior'])
+        codes = self._feature_codes(classes)
+        low, high = profile['id_range']
+        ids = rng.integers(low, high + 1, n_rows)
+
+        # Righe con codice ripetuto o duplicate (a meno del rumore): copiano una riga originale del blocco
+        copy_rate = profile['id_reuse_rate'] + profile['duplicate_rate']
+        is_copy = rng.random(n_rows) < copy_rate
+        originals, copies = np.flatnonzero(~is_copy), np.flatnonzero(is_copy)
+        if len(originals) == 0:
+            copies = copies[:0]
+        sources = originals[rng.integers(0, max(len(originals), 1), len(copies))]
+        ids[copies] = ids[sources]
+        full_copy = rng.random(len(copies)) * copy_rate < profile['duplicate_rate']
+        duplicates, duplicate_sources = copies[full_copy], sources[full_copy]
+        classes[duplicates] = classes[duplicate_sources]
+        codes[duplicates] = codes[duplicate_sources]
+        comma = rng.random(n_rows) < profile['comma_rate']
+        comma[duplicates] = comma[duplicate_sources]
+
+        missing = {col: np.zeros(n_rows, dtype=bool) for col in profile['missing_tokens']}
+        patterns = profile['missing_patterns']
+        chosen = rng.choice(len(patterns), n_rows, p=np.array([p for _, p in patterns]) / sum(p for _, p in patterns))
+        for index, (pattern_columns, _) in enumerate(patterns):
+            for col in pattern_columns:
+                missing[col] |= chosen == index
+
+        tokens = {}
+        for f, col in enumerate(features):
+            feature_codes = codes[:, f]
+            scale_error_rates = np.array([rates[col] for rates in profile['scale_error_rates']])
+            scaled = (rng.random(n_rows) < scale_error_rates[classes]) & (feature_codes > 0)
+            feature_codes = feature_codes + n_levels * scaled
+            if col in COLS_TO_FIX:
+                feature_codes = feature_codes + 2 * n_levels * comma
+            feature_codes = np.where(missing[col], 4 * n_levels, feature_codes)
+            tokens[col] = _vocabulary_bytes(self._feature_vocabulary[col], feature_codes)
+        tokens[TARGET_COLUMN] = _vocabulary_bytes(
+            self._target_vocabulary, np.where(missing[TARGET_COLUMN], len(CLASS_VALUES), classes))
+        tokens[ID_COLUMN] = _integer_bytes(ids, '.0', missing[ID_COLUMN], profile['missing_tokens'].get(ID_COLUMN, ''))
+        for col in NOISE_COLUMNS:
+            low, high = profile['noise_ranges'][col]
+            tokens[col] = _integer_bytes(rng.integers(low, high + 1, n_rows))
+        return _join_rows([tokens[col] for col in profile['columns']])
+
+
+def write_synthetic_csv(path, n_rows, profile=None, seed=0, block_rows=1_000_000):
+    """
+    Scrive in path un CSV di n_rows righe con lo schema e le imperfezioni di version_1.csv.
+    Senza profile il profilo viene stimato da version_1.csv. La memoria dipende da block_rows;
+    a parità di seme e block_rows il file è identico.
+    """
+    profile = profile if profile is not None else WisconsinProfile.fit(os.path.join(PROJECT_ROOT, 'version_1.csv'))
+    generator = SyntheticWisconsinGenerator(profile, seed)
+    with open(path, 'wb') as f:
+        f.write((','.join(profile.data['columns']) + '\n').encode('ascii'))
+        written = 0
+        while written < n_rows:
+            size = min(block_rows, n_rows - written)
+            f.write(generator.block(size))
+            written += size
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generatore di CSV sintetici con lo schema di version_1.csv.")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Righe da generare")
+    parser.add_argument('--output', default='synthetic_wisconsin.csv', help="CSV da scrivere")
+    parser.add_argument('--profile', help="Profilo JSON salvato in precedenza (al posto del CSV reale)")
+    parser.add_argument('--fit', default=os.path.join(PROJECT_ROOT, 'version_1.csv'),
+                        help="CSV reale da cui stimare il profilo (se non è indicato --profile)")
+    parser.add_argument('--save-profile', help="Salva il profilo stimato in questo file JSON")
+    parser.add_argument('--seed', type=int, default=0, help="Seme del generatore")
+    parser.add_argument('--block-rows', type=int, default=1_000_000, help="Righe generate per blocco")
+    args = parser.parse_args()
+
+    profile = WisconsinProfile.load(args.profile) if args.profile else WisconsinProfile.fit(args.fit)
+    if args.save_profile:
+        profile.save(args.save_profile)
+        print(f"Profilo salvato in '{args.save_profile}'")
+    if args.rows <= 0:
+        return
+
+    start = time.perf_counter()
+    write_synthetic_csv(args.output, args.rows, profile, args.seed, args.block_rows)
+    elapsed = time.perf_counter() - start
+    print(f"Scritte {args.rows:,} righe in '{args.output}' ({os.path.getsize(args.output) / 1e6:,.0f} MB) "
+          f"in {elapsed:.1f} s ({args.rows / elapsed:,.0f} righe/s)")
+
+
+if __name__ == '__main__':
+    main()
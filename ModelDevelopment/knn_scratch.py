@@ -1,13 +1,335 @@
+import numpy as np
+
+from Monitoring.timing import count, timed
+from ModelDevelopment.lsh_index import LSHIndex
+from ModelDevelopment.model_store import load_model, save_model
+from ModelDevelopment.neighbor_cache import NeighborCache
+from ModelDevelopment.prototype_selection import select_prototypes
+from Preprocessing.dataset import as_arrays
+from Preprocessing.pca import PCA
+from Preprocessing.scaling import FeatureScaler
+
+# Numero massimo di distanze (campioni di test x campioni di training) calcolate per blocco:
+# la matrice delle distanze viene calcolata a blocchi per limitarne la memoria.
+DISTANCE_BLOCK_ELEMENTS = 1 << 22
+# Righe del training set lette per blocco. Il training set (anche un np.memmap più grande della RAM)
+# viene scorso una sola volta, in blocchi consecutivi, mantenendo i k migliori vicini correnti.
+TRAIN_BLOCK_ROWS = 1 << 16
+
+
+def _smallest_k(dists, k):
+    """
+    Indici delle k distanze minori di ogni riga, ordinati per (distanza, indice).
+    La selezione usa np.partition (tempo lineare) e, a parità di distanza sul k-esimo valore,
+    tiene i campioni con indice minore, come un ordinamento stabile dell'intera riga.
+    """
+    if k >= dists.shape[1]:
+        return np.argsort(dists, axis=1, kind='stable')
+    n_rows = len(dists)
+    kth = np.partition(dists, k - 1, axis=1)[:, k - 1]
+    # Tutti i valori <= k-esimo, per riga e in ordine di indice (un solo passaggio sul blocco)
+    rows, cols = np.nonzero(dists <= kth[:, None])
+    values = dists[rows, cols]
+    # Tra i valori uguali al k-esimo si tengono solo i primi (per indice) che servono a completare k
+    ties = values == kth[rows]
+    tie_counts = np.bincount(rows[ties], minlength=n_rows)
+    needed = k - (np.bincount(rows, minlength=n_rows) - tie_counts)
+    tie_rank = np.cumsum(ties) - 1 - (np.cumsum(tie_counts) - tie_counts)[rows]
+    keep = ~ties | (tie_rank < needed[rows])
+    candidates = cols[keep].reshape(n_rows, k)
+    order = np.argsort(values[keep].reshape(n_rows, k), axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def _block_candidates(dists, current_worst, k):
+    """
+    Candidati di un blocco di training per entrare tra i k vicini correnti.
+
+    Entra solo chi è strettamente più vicino del k-esimo vicino corrente (a parità di distanza vince
+    il vicino corrente, che ha indice minore). Dopo i primi blocchi i candidati sono pochi:
+    si raccolgono con np.nonzero invece di selezionare i k minimi dell'intero blocco.
+
+    Returns:
+        tuple: (indici nel blocco, distanze) come matrici con una riga per campione di test,
+        completate con distanza infinita; (None, None) se nessun candidato migliora i vicini.
+    """
+    if np.isinf(current_worst).any():
+        # Vicini correnti non ancora completi (es. il primo blocco): selezione dei k minimi di ogni riga
+        candidates = _smallest_k(dists, k)
+        return candidates, np.take_along_axis(dists, candidates, axis=1)
+    improves = dists < current_worst[:, None]
+    counts = improves.sum(axis=1)
+    max_count = counts.max() if len(counts) else 0
+    if max_count == 0:
+        return None, None
+    if max_count > k:
+        # Molti candidati: selezione lineare dei k minimi di ogni riga
+        candidates = _smallest_k(dists, k)
+        return candidates, np.take_along_axis(dists, candidates, axis=1)
+
+    # Pochi candidati: np.nonzero li restituisce per riga e, in ogni riga, in ordine di indice
+    rows, cols = np.nonzero(improves)
+    positions = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+    candidates = np.zeros((len(dists), max_count), dtype=np.intp)
+    candidate_dists = np.full((len(dists), max_count), np.inf, dtype=dists.dtype)
+    candidates[rows, positions] = cols
+    candidate_dists[rows, positions] = dists[rows, cols]
+    return candidates, candidate_dists
+
+
 class KNN:
 
-    def __init__(self, x_train, y_train, k):
+    @timed('knn.fit')
+    def __init__(self, x_train, y_train, k, pca=None, scaling=None, prototypes=None, lsh_tables=None, lsh_bits=12,
+                 cache_size=None):
         """
         Costruttore che inizializza le caratteristiche dei dati di addestramento, le etichette e il numero di vicini.
+
+        x_train può essere un Dataset (in tal caso y_train viene ignorato), un array numpy
+        (anche np.memmap su disco), un DataFrame o una lista di liste: gli array float32/float64/uint8
+        vengono usati senza copia.
+
+        pca (opzionale): quota di varianza da mantenere (es. 0.95). La PCA viene calcolata sui soli
+        dati di addestramento e la ricerca dei vicini avviene nello spazio ridotto, proiettando
+        allo stesso modo i campioni di test.
+
+        scaling (opzionale): 'standard' o 'minmax'. Le statistiche vengono calcolate sui soli dati di
+        addestramento e applicate come pesi per feature nel calcolo delle distanze, senza copie
+        scalate dei dati; con la PCA la scalatura è inclusa nella matrice di proiezione.
+
+        prototypes (opzionale): 'enn', 'cnn' o 'enn_cnn'. Il training set viene ridotto ai prototipi
+        scelti (vedi ModelDevelopment.prototype_selection) e la ricerca dei vicini avviene solo su di essi;
+        prototype_indices contiene gli indici tenuti e compression_ratio la frazione di campioni rimasti.
+
+        lsh_tables (opzionale): numero di tabelle dell'indice LSH (vedi ModelDevelopment.lsh_index) con
+        lsh_bits bit ciascuna. Se indicato, la ricerca dei vicini è approssimata: più tabelle aumentano
+        il recall, più bit la velocità.
+
+        Il training set può essere aggiornato con add_samples/partial_fit e remove_samples; PCA, scalatura
+        e prototipi restano quelli calcolati alla costruzione.
+
+        Il modello addestrato può essere salvato con save() e ricaricato con KNN.load().
+
+        cache_size (opzionale): numero massimo di righe di query i cui vicini (indici, distanze e voto)
+        restano in una cache LRU (vedi ModelDevelopment.neighbor_cache). Le feature sono ordinali 1-10,
+        quindi gli stessi campioni si ripetono spesso; la cache viene svuotata a ogni modifica del training set.
         """
         self.x_train = x_train
         self.y_train = y_train
         self.k = k
+        # Opzioni indicate (per il salvataggio del modello) e nomi delle feature, se noti
+        self.options = {name: value for name, value in (('pca', pca), ('scaling', scaling), ('prototypes', prototypes),
+                                                        ('lsh_tables', lsh_tables)) if value is not None}
+        if lsh_tables is not None:
+            self.options['lsh_bits'] = lsh_bits
+        self.feature_names = getattr(x_train, 'feature_names', None)
+        if self.feature_names is None and hasattr(x_train, 'columns'):
+            self.feature_names = [str(col) for col in x_train.columns]
+        # Imputer della pulizia dei dati associato al modello (salvato e caricato insieme al modello)
+        self.imputer = None
+        self._x, self._y = as_arrays(x_train, y_train)
+        self.scaler = FeatureScaler(scaling).fit(self._x) if scaling is not None else None
+        self.pca = None
+        # Pesi per feature della distanza (None = distanza euclidea semplice)
+        self._weights = None
+        if pca is not None:
+            self.pca = PCA(variance_ratio=pca).fit(self._x, scale=self.scaler.scale if self.scaler else None)
+            self._x = self.pca.transform(self._x)
+        # Le feature uint8 vengono convertite in float32 blocco per blocco durante la ricerca
+        self._dtype = np.float64 if self._x.dtype == np.float64 else np.float32
+        if self.scaler is not None and self.pca is None:
+            self._weights = self.scaler.weights.astype(self._dtype)
+        # Norme al quadrato (pesate) dei campioni di training, riutilizzate per ogni blocco di test
+        self._x_sq_norms = np.concatenate(
+            [self._sq_norms(block) for _, block in self._train_blocks()] or [np.empty(0, self._dtype)])
+        self._classes = np.unique(self._y)
+        self.n_train_samples = len(self._x)
+        self.prototype_indices = None
+        if prototypes is not None:
+            self.prototype_indices = select_prototypes(self, prototypes)
+            reduced = self.subset(self.prototype_indices)
+            self._x, self._y, self._x_sq_norms = reduced._x, reduced._y, reduced._x_sq_norms
+        self.lsh = LSHIndex(lsh_tables, lsh_bits).fit(self) if lsh_tables is not None else None
+        # Buffer espandibili per gli aggiornamenti incrementali (creati alla prima modifica)
+        self._x_buffer = None
+        self._y_buffer = None
+        self._norms_buffer = None
+        # Versione del training set, parte della chiave della cache dei vicini
+        self._version = 0
+        self._cache = None
+        if cache_size is not None:
+            self.enable_cache(cache_size)
+
+    @property
+    def compression_ratio(self):
+        """Frazione dei campioni di training usati nella ricerca (1 senza selezione dei prototipi)."""
+        return len(self._x) / self.n_train_samples if self.n_train_samples else 1.0
+
+    @property
+    def n_features(self):
+        """Numero di feature dei campioni in ingresso (prima dell'eventuale riduzione PCA)."""
+        return len(self.pca.mean) if self.pca is not None else self._x.shape[1]
+
+    def save(self, path, imputer=None):
+        """
+        Salva il modello nella cartella path (vedi ModelDevelopment.model_store): training set, etichette,
+        k, metrica, stato di scalatura/PCA, prototipi, indice LSH e, se indicato, l'imputer.
+        """
+        return save_model(self, path, imputer if imputer is not None else self.imputer)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Carica un modello salvato con save(); con mmap=True gli array restano su disco in memory mapping."""
+        return load_model(cls, path, mmap)
+
+    def enable_cache(self, max_entries):
+        """Attiva (o ridimensiona, svuotandola) la cache LRU dei vicini; con None la disattiva."""
+        self._cache = NeighborCache(max_entries) if max_entries is not None else None
+        if max_entries is None:
+            self.options.pop('cache_size', None)
+        else:
+            self.options['cache_size'] = max_entries
+
+    def cache_info(self):
+        """Contatori della cache dei vicini (hit, miss, eliminazioni, invalidazioni), None se non attiva."""
+        return self._cache.info() if self._cache is not None else None
+
+    def _training_changed(self):
+        """Da chiamare dopo ogni modifica del training set: i vicini in cache non sono più validi."""
+        self._version += 1
+        if self._cache is not None:
+            self._cache.clear()
+
+    @property
+    def n_samples(self):
+        """Numero di campioni di training usati nella ricerca."""
+        return len(self._x)
+
+    def _reserve(self, n_rows, y_dtype):
+        """
+        Garantisce spazio per n_rows campioni nei buffer del training set. La capacità almeno raddoppia
+        a ogni espansione, quindi l'aggiunta di campioni costa O(1) ammortizzato per riga.
+        La prima modifica copia in memoria il training set (che può essere un array dell'utente o un memmap).
+        """
+        y_dtype = np.promote_types(self._y.dtype, y_dtype)
+        if self._x_buffer is not None and len(self._x_buffer) >= n_rows and self._y_buffer.dtype == y_dtype:
+            return
+        n_current = len(self._x)
+        capacity = max(n_rows, 2 * (len(self._x_buffer) if self._x_buffer is not None else n_current), 16)
+        x_buffer = np.empty((capacity, self._x.shape[1]), dtype=self._dtype)
+        y_buffer = np.empty(capacity, dtype=y_dtype)
+        norms_buffer = np.empty(capacity, dtype=self._x_sq_norms.dtype)
+        for start, block in self._train_blocks():
+            x_buffer[start:start + len(block)] = block
+        y_buffer[:n_current] = self._y
+        norms_buffer[:n_current] = self._x_sq_norms
+        self._x_buffer, self._y_buffer, self._norms_buffer = x_buffer, y_buffer, norms_buffer
+        self._set_size(n_current)
+
+    def _set_size(self, n_rows):
+        """Il training set diventa la porzione iniziale (vista, senza copia) dei buffer."""
+        self._x = self._x_buffer[:n_rows]
+        self._y = self._y_buffer[:n_rows]
+        self._x_sq_norms = self._norms_buffer[:n_rows]
+
+    def add_samples(self, x_new, y_new):
+        """
+        Accoda nuovi campioni etichettati al training set, senza ricostruire il modello.
+        Le nuove righe vengono trasformate con la PCA già calcolata, le loro norme calcolate una sola
+        volta e, se presente, l'indice LSH aggiornato con i soli nuovi codici.
+
+        Returns:
+        np.ndarray: Indici dei nuovi campioni nel training set.
+        """
+        x_new, y_new = as_arrays(x_new, y_new)
+        x_new, x_new_sq_norms = self._prepare_test(x_new)
+        y_new = np.asarray(y_new)
+        if len(y_new) != len(x_new):
+            raise ValueError(f"Etichette ({len(y_new)}) e campioni ({len(x_new)}) non corrispondono.")
+        n_current = len(self._x)
+        n_rows = n_current + len(x_new)
+        self._reserve(n_rows, y_new.dtype)
+        self._x_buffer[n_current:n_rows] = x_new
+        self._y_buffer[n_current:n_rows] = y_new
+        self._norms_buffer[n_current:n_rows] = x_new_sq_norms
+        self._set_size(n_rows)
+        self._classes = np.union1d(self._classes, y_new)
+        self.n_train_samples += len(x_new)
+        if self.lsh is not None:
+            self.lsh.add(x_new)
+        self._training_changed()
+        return np.arange(n_current, n_rows)
+
+    def partial_fit(self, x_new, y_new):
+        """Aggiunge nuovi campioni etichettati al modello (vedi add_samples) e restituisce il modello."""
+        self.add_samples(x_new, y_new)
+        return self
+
+    def remove_samples(self, indices):
+        """
+        Elimina dal training set i campioni con gli indici indicati. I campioni successivi vengono
+        spostati in avanti nei buffer (i loro indici diminuiscono) e l'indice LSH viene rinumerato
+        senza ricalcolare i codici.
+        """
+        indices = np.unique(np.asarray(indices, dtype=np.intp))
+        if len(indices) == 0:
+            return
+        if indices[0] < 0 or indices[-1] >= len(self._x):
+            raise IndexError(f"Indici da eliminare fuori dall'intervallo 0-{len(self._x) - 1}.")
+        n_rows = len(self._x) - len(indices)
+        self._reserve(len(self._x), self._y.dtype)
+        keep = np.ones(len(self._x), dtype=bool)
+        keep[indices] = False
+        self._x_buffer[:n_rows] = self._x[keep]
+        self._y_buffer[:n_rows] = self._y[keep]
+        self._norms_buffer[:n_rows] = self._x_sq_norms[keep]
+        self._set_size(n_rows)
+        self._classes = np.unique(self._y)
+        self.n_train_samples -= len(indices)
+        if self.lsh is not None:
+            self.lsh.remove(indices)
+        self._training_changed()
+
+    def _train_blocks(self):
+        """Scorre il training set a blocchi consecutivi di righe (lettura sequenziale dal disco)."""
+        for start in range(0, len(self._x), TRAIN_BLOCK_ROWS):
+            yield start, np.asarray(self._x[start:start + TRAIN_BLOCK_ROWS], dtype=self._dtype)
 
+    def _test_blocks(self, x_test, train_rows):
+        """Suddivide i campioni di test in blocchi di righe consecutive."""
+        block_rows = max(1, DISTANCE_BLOCK_ELEMENTS // max(1, train_rows))
+        for start in range(0, len(x_test), block_rows):
+            yield start, x_test[start:start + block_rows]
+
+    def _prepare_test(self, x_test):
+        x_test = as_arrays(x_test)[0]
+        if self.pca is not None:
+            x_test = self.pca.transform(x_test)
+        x_test = np.asarray(x_test, dtype=self._dtype)
+        return x_test, self._sq_norms(x_test)
+
+    def _sq_norms(self, block):
+        """Norme al quadrato delle righe, con i pesi per feature se è attiva la scalatura."""
+        if self._weights is None:
+            return np.einsum('ij,ij->i', block, block)
+        return np.einsum('ij,ij,j->i', block, block, self._weights)
+
+    @timed('knn.distance')
+    def _squared_distances(self, x_block, x_block_sq_norms, train_block, train_sq_norms):
+        """
+        Distanze euclidee al quadrato tra un blocco di campioni di test e un blocco di training,
+        calcolate come ||a||^2 + ||b||^2 - 2ab con un unico prodotto matriciale.
+        Con la scalatura il prodotto diventa a·(w*b): i pesi si applicano al solo blocco di test.
+        """
+        if self._weights is not None:
+            x_block = x_block * self._weights
+        dists = x_block @ train_block.T
+        dists *= -2.0
+        dists += x_block_sq_norms[:, None]
+        dists += train_sq_norms[None, :]
+        # Gli errori di arrotondamento possono produrre valori leggermente negativi
+        np.maximum(dists, 0, out=dists)
+        return dists
 
     def euclidean_distance(self, x_test):
         """
@@ -15,44 +337,204 @@ class KNN:
         Calcola la distanza euclidea tra i dati di addestramento e di test.
 
         Args:
-        x_test (list): Lista di caratteristiche dei dati di test.
+        x_test (list): Lista (o array/Dataset) di caratteristiche dei dati di test.
+
+        Returns:
+        np.ndarray: Matrice (campioni di test x campioni di training) delle distanze euclidee.
+        """
+        x_test, x_test_sq_norms = self._prepare_test(x_test)
+        dists = np.empty((len(x_test), len(self._x)), dtype=self._dtype)
+        for train_start, train_block in self._train_blocks():
+            train_end = train_start + len(train_block)
+            for test_start, x_block in self._test_blocks(x_test, len(train_block)):
+                test_end = test_start + len(x_block)
+                dists[test_start:test_end, train_start:train_end] = self._squared_distances(
+                    x_block, x_test_sq_norms[test_start:test_end],
+                    train_block, self._x_sq_norms[train_start:train_end])
+        return np.sqrt(dists, out=dists)
+
+    def kneighbors(self, x_test, return_distance=False):
+        """
+        Trova gli indici dei k vicini più prossimi di ogni campione di test.
+        A parità di distanza viene scelto il campione di training con indice minore.
+        Con l'indice LSH (opzione lsh_tables) i vicini sono approssimati.
+
+        Il training set viene letto una sola volta, a blocchi consecutivi: per ogni blocco si
+        raccolgono i candidati più vicini del k-esimo vicino corrente e li si fonde con i k vicini
+        trovati fino a quel momento.
+
+        Returns:
+        np.ndarray: Matrice (campioni di test x min(k, campioni di training)) di indici, dal più vicino.
+        Con return_distance=True restituisce anche la matrice delle rispettive distanze euclidee.
+        """
+        best_indices, best_dists, _ = self._neighbors(x_test)
+        if return_distance:
+            return best_indices, np.sqrt(best_dists)
+        return best_indices
+
+    def _neighbors(self, x_test, votes=False):
+        """
+        Vicini dei campioni di test: (indici, distanze al quadrato, voto o None).
+        Con la cache attiva il voto viene sempre restituito (è salvato insieme ai vicini).
+        """
+        x_test, x_test_sq_norms = self._prepare_test(x_test)
+        if self._cache is not None and len(x_test) and len(self._x) and x_test.shape[1]:
+            return self._cached_neighbors(x_test, x_test_sq_norms)
+        indices, dists = self._find(x_test, x_test_sq_norms)
+        return indices, dists, (self._vote(self._y[indices]) if votes and len(self._x) else None)
+
+    @timed('knn.search')
+    def _find(self, x_test, x_test_sq_norms):
+        """Ricerca dei k vicini, esatta o con l'indice LSH."""
+        count('knn.queries', len(x_test))
+        if self.lsh is not None:
+            return self._approximate_search(x_test, x_test_sq_norms, self.k)
+        return self._search(x_test, x_test_sq_norms, self.k)
+
+    def _cached_neighbors(self, x_test, x_test_sq_norms):
+        """
+        Ricerca dei vicini con la cache LRU. Le righe identiche della stessa richiesta vengono cercate
+        una sola volta; le righe già in cache non vengono cercate e le altre vengono cercate insieme.
+        """
+        n_neighbors = min(self.k, len(self._x))
+        row_dtype = np.dtype((np.void, x_test.dtype.itemsize * x_test.shape[1]))
+        rows = np.ascontiguousarray(x_test).view(row_dtype).ravel()
+        unique_rows, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+
+        keys = [(row.tobytes(), self.k, self._version) for row in unique_rows]
+        indices = np.empty((len(keys), n_neighbors), dtype=np.intp)
+        dists = np.empty((len(keys), n_neighbors), dtype=self._dtype)
+        votes = np.empty(len(keys), dtype=self._classes.dtype)
+        missing = []
+        for position, key in enumerate(keys):
+            entry = self._cache.get(key)
+            if entry is None:
+                missing.append(position)
+            else:
+                indices[position], dists[position], votes[position] = entry
+
+        if missing:
+            missing = np.array(missing)
+            found_indices, found_dists = self._find(x_test[first[missing]], x_test_sq_norms[first[missing]])
+            found_votes = self._vote(self._y[found_indices])
+            indices[missing], dists[missing], votes[missing] = found_indices, found_dists, found_votes
+            for position, row_indices, row_dists, vote in zip(missing, found_indices, found_dists, found_votes):
+                self._cache.put(keys[position], (row_indices.copy(), row_dists.copy(), vote))
+        return indices[inverse], dists[inverse], votes[inverse]
+
+    def _search(self, x_test, x_test_sq_norms, n_neighbors):
+        """
+        Ricerca dei vicini su campioni di test già preparati (spazio PCA, tipo e norme del modello).
 
         Returns:
-        list: Lista di distanze euclidee tra ogni campione di test e tutti i campioni di addestramento.
+        tuple: (indici, distanze euclidee al quadrato) dei min(n_neighbors, campioni di training) vicini.
         """
-        test_dists = []
-        for i in range(len(x_test)):
-            dists = [
-                (sum([(float(x_test[i][j]) - float(self.x_train[m][j])) ** 2 for j in range(len(x_test[i]))])) ** 0.5
-                for m in range(len(self.x_train))]
-            test_dists.append(dists)
-        return test_dists
+        n_neighbors = min(n_neighbors, len(self._x))
+        # Vicini correnti: all'inizio distanze infinite, sostituite dai primi candidati reali
+        best_dists = np.full((len(x_test), n_neighbors), np.inf, dtype=self._dtype)
+        best_indices = np.zeros((len(x_test), n_neighbors), dtype=np.intp)
+
+        for train_start, train_block in self._train_blocks():
+            train_sq_norms = self._x_sq_norms[train_start:train_start + len(train_block)]
+            for test_start, x_block in self._test_blocks(x_test, len(train_block)):
+                rows = slice(test_start, test_start + len(x_block))
+                dists = self._squared_distances(x_block, x_test_sq_norms[rows], train_block, train_sq_norms)
+                candidates, candidate_dists = _block_candidates(dists, best_dists[rows, -1], n_neighbors)
+                if candidates is None:
+                    continue
 
+                # Fusione con i vicini correnti: questi hanno indici minori dei nuovi candidati,
+                # quindi l'ordinamento stabile mantiene la preferenza per l'indice minore a parità di distanza
+                merged_dists = np.concatenate([best_dists[rows], candidate_dists], axis=1)
+                merged_indices = np.concatenate([best_indices[rows], candidates + train_start], axis=1)
+                order = np.argsort(merged_dists, axis=1, kind='stable')[:, :n_neighbors]
+                best_dists[rows] = np.take_along_axis(merged_dists, order, axis=1)
+                best_indices[rows] = np.take_along_axis(merged_indices, order, axis=1)
+        return best_indices, best_dists
+
+    def _approximate_search(self, x_test, x_test_sq_norms, n_neighbors):
+        """
+        Ricerca dei vicini tra i soli candidati dell'indice LSH, con le distanze esatte del modello.
+        I campioni di test con meno di n_neighbors candidati vengono cercati in modo esatto.
+        """
+        n_neighbors = min(n_neighbors, len(self._x))
+        best_dists = np.full((len(x_test), n_neighbors), np.inf, dtype=self._dtype)
+        best_indices = np.zeros((len(x_test), n_neighbors), dtype=np.intp)
+        for rows, candidates, outside in self.lsh.candidate_blocks(x_test):
+            train_block = np.asarray(self._x[candidates], dtype=self._dtype)
+            dists = self._squared_distances(x_test[rows], x_test_sq_norms[rows],
+                                            train_block, self._x_sq_norms[candidates])
+            np.copyto(dists, np.inf, where=outside)
+            # I candidati sono in ordine di indice: a parità di distanza vince l'indice minore
+            nearest = _smallest_k(dists, min(n_neighbors, len(candidates)))
+            best_indices[rows, :nearest.shape[1]] = candidates[nearest]
+            best_dists[rows, :nearest.shape[1]] = np.take_along_axis(dists, nearest, axis=1)
+
+        fallback = np.flatnonzero(np.isinf(best_dists[:, -1])) if n_neighbors else np.empty(0, dtype=np.intp)
+        if len(fallback):
+            best_indices[fallback], best_dists[fallback] = self._search(
+                x_test[fallback], x_test_sq_norms[fallback], n_neighbors)
+        self.lsh.record_queries(len(x_test), len(fallback))
+        return best_indices, best_dists
+
+    def subset(self, indices):
+        """
+        Restituisce un modello che usa solo le righe indicate del training set, con la stessa
+        PCA, scalatura e k (senza ricalcolarle) e ricerca esatta. Gli indici dei vicini si riferiscono al sottoinsieme.
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        model = object.__new__(type(self))
+        model.__dict__.update(self.__dict__)
+        model._x = self._x[indices]
+        model._y = self._y[indices]
+        model._x_sq_norms = self._x_sq_norms[indices]
+        model._classes = np.unique(model._y)
+        # L'indice approssimato, i buffer e la cache si riferiscono al training set completo
+        model.lsh = None
+        model._x_buffer = model._y_buffer = model._norms_buffer = None
+        model._cache = None
+        return model
+
+    @timed('knn.vote')
+    def _vote(self, neighbor_labels):
+        """
+        Voto di maggioranza sulle etichette dei vicini (una riga per campione di test).
+        In caso di parità vince la classe che compare per prima tra i vicini (il più vicino).
+        """
+        n_neighbors = neighbor_labels.shape[1]
+        matches = neighbor_labels[:, :, None] == self._classes[None, None, :]
+        counts = matches.sum(axis=1)
+        first_position = np.where(matches.any(axis=1), matches.argmax(axis=1), n_neighbors)
+        return self._classes[np.argmax(counts * (n_neighbors + 1) - first_position, axis=1)]
 
     def test(self, x_test):
         """
         Testa il modello sui dati di test e fa delle predizioni.
 
         Args:
-        x_test (list): Lista di caratteristiche dei dati di test.
+        x_test (list): Lista (o array/Dataset) di caratteristiche dei dati di test.
 
         Returns:
         list: Lista delle tabelle predette per i dati di test.
         """
-        y_test_pred = []
-        test_dists = self.euclidean_distance(x_test)  # Trova la Distanza Euclidea tra i dati di test e di training
-        for dists in test_dists:
-            k_smallest = sorted(range(len(dists)), key=lambda i: dists[i])[:self.k]
-            labels = [self.y_train[i] for i in k_smallest]
-            label_counts = {}
-            for label in labels:
-                if label in label_counts:
-                    label_counts[label] += 1
-                else:
-                    label_counts[label] = 1
-            y_test_pred.append(max(label_counts, key=label_counts.get))
-
-        return y_test_pred
+        neighbors, _, votes = self._neighbors(x_test, votes=True)  # Trova i k vicini più prossimi tra i dati di training
+        if len(neighbors) == 0:
+            return []
+        return votes.tolist()
+
+    def test_with_proba(self, x_test):
+        """
+        Predizioni e probabilità della classe positiva con un'unica ricerca dei vicini
+        (equivale a test() e test_proba(), che cercano i vicini una volta ciascuno).
+
+        Returns:
+        tuple: (np.ndarray delle classi predette, np.ndarray delle probabilità della classe positiva).
+        """
+        neighbors, _, votes = self._neighbors(x_test, votes=True)
+        if len(neighbors) == 0:
+            return np.empty(0, dtype=self._y.dtype), np.empty(0)
+        positive_counts = (self._y[neighbors] == self._classes.max()).sum(axis=1)
+        return votes, positive_counts / self.k
 
     def test_proba(self, x_test):
         """
@@ -60,37 +542,18 @@ class KNN:
         Ritorna la probabilità della classe positiva (la classe con valore più alto).
 
         Args:
-        x_test (list): Lista di caratteristiche dei dati di test.
+        x_test (list): Lista (o array/Dataset) di caratteristiche dei dati di test.
 
         Returns:
         list: Lista delle probabilità per la classe positiva per ogni campione di test.
         """
-        y_test_proba = []
-        test_dists = self.euclidean_distance(x_test)  #  Questo metodo calcola
-        # la distanza euclidea tra i campioni di test forniti in x_test e tutti
-        # i campioni di addestramento memorizzati in self.x_train.
+        neighbors = self.kneighbors(x_test)
+        if len(neighbors) == 0:
+            return []
 
         # Identifica le classi uniche e assume che la classe con valore più alto sia la "positiva".
-        unique_classes = list(set(self.y_train))
-        positive_class = max(unique_classes)
-
-        for dists in test_dists:
-            # Trova gli indici dei k vicini più prossimi (distanza minore).
-            k_smallest = sorted(range(len(dists)), key=lambda i: dists[i])[:self.k]
-            
-            # Recupera le etichette di questi k vicini dal training set.
-            labels = [self.y_train[i] for i in k_smallest]
-            
-            # Conta le occorrenze di ogni etichetta tra i vicini.
-            label_counts = {}
-            for label in labels:
-                if label in label_counts:
-                    label_counts[label] += 1
-                else:
-                    label_counts[label] = 1
-            
-            # Calcola la probabilità della classe positiva come frazione dei vicini positivi su k.
-            proba_positive = label_counts.get(positive_class, 0) / self.k
-            y_test_proba.append(proba_positive)
-
-        return y_test_proba
+        positive_class = self._classes.max()
+
+        # Calcola la probabilità della classe positiva come frazione dei vicini positivi su k.
+        positive_counts = (self._y[neighbors] == positive_class).sum(axis=1)
+        return (positive_counts / self.k).tolist()
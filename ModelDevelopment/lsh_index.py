@@ -0,0 +1,171 @@
+"""
+Ricerca approssimata dei vicini con Locality Sensitive Hashing a proiezioni casuali.
+
+Ogni tabella assegna a un campione un codice di n_bits bit: il segno della sua proiezione su
+n_bits direzioni casuali, rispetto alla proiezione di un campione di training scelto a caso.
+Campioni vicini finiscono con alta probabilità nello stesso bucket in almeno una delle
+n_tables tabelle.
+Per ogni campione di test si raccolgono i campioni di training dei suoi bucket (candidati),
+che il modello KNN riordina con la distanza esatta (stessa PCA e scalatura).
+Se i candidati sono meno di k, il campione viene cercato in modo esatto.
+
+Compromesso velocità/recall:
+    - più bit per tabella: bucket più piccoli, meno candidati, ricerca più veloce, recall minore;
+    - più tabelle: più candidati, recall maggiore, ricerca più lenta.
+"""
+import numpy as np
+
+# Numero massimo di coppie (campione di test, candidato) elaborate per blocco nel riordino
+CANDIDATE_BLOCK_ELEMENTS = 1 << 22
+# Campioni di test considerati al massimo per blocco
+MAX_BLOCK_QUERIES = 4096
+MAX_BITS = 62
+
+
+class LSHIndex:
+    """
+    Indice LSH sui campioni di training di un modello KNN.
+
+    I codici di ogni tabella sono ordinati: i campioni di un bucket sono un intervallo contiguo
+    dell'ordinamento, trovato con una ricerca binaria (np.searchsorted) per ogni campione di test.
+    stats accumula il numero di campioni cercati, di candidati distinti riordinati e di ricerche
+    esatte di riserva.
+    """
+    def __init__(self, n_tables=8, n_bits=12, seed=0):
+        if n_tables < 1:
+            raise ValueError("Il numero di tabelle LSH deve essere almeno 1.")
+        if not 1 <= n_bits <= MAX_BITS:
+            raise ValueError(f"Il numero di bit per tabella deve essere compreso tra 1 e {MAX_BITS}.")
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.seed = seed
+        self.stats = {'queries': 0, 'candidates': 0, 'fallbacks': 0}
+        self._projection = None
+        self._threshold = None
+        self._order = None
+        self._sorted_codes = None
+        self._powers = np.left_shift(1, np.arange(n_bits, dtype=np.int64))
+
+    def fit(self, model):
+        """Costruisce le tabelle sui campioni di training del modello (letti a blocchi)."""
+        n_rows, n_features = model._x.shape
+        rng = np.random.default_rng(self.seed)
+        directions = rng.standard_normal((n_features, self.n_tables * self.n_bits))
+        if model._weights is not None:
+            # Proiezioni nello spazio scalato: la radice dei pesi è inclusa nelle direzioni
+            directions *= np.sqrt(model._weights)[:, None]
+        self._projection = directions.astype(model._dtype)
+        # Soglia di ogni proiezione: la proiezione di un campione di training scelto a caso, così
+        # i tagli si concentrano dove i dati sono più densi (es. la nuvola dei benigni)
+        anchors = rng.integers(0, max(n_rows, 1), self.n_tables * self.n_bits)
+        anchor_rows = np.asarray(model._x[anchors], dtype=model._dtype) if n_rows else \
+            np.zeros((len(anchors), n_features), dtype=model._dtype)
+        self._threshold = np.einsum('ij,ji->i', anchor_rows, self._projection)
+
+        codes = np.empty((self.n_tables, n_rows), dtype=np.int64)
+        for start, block in model._train_blocks():
+            codes[:, start:start + len(block)] = self._hash(block).T
+        self._order = np.argsort(codes, axis=1, kind='stable')
+        self._sorted_codes = np.take_along_axis(codes, self._order, axis=1)
+        return self
+
+    def add(self, x_block):
+        """
+        Inserisce nelle tabelle nuovi campioni (già preparati dal modello), accodati al training set.
+        Vengono calcolati solo i codici dei nuovi campioni, inseriti nell'ordinamento esistente
+        con una ricerca binaria: le tabelle non vengono ricostruite.
+        """
+        n_rows = self._order.shape[1]
+        codes = self._hash(x_block)
+        new_indices = np.arange(n_rows, n_rows + len(x_block))
+        order = np.empty((self.n_tables, n_rows + len(x_block)), dtype=self._order.dtype)
+        sorted_codes = np.empty(order.shape, dtype=np.int64)
+        for table in range(self.n_tables):
+            # A parità di codice i nuovi campioni (indici maggiori) vanno dopo quelli esistenti
+            new_order = np.argsort(codes[:, table], kind='stable')
+            table_codes = codes[new_order, table]
+            positions = np.searchsorted(self._sorted_codes[table], table_codes, side='right')
+            order[table] = np.insert(self._order[table], positions, new_indices[new_order])
+            sorted_codes[table] = np.insert(self._sorted_codes[table], positions, table_codes)
+        self._order, self._sorted_codes = order, sorted_codes
+
+    def remove(self, indices):
+        """
+        Elimina dalle tabelle i campioni indicati (indici crescenti e distinti) e rinumera gli altri
+        come nel training set compattato, senza ricalcolare i codici.
+        """
+        keep = ~np.isin(self._order, indices)
+        n_rows = self._order.shape[1] - len(indices)
+        order = self._order[keep].reshape(self.n_tables, n_rows)
+        self._order = order - np.searchsorted(indices, order)
+        self._sorted_codes = self._sorted_codes[keep].reshape(self.n_tables, n_rows)
+
+    def _hash(self, x_block):
+        """Codici dei campioni nelle tabelle: matrice (campioni x tabelle) di interi."""
+        bits = (x_block @ self._projection) > self._threshold
+        return bits.reshape(len(x_block), self.n_tables, self.n_bits) @ self._powers
+
+    def _bucket_ranges(self, x_test):
+        """Intervalli [inizio, fine) dei bucket di ogni campione di test nell'ordinamento di ogni tabella."""
+        codes = self._hash(x_test)
+        left = np.empty(codes.shape, dtype=np.intp)
+        right = np.empty(codes.shape, dtype=np.intp)
+        for table in range(self.n_tables):
+            left[:, table] = np.searchsorted(self._sorted_codes[table], codes[:, table], side='left')
+            right[:, table] = np.searchsorted(self._sorted_codes[table], codes[:, table], side='right')
+        return left, right - left
+
+    def candidate_blocks(self, x_test):
+        """
+        Candidati dei campioni di test (già preparati dal modello), a blocchi.
+
+        I campioni di test vengono ordinati per bucket della prima tabella, così un blocco contiene
+        campioni vicini che condividono gran parte dei candidati; il modello calcola le distanze
+        del blocco verso l'unione dei candidati con un unico prodotto matriciale.
+        Ogni blocco ha al più CANDIDATE_BLOCK_ELEMENTS coppie (campione di test, candidato).
+
+        Yields:
+            tuple: (indici dei campioni di test, indici crescenti dei candidati nel training set,
+            maschera booleana campioni x candidati, vera dove il candidato non è nei bucket del campione).
+        """
+        left, lengths = self._bucket_ranges(x_test)
+        order = np.argsort(left[:, 0], kind='stable')
+        cumulative = np.cumsum(lengths.sum(axis=1)[order])
+        start = 0
+        while start < len(order):
+            done = cumulative[start - 1] if start else 0
+            # Coppie dense del blocco: campioni x unione dei candidati <= campioni x candidati totali
+            window = cumulative[start:start + MAX_BLOCK_QUERIES] - done
+            sizes = np.arange(1, len(window) + 1) * window
+            end = start + max(1, int(np.searchsorted(sizes, CANDIDATE_BLOCK_ELEMENTS, side='right')))
+            rows = order[start:end]
+            start = end
+
+            block_lengths = lengths[rows].ravel()
+            total = int(block_lengths.sum())
+            if total == 0:
+                continue
+            offsets = np.cumsum(block_lengths) - block_lengths
+            positions = np.arange(total) - np.repeat(offsets - left[rows].ravel(), block_lengths)
+            tables = np.repeat(np.tile(np.arange(self.n_tables), len(rows)), block_lengths)
+            queries = np.repeat(np.arange(len(rows)).repeat(self.n_tables), block_lengths)
+            candidates, columns = np.unique(self._order[tables, positions], return_inverse=True)
+            outside = np.ones((len(rows), len(candidates)), dtype=bool)
+            outside[queries, columns] = False
+            self.stats['candidates'] += outside.size - int(np.count_nonzero(outside))
+            yield rows, candidates, outside
+
+    def record_queries(self, n_queries, n_fallbacks):
+        """Aggiorna le statistiche con le ricerche completate e quelle ripetute in modo esatto."""
+        self.stats['queries'] += n_queries
+        self.stats['fallbacks'] += n_fallbacks
+
+
+def recall_at_k(approximate_indices, exact_indices):
+    """Frazione media dei k vicini esatti trovati anche dalla ricerca approssimata."""
+    approximate_indices = np.asarray(approximate_indices)
+    exact_indices = np.asarray(exact_indices)
+    if exact_indices.size == 0:
+        return 1.0
+    found = (approximate_indices[:, :, None] == exact_indices[:, None, :]).any(axis=1)
+    return float(found.mean())
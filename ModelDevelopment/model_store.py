@@ -0,0 +1,168 @@
+"""
+Salvataggio e caricamento dei modelli KNN addestrati (KNN.save / KNN.load).
+
+Un modello è una cartella con:
+    - manifest.json: versione del formato, k, metrica, opzioni del modello, nomi delle feature
+      e l'elenco degli array salvati;
+    - un file .npy per ogni array: training set (già nello spazio di ricerca), etichette, norme,
+      stato della scalatura, della PCA e dell'indice LSH, indici dei prototipi;
+    - imputer.npz (facoltativo): le medie del MeanImputer usato nella pulizia dei dati.
+
+Gli array vengono riaperti con np.load(mmap_mode='r'): il caricamento non legge i dati,
+che vengono letti dal disco solo durante la ricerca dei vicini.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+
+from ModelDevelopment.lsh_index import LSHIndex
+from ModelDevelopment.neighbor_cache import NeighborCache
+from Preprocessing.imputer import MeanImputer
+from Preprocessing.pca import PCA
+from Preprocessing.scaling import FeatureScaler
+
+MODEL_FORMAT = 'knn-model'
+MODEL_FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+IMPUTER_NAME = 'imputer.npz'
+
+
+def _model_arrays(model):
+    """Array da salvare del modello, per nome (solo quelli presenti)."""
+    arrays = {'x': model._x, 'y': model._y, 'x_sq_norms': model._x_sq_norms, 'classes': model._classes}
+    if model._weights is not None:
+        arrays['weights'] = model._weights
+    if model.scaler is not None:
+        arrays['scaler_offset'] = model.scaler.offset
+        arrays['scaler_scale'] = model.scaler.scale
+    if model.pca is not None:
+        arrays['pca_mean'] = model.pca.mean
+        arrays['pca_components'] = model.pca.components
+        arrays['pca_explained_variance_ratio'] = model.pca.explained_variance_ratio
+        if model.pca.scale is not None:
+            arrays['pca_scale'] = model.pca.scale
+    if model.prototype_indices is not None:
+        arrays['prototype_indices'] = model.prototype_indices
+    if model.lsh is not None:
+        arrays['lsh_projection'] = model.lsh._projection
+        arrays['lsh_threshold'] = model.lsh._threshold
+        arrays['lsh_order'] = model.lsh._order
+        arrays['lsh_sorted_codes'] = model.lsh._sorted_codes
+    return arrays
+
+
+def save_model(model, path, imputer=None):
+    """
+    Salva il modello nella cartella path (sostituendo un eventuale modello già presente).
+    La cartella viene scritta accanto con un nome temporaneo e rinominata solo a scrittura completata.
+    """
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+    try:
+        arrays = _model_arrays(model)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(array))
+        if imputer is not None:
+            imputer.save(os.path.join(tmp_path, IMPUTER_NAME))
+        manifest = {
+            'format': MODEL_FORMAT,
+            'version': MODEL_FORMAT_VERSION,
+            'k': model.k,
+            'metric': 'euclidean' if model._weights is None else 'weighted_euclidean',
+            'options': model.options,
+            'dtype': np.dtype(model._dtype).name,
+            'n_samples': int(len(model._x)),
+            'n_train_samples': int(model.n_train_samples),
+            'feature_names': model.feature_names,
+            'scaling': model.scaler.method if model.scaler is not None else None,
+            'lsh': {'n_tables': model.lsh.n_tables, 'n_bits': model.lsh.n_bits, 'seed': model.lsh.seed}
+            if model.lsh is not None else None,
+            'arrays': sorted(arrays),
+            'imputer': imputer is not None
+        }
+        with open(os.path.join(tmp_path, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+        # Sostituzione: il vecchio modello viene eliminato solo dopo che il nuovo è al suo posto
+        old_path = f"{path}.old"
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        if os.path.exists(old_path):
+            shutil.rmtree(old_path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return path
+
+
+def read_manifest(path):
+    """Legge e verifica il manifest di un modello salvato."""
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"Nessun modello KNN salvato in '{path}' (manca {MANIFEST_NAME}).")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != MODEL_FORMAT:
+        raise ValueError(f"'{path}' non contiene un modello KNN.")
+    if manifest.get('version') != MODEL_FORMAT_VERSION:
+        raise ValueError(f"Versione del modello non supportata: {manifest.get('version')} "
+                         f"(supportata: {MODEL_FORMAT_VERSION}).")
+    return manifest
+
+
+def load_model(cls, path, mmap=True):
+    """
+    Ricostruisce un modello salvato con save_model senza riaddestrarlo.
+    Con mmap=True gli array vengono aperti in memory mapping (sola lettura): il caricamento
+    richiede pochi millisecondi indipendentemente dalle dimensioni del training set.
+    """
+    manifest = read_manifest(path)
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None)
+              for name in manifest['arrays']}
+
+    model = object.__new__(cls)
+    model.k = manifest['k']
+    model.options = manifest['options']
+    model.feature_names = manifest['feature_names']
+    model._dtype = np.dtype(manifest['dtype']).type
+    model._x, model._y, model._x_sq_norms = arrays['x'], arrays['y'], arrays['x_sq_norms']
+    model.x_train, model.y_train = model._x, model._y
+    model._classes = np.asarray(arrays['classes'])
+    model._weights = np.asarray(arrays['weights']) if 'weights' in arrays else None
+    model.n_train_samples = manifest['n_train_samples']
+    model.prototype_indices = arrays.get('prototype_indices')
+
+    model.scaler = None
+    if manifest['scaling'] is not None:
+        model.scaler = FeatureScaler(manifest['scaling'])
+        model.scaler.offset = np.asarray(arrays['scaler_offset'])
+        model.scaler.scale = np.asarray(arrays['scaler_scale'])
+
+    model.pca = None
+    if 'pca_components' in arrays:
+        model.pca = PCA(n_components=len(arrays['pca_components']))
+        model.pca.mean = np.asarray(arrays['pca_mean'])
+        model.pca.components = np.asarray(arrays['pca_components'])
+        model.pca.explained_variance_ratio = np.asarray(arrays['pca_explained_variance_ratio'])
+        model.pca.scale = np.asarray(arrays['pca_scale']) if 'pca_scale' in arrays else None
+        model.pca._projection = model.pca.components.T if model.pca.scale is None \
+            else model.pca.components.T / model.pca.scale[:, None]
+
+    model.lsh = None
+    if manifest['lsh'] is not None:
+        model.lsh = LSHIndex(**manifest['lsh'])
+        model.lsh._projection = np.asarray(arrays['lsh_projection'])
+        model.lsh._threshold = np.asarray(arrays['lsh_threshold'])
+        model.lsh._order = arrays['lsh_order']
+        model.lsh._sorted_codes = arrays['lsh_sorted_codes']
+
+    model._x_buffer = model._y_buffer = model._norms_buffer = None
+    model._version = 0
+    model._cache = NeighborCache(model.options['cache_size']) if 'cache_size' in model.options else None
+    model.imputer = MeanImputer.load(os.path.join(path, IMPUTER_NAME)) if manifest['imputer'] else None
+    return model
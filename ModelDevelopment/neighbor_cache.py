@@ -0,0 +1,53 @@
+import collections
+
+
+class NeighborCache:
+    """
+    Cache LRU limitata dei risultati della ricerca dei vicini (KNN, opzione cache_size).
+
+    La chiave è formata dai byte della riga di query (già nello spazio di ricerca del modello),
+    da k e dalla versione dei dati di training del modello; il valore contiene gli indici e le
+    distanze dei vicini e il risultato del voto. Metrica e preprocessing sono fissati dal modello
+    a cui la cache appartiene. Quando la cache è piena viene eliminata la voce usata meno di recente.
+
+    stats conta hit, miss, eliminazioni (evictions) e invalidazioni (svuotamenti dovuti a
+    modifiche del training set).
+    """
+    def __init__(self, max_entries=10_000):
+        if max_entries < 1:
+            raise ValueError("La dimensione della cache deve essere almeno 1.")
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Restituisce il valore associato alla chiave (segnandolo come usato di recente) o None."""
+        value = self._entries.get(key)
+        if value is None:
+            self.stats['misses'] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def clear(self):
+        """Svuota la cache (ad esempio dopo una modifica del training set)."""
+        if self._entries:
+            self._entries.clear()
+        self.stats['invalidations'] += 1
+
+    def info(self):
+        """Contatori correnti, con numero di voci e tasso di hit."""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return dict(self.stats, size=len(self._entries), max_entries=self.max_entries,
+                    hit_rate=self.stats['hits'] / lookups if lookups else 0.0)
@@ -0,0 +1,102 @@
+"""
+Selezione di prototipi: riduce il training set del KNN a un sottoinsieme di campioni che
+classifica (quasi) allo stesso modo, così la ricerca dei vicini in inferenza è più veloce.
+
+- 'enn' (Edited Nearest Neighbors, Wilson): elimina i campioni la cui classe non coincide con
+  il voto dei loro vicini (rumore e punti sovrapposti tra le classi).
+- 'cnn' (Condensed Nearest Neighbors, Hart): tiene solo i campioni necessari perché la regola 1-NN
+  classifichi correttamente tutto il training set; i punti lontani dal confine tra le classi
+  (la maggior parte dei benigni) vengono scartati.
+- 'enn_cnn': prima 'enn', poi 'cnn' sui campioni rimasti.
+
+Le distanze sono quelle del modello KNN (stessa PCA e scalatura) e vengono calcolate a blocchi
+con la ricerca vettorizzata del KNN.
+"""
+import numpy as np
+
+PROTOTYPE_METHODS = ('enn', 'cnn', 'enn_cnn')
+# Vicini usati dalla regola di editing di Wilson
+ENN_NEIGHBORS = 3
+# Campioni classificati insieme a ogni passo della condensazione
+CNN_BATCH_ROWS = 1024
+# Campioni del training set interrogati per blocco durante l'editing
+QUERY_BLOCK_ROWS = 1 << 14
+
+
+def _training_rows(model, indices):
+    """Righe del training set del modello (già nello spazio di ricerca) con le rispettive norme."""
+    return np.asarray(model._x[indices], dtype=model._dtype), model._x_sq_norms[indices]
+
+
+def edited_indices(model, n_neighbors=ENN_NEIGHBORS):
+    """
+    Indici dei campioni che superano l'editing di Wilson: ogni campione viene classificato
+    con i suoi n_neighbors vicini (escluso sé stesso) e viene tenuto solo se il voto è corretto.
+    """
+    n_rows = len(model._x)
+    keep = np.zeros(n_rows, dtype=bool)
+    for start in range(0, n_rows, QUERY_BLOCK_ROWS):
+        rows = np.arange(start, min(start + QUERY_BLOCK_ROWS, n_rows))
+        neighbors, _ = model._search(*_training_rows(model, rows), n_neighbors + 1)
+        # Si esclude il campione stesso; se non compare (duplicati con indice minore) si scarta l'ultimo vicino
+        not_self = neighbors != rows[:, None]
+        order = np.argsort(~not_self, axis=1, kind='stable')[:, :neighbors.shape[1] - 1]
+        neighbors = np.take_along_axis(neighbors, order, axis=1)
+        keep[rows] = model._vote(model._y[neighbors]) == model._y[rows]
+    return np.flatnonzero(keep)
+
+
+def condensed_indices(model, batch_rows=CNN_BATCH_ROWS):
+    """
+    Indici dei prototipi della condensazione di Hart, in versione a blocchi.
+
+    Si parte da un campione per classe; a ogni passo un blocco di campioni non ancora scelti
+    viene classificato con la regola 1-NN sui prototipi correnti e quelli classificati male
+    vengono aggiunti tutti insieme. I passaggi sul training set si ripetono finché nessun
+    campione viene più aggiunto (tutti i campioni sono classificati correttamente dai prototipi).
+    """
+    n_rows = len(model._x)
+    selected = np.zeros(n_rows, dtype=bool)
+    selected[np.unique(model._y, return_index=True)[1]] = True
+    changed = True
+    while changed:
+        changed = False
+        start = 0
+        while start < n_rows:
+            # Il blocco cresce con i prototipi: all'inizio pochi campioni alla volta, come nella
+            # versione sequenziale, così non si aggiungono errori che i nuovi prototipi correggerebbero
+            n_selected = int(selected.sum())
+            block = min(batch_rows, max(1, n_selected))
+            rows = start + np.flatnonzero(~selected[start:start + block])
+            start += block
+            if len(rows) == 0:
+                continue
+            prototypes = model.subset(np.flatnonzero(selected))
+            nearest, _ = prototypes._search(*_training_rows(model, rows), 1)
+            wrong = prototypes._y[nearest[:, 0]] != model._y[rows]
+            if wrong.any():
+                selected[rows[wrong]] = True
+                changed = True
+    return np.flatnonzero(selected)
+
+
+def select_prototypes(model, method):
+    """
+    Indici (crescenti) del training set del modello da tenere come prototipi.
+
+    Args:
+        model (KNN): Modello addestrato sull'intero training set.
+        method (str): Uno tra PROTOTYPE_METHODS.
+    """
+    if method not in PROTOTYPE_METHODS:
+        raise ValueError(f"Metodo di selezione dei prototipi non valido: {method}. "
+                         f"Usare uno tra {PROTOTYPE_METHODS}.")
+    indices = np.arange(len(model._x))
+    if method in ('enn', 'enn_cnn'):
+        edited = edited_indices(model)
+        # Se l'editing eliminasse un'intera classe si tiene il training set originale
+        if len(np.unique(model._y[edited])) == len(model._classes):
+            indices = edited
+    if method in ('cnn', 'enn_cnn'):
+        indices = indices[condensed_indices(model.subset(indices))]
+    return indices
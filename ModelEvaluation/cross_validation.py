@@ -1,11 +1,21 @@
+import functools
 import time
 import random
 
+import numpy as np
+
+from Monitoring.timing import TIMER, timed
 from ModelDevelopment.knn_scratch import KNN
+from ModelEvaluation.parallel import map_runs
 from ModelEvaluation.results_handler import KFoldResultsHandler
+from ModelEvaluation.results_store import dataset_fingerprint, run_config
+from ModelEvaluation.raw_predictions import MemmapRunPredictions
+from ModelEvaluation.run_journal import RunJournal, restore_random_state
+from Preprocessing.dataset import as_arrays
 from .metrics import calculate_metrics
 
 
+@timed('data.split')
 def k_fold_split(X, Y, k_folds=5):
     """
     Suddivide i dati in k fold per la K-Fold Cross Validation standard.
@@ -13,14 +23,16 @@ def k_fold_split(X, Y, k_folds=5):
     vengono usati come set di addestramento.
 
     Args:
-        X (list): Lista di feature.
-        Y (list): Lista di label.
+        X: Feature (Dataset, array numpy, DataFrame o lista di liste).
+        Y: Label (array, Series o lista; ignorato se X è un Dataset).
         k_folds (int): Numero di fold.
 
     Returns:
         list: Una lista di tuple. Ogni tupla rappresenta un fold e contiene
               (X_train, Y_train, X_test, Y_test).
     """
+    X, Y = as_arrays(X, Y)
+
     # 1. Creazione e mescolamento degli indici
     # Crea una lista di indici da 0 alla lunghezza del dataset.
     indices = list(range(len(X)))
@@ -52,11 +64,9 @@ def k_fold_split(X, Y, k_folds=5):
         train_indices = indices[:test_start] + indices[test_end:]
 
         # 6. Creazione dei set di dati
-        # Usa gli indici per creare i set di dati di training e test.
-        X_train = [X[j] for j in train_indices]
-        Y_train = [Y[j] for j in train_indices]
-        X_test = [X[j] for j in test_indices]
-        Y_test = [Y[j] for j in test_indices]
+        # Usa gli indici per estrarre le righe di training e test con un'unica indicizzazione degli array.
+        X_train, Y_train = X[train_indices], Y[train_indices]
+        X_test, Y_test = X[test_indices], Y[test_indices]
 
         # 7. Aggiunta del fold alla lista
         # Aggiunge la tupla con i dati del fold corrente alla lista dei folds.
@@ -66,79 +76,134 @@ def k_fold_split(X, Y, k_folds=5):
     return folds
 
 
-def evaluate_kfold(X, Y, knn_model_class, k_neighbors, k_folds=5):
+def evaluate_split(knn_model_class, k_neighbors, knn_options, split):
+    """
+    Addestra un modello sulla parte di training di uno split e lo valuta sulla parte di test.
+    split è una tupla (X_train, Y_train, X_test, Y_test); restituisce (y_pred, y_pred_proba, metriche, durata).
+    """
+    X_train, Y_train, X_test, Y_test = split
+    start = time.perf_counter()
+
+    # Crea e addestra un nuovo modello KNN per questo specifico split.
+    knn_model = knn_model_class(X_train, Y_train, k_neighbors, **(knn_options or {}))
+
+    # Esegue le predizioni sul set di test (classi e probabilità con un'unica ricerca dei vicini).
+    y_pred, y_pred_proba = knn_model.test_with_proba(X_test)
+
+    # Calcola le metriche di performance.
+    metrics = calculate_metrics(Y_test, y_pred, y_pred_proba)
+    return y_pred, y_pred_proba, metrics, time.perf_counter() - start
+
+
+def evaluate_kfold(X, Y, knn_model_class, k_neighbors, k_folds=5, raw_data_store=None, knn_options=None, n_jobs=1,
+                   journal=None):
     """
     Esegue una validazione K-Fold sull'intero dataset.
     1. Suddivide l'INTERO dataset in K parti (fold).
     2. Per ogni iterazione (fold), usa 1 parte come Test Set e le restanti K-1 come Training Set.
     3. Calcola le metriche per ognuno dei K esperimenti e le restituisce.
+
+    Se raw_data_store (es. MemmapRunPredictions) è fornito, le predizioni grezze di ogni fold
+    vengono scritte lì invece di essere accumulate in memoria in una lista.
+    knn_options (es. {'pca': 0.95, 'scaling': 'standard'}) viene passato al costruttore del modello di ogni fold,
+    che lo applica ai soli dati di training del fold.
+    Con n_jobs > 1 i fold vengono valutati in parallelo (vedi ModelEvaluation.parallel.map_runs).
+    Se journal (RunJournal) è fornito, i fold già registrati non vengono rivalutati e ogni nuovo fold
+    completato vi viene aggiunto (metriche, durata e riga delle predizioni grezze in raw_data_store).
     """
     # 1. PREPARAZIONE PER LA K-FOLD CROSS VALIDATION
     # Suddivide l'intero dataset (X, Y) in 'k' fold.
     # Questo assicura che ogni singolo esempio del dataset venga usato esattamente una volta per il test.
     folds = k_fold_split(X, Y, k_folds)
-    all_fold_metrics = []
-    all_fold_raw_data = []
+    completed = journal.runs if journal is not None else []
+    all_fold_metrics = [run['metrics'] for run in completed]
+    all_fold_raw_data = [] if raw_data_store is None else raw_data_store
+    all_fold_durations = [run['duration'] for run in completed]
 
     print(f"\n{'=' * 60}")
     print(f"INIZIO K-FOLD CROSS VALIDATION (k={k_folds})")
     print(f"Totale campioni nel dataset: {len(X)}")
     print(f"{'=' * 60}\n")
+    if completed:
+        print(f"  Fold già completati (dal journal): {len(completed)}/{k_folds}")
 
     # 2. ESECUZIONE DELLA K-FOLD CROSS VALIDATION
     # Itera su ogni fold. A ogni iterazione, un fold diverso viene usato come test set
     # e i restanti k-1 fold vengono usati come training set.
-    for fold_num, (X_train_fold, Y_train_fold, X_test_fold, Y_test_fold) in enumerate(folds, 1):
+    evaluate = functools.partial(evaluate_split, knn_model_class, k_neighbors, knn_options)
+    pending = folds[len(completed):]
+    for fold_num, (fold, result) in enumerate(zip(pending, map_runs(evaluate, pending, n_jobs)), len(completed) + 1):
+        X_train_fold, Y_train_fold, X_test_fold, Y_test_fold = fold
+        y_pred, y_pred_proba, fold_metrics, duration = result
         print(f"  - Esperimento {fold_num}/{k_folds}")
         print(f"    Training samples: {len(X_train_fold)} | Test samples: {len(X_test_fold)}")
 
-        # Crea e addestra un nuovo modello KNN per questo specifico fold.
-        knn_model = knn_model_class(X_train_fold, Y_train_fold, k_neighbors)
-
-        # Esegue le predizioni sul set di test del fold corrente.
-        y_pred = knn_model.test(X_test_fold)
-        y_pred_proba = knn_model.test_proba(X_test_fold)
-
-        # Calcola le metriche di performance per questo fold.
-        fold_metrics = calculate_metrics(Y_test_fold, y_pred, y_pred_proba)
-
         # Aggiunge le metriche del fold alla lista complessiva.
         all_fold_metrics.append(fold_metrics)
+        all_fold_durations.append(duration)
 
         # Salva i dati grezzi per i plot specifici del fold
-        all_fold_raw_data.append({
-            'y_true': Y_test_fold,
-            'y_pred': y_pred,
-            'y_pred_proba': y_pred_proba
-        })
+        if raw_data_store is None:
+            all_fold_raw_data.append({
+                'y_true': Y_test_fold,
+                'y_pred': y_pred,
+                'y_pred_proba': y_pred_proba
+            })
+        else:
+            raw_data_store.append(Y_test_fold, y_pred, y_pred_proba)
+
+        # Registra il fold nel journal solo dopo che le sue predizioni grezze sono su disco
+        if journal is not None:
+            raw_pointer = None
+            if raw_data_store is not None:
+                raw_data_store.flush()
+                raw_pointer = {'row': len(raw_data_store) - 1, 'length': len(Y_test_fold)}
+            journal.record_run(fold_num - 1, fold_metrics, duration, raw_pointer)
 
     print("\nK-Fold Cross Validation completata.")
 
     # 3. RESTITUZIONE DEI RISULTATI
-    # Ritorna un dizionario contenente solo la lista delle metriche per ogni fold.
+    # Ritorna un dizionario con le metriche, i dati grezzi e la durata di ogni fold.
     return {
         "all_fold_metrics": all_fold_metrics,
-        "all_fold_raw_data": all_fold_raw_data
+        "all_fold_raw_data": all_fold_raw_data,
+        "all_fold_durations": all_fold_durations
     }
 
 
-def find_optimal_k(X, Y, k_range=range(1, 21), k_folds=5):
+def _fold_accuracy(k, knn_options, fold):
+    """Accuratezza del modello KNN con k vicini su un fold (X_train, Y_train, X_test, Y_test)."""
+    X_train, Y_train, X_test, Y_test = fold
+    knn = KNN(X_train, Y_train, k, **(knn_options or {}))
+    y_pred = knn.test(X_test)
+    return np.mean(np.asarray(y_pred) == Y_test)
+
+
+@timed('knn.k_search')
+def find_optimal_k(X, Y, k_range=range(1, 21), k_folds=5, knn_options=None, n_jobs=1, cache=None):
     """
     Trova il valore ottimale di k per KNN usando K-Fold Cross Validation.
     Testa diversi valori di k e restituisce quello con la migliore accuratezza media.
 
     Args:
-        X: Features (DataFrame o lista di liste)
-        Y: Target (Series o lista)
+        X: Features (Dataset, DataFrame, array numpy o lista di liste)
+        Y: Target (Series, array o lista; ignorato se X è un Dataset)
         k_range: Range di valori di k da testare (default: 1-20)
         k_folds: Numero di fold per la cross-validation (default: 5)
+        knn_options: Opzioni aggiuntive del modello KNN (es. {'pca': 0.95, 'scaling': 'standard'})
+        n_jobs: Fold valutati in parallelo per ogni k (default: 1, sequenziale)
+        cache: OptimalKCache opzionale; i k già valutati sullo stesso dataset (stessi fold e opzioni)
+               non vengono ricalcolati e i nuovi punteggi vi vengono aggiunti
 
     Returns:
         int: Il valore ottimale di k
     """
-    # Assicura che i dati siano in formato lista
-    X_data = X.values.tolist() if hasattr(X, 'values') else X
-    Y_data = Y.values.tolist() if hasattr(Y, 'values') else Y
+    fingerprint = dataset_fingerprint(X, Y) if cache is not None else None
+    cached_scores = cache.scores(fingerprint, k_folds, knn_options) if cache is not None else {}
+    new_scores = {}
+
+    # Feature e target come array numpy (senza copia se X è un Dataset)
+    X_data, Y_data = as_arrays(X, Y)
 
     best_k = 1
     best_accuracy = 0.0
@@ -153,56 +218,111 @@ def find_optimal_k(X, Y, k_range=range(1, 21), k_folds=5):
         if k >= max_train_size:
             break
 
-        # Suddividi i dati in fold
-        folds = k_fold_split(X_data, Y_data, k_folds)
-        fold_accuracies = []
-
-        for X_train, Y_train, X_test, Y_test in folds:
-            # Crea e testa il modello KNN
-            knn = KNN(X_train, Y_train, k)
-            y_pred = knn.test(X_test)
+        if k in cached_scores:
+            # Punteggio già calcolato in una ricerca precedente sullo stesso dataset
+            mean_accuracy = cached_scores[k]
+        else:
+            # Suddividi i dati in fold
+            folds = k_fold_split(X_data, Y_data, k_folds)
 
-            # Calcola l'accuratezza per questo fold
-            accuracy = sum(1 for pred, true in zip(y_pred, Y_test) if pred == true) / len(Y_test)
-            fold_accuracies.append(accuracy)
+            # Crea e testa il modello KNN su ogni fold e ne calcola l'accuratezza
+            fold_accuracies = list(map_runs(functools.partial(_fold_accuracy, k, knn_options), folds, n_jobs))
 
-        # Calcola l'accuratezza media su tutti i fold
-        mean_accuracy = sum(fold_accuracies) / len(fold_accuracies)
+            # Calcola l'accuratezza media su tutti i fold
+            mean_accuracy = sum(fold_accuracies) / len(fold_accuracies)
+            new_scores[k] = mean_accuracy
 
         if mean_accuracy > best_accuracy:
             best_accuracy = mean_accuracy
             best_k = k
 
+    if cache is not None and new_scores:
+        cache.update(fingerprint, k_folds, knn_options, new_scores)
+    elif cache is not None:
+        print("Punteggi di tutti i k già presenti nella cache: nessun ricalcolo.")
+
     print(f"K ottimale trovato: {best_k} (Accuratezza media: {best_accuracy:.2%})")
     return best_k
 
 
-def kfold_validation(X, Y, k, K_folds):
+def kfold_validation(X, Y, k, K_folds, plots=True, results_store=None, knn_options=None, n_jobs=1,
+                     checkpoint_dir=None, resume=False):
     """
     Esegue il workflow completo di validazione K-Fold.
 
     Args:
-        X: Features (DataFrame o lista di liste)
-        Y: Target (Series o lista)
+        X: Features (Dataset, DataFrame, array numpy o lista di liste)
+        Y: Target (Series, array o lista; ignorato se X è un Dataset)
         k: Numero di vicini per KNN
         K_folds: Numero di fold
+        plots: Se False salva solo le metriche, senza generare grafici
+        results_store: Archivio SQLite opzionale in cui registrare l'esecuzione
+        knn_options: Opzioni aggiuntive del modello KNN (es. {'pca': 0.95, 'scaling': 'standard'})
+        n_jobs: Fold valutati in parallelo (default: 1, sequenziale)
+        checkpoint_dir: Cartella del journal (RunJournal) in cui registrare ogni fold completato
+        resume: Se True riprende l'esecuzione interrotta con la stessa configurazione dal journal in checkpoint_dir
     """
-    # Assicura che i dati siano in formato lista
-    X_data = X.values.tolist() if hasattr(X, 'values') else X
-    Y_data = Y.values.tolist() if hasattr(Y, 'values') else Y
+    start_time = time.perf_counter()
+    timer_snapshot = TIMER.snapshot()
 
-    results = evaluate_kfold(X_data, Y_data, KNN, k, K_folds)
+    config = run_config({'k': k, 'k_folds': K_folds}, knn_options)
+    fingerprint = dataset_fingerprint(X, Y) if results_store is not None or checkpoint_dir is not None else None
+
+    # Feature e target come array numpy (senza copia se X è un Dataset)
+    X_data, Y_data = as_arrays(X, Y)
 
     # Crea un prefisso unico per i file di output di questa esecuzione
     timestamp = time.strftime("%Y%m%d_%H%M%S")
     prefix = f"kfold_k={k}_folds={K_folds}_{timestamp}"
 
+    # Le predizioni grezze di ogni fold vengono scritte su un memmap preallocato.
+    # L'ultimo fold è il più grande: prende anche i campioni residui della divisione.
+    max_fold_size = len(X_data) - (len(X_data) // K_folds) * (K_folds - 1)
+    journal = None
+    if checkpoint_dir is None:
+        raw_data_store = MemmapRunPredictions(K_folds, max_fold_size)
+    else:
+        # Una ripresa usa il prefisso e lo stato di random dell'esecuzione originale:
+        # k_fold_split produce gli stessi fold e i file di output sono quelli di un'esecuzione senza interruzioni.
+        journal = RunJournal.for_run(checkpoint_dir, 'kfold', config, fingerprint)
+        header = journal.begin({'prefix': prefix, 'raw_shape': [K_folds, max_fold_size],
+                                'random_state': random.getstate()}, resume=resume)
+        prefix = header['prefix']
+        restore_random_state(header['random_state'])
+        lengths = [run['raw']['length'] for run in journal.runs] if journal.runs else None
+        raw_data_store = MemmapRunPredictions(K_folds, max_fold_size, directory=journal.raw_directory, lengths=lengths)
+
+    results = evaluate_kfold(X_data, Y_data, KNN, k, K_folds, raw_data_store=raw_data_store, knn_options=knn_options,
+                             n_jobs=n_jobs, journal=journal)
+    end_time = time.perf_counter()
+
+    # Informazioni sull'esecuzione per il database dei risultati
+    run_info = None
+    if results_store is not None:
+        run_info = {
+            'method': 'kfold',
+            'config': config,
+            'dataset_fingerprint': fingerprint,
+            'run_durations': results['all_fold_durations'],
+            # Tempi per fase (Monitoring.timing) più durata complessiva
+            'timings': dict(TIMER.since(timer_snapshot)['seconds'], evaluation=end_time - start_time,
+                            total=end_time - start_time)
+        }
+
     handler = KFoldResultsHandler(
         all_fold_metrics=results['all_fold_metrics'],
         all_fold_raw_data=results['all_fold_raw_data'],
         filename_prefix=prefix,
         y_true_all=results.get('y_true'),
         y_pred_all=results.get('y_pred'),
-        y_pred_proba_all=results.get('y_pred_proba')
+        y_pred_proba_all=results.get('y_pred_proba'),
+        plots=plots,
+        results_store=results_store,
+        run_info=run_info,
+        timer_snapshot=timer_snapshot
     )
-    handler.save_results()
\ No newline at end of file
+    handler.save_results()
+    raw_data_store.close()
+    if journal is not None:
+        # Esecuzione completata: il journal e le predizioni grezze non servono più
+        journal.discard()
@@ -1,126 +1,127 @@
 import time
 import random
-from collections import defaultdict
+
+import numpy as np
+
+from Monitoring.timing import TIMER
 from ModelDevelopment.knn_scratch import KNN
 from ModelEvaluation.metrics import calculate_metrics
 from ModelEvaluation.results_handler import HoldoutResultsHandler
+from ModelEvaluation.results_store import dataset_fingerprint, run_config
+from Preprocessing.dataset import as_arrays
 
 
-def holdout_validation(X, Y, k, test_perc):
+def holdout_validation(X, Y, k, test_perc, plots=True, results_store=None, knn_options=None):
     """
     Esegue il workflow completo di validazione Holdout.
 
     Args:
-        X: Features (DataFrame o lista di liste)
-        Y: Target (Series o lista)
+        X: Features (Dataset, DataFrame, array numpy o lista di liste)
+        Y: Target (Series, array o lista; ignorato se X è un Dataset)
         k: Numero di vicini per KNN
         test_perc: Percentuale del test set (0.0 - 1.0)
+        plots: Se False salva solo le metriche, senza generare grafici
+        results_store: Archivio SQLite opzionale in cui registrare l'esecuzione
+        knn_options: Opzioni aggiuntive del modello KNN (es. {'pca': 0.95, 'scaling': 'standard'})
 
     Returns:
         None
     """
 
-    # Assicura che i dati siano in formato lista (se passati come DataFrame/Series da pandas)
-    X_data = X.values.tolist() if hasattr(X, 'values') else X
-    Y_data = Y.values.tolist() if hasattr(Y, 'values') else Y
+    start_time = time.perf_counter()
+    timer_snapshot = TIMER.snapshot()
+
+    # Feature e target come array numpy (senza copia se X è un Dataset)
+    X_data, Y_data = as_arrays(X, Y)
     random.seed(50)
-    # Inizializza un dizionario speciale (defaultdict)
-    # Un defaultdict(list) si comporta come un dizionario normale, ma se si tenta di accedere a una chiave che non esiste, la crea automaticamente con una lista vuota come valore.
-    # Questo è utile per evitare di dover controllare ogni volta se una chiave (la classe) è già presente nel dizionario prima di aggiungere un elemento.
-    indices_by_class = defaultdict(list)
-
-    # Raggruppa gli indici dei dati per classe
-    # Itera su tutta la lista delle etichette (Y), tenendo traccia sia dell'indice (i) che del valore dell'etichetta (label) per ogni campione.
-    for i, label in enumerate(Y_data):
-        # Usa l'etichetta (0 per 'Benigno', 1 per 'Maligno') come chiave del dizionario
-        # e aggiunge l'indice (la posizione) del campione a quella lista.
-        # Alla fine di questo ciclo, avremo un dizionario simile a questo:
-        # {
-        #    0: [0, 2, 5, ...],  <-- Tutti gli indici dei campioni benigni
-        #    1: [1, 3, 4, ...]   <-- Tutti gli indici dei campioni maligni
-        # }
-        indices_by_class[label].append(i)
-
-    X_train, Y_train, X_test, Y_test = [], [], [], []
+
+    # Raggruppa gli indici dei dati per classe, nell'ordine in cui le classi compaiono nel dataset.
+    # Alla fine avremo per ogni classe la lista dei suoi indici, ad esempio:
+    #    0: [0, 2, 5, ...],  <-- Tutti gli indici dei campioni benigni
+    #    1: [1, 3, 4, ...]   <-- Tutti gli indici dei campioni maligni
+    classes, first_index = np.unique(Y_data, return_index=True)
+    ordered_classes = classes[np.argsort(first_index)]
+
+    train_indices, test_indices = [], []
 
     # Suddivisione stratificata per ogni classe
     # Itera su ogni classe (0 e 1) e sulla lista di indici corrispondenti.
-    for label, indices in indices_by_class.items():
+    for label in ordered_classes:
+        indices = np.flatnonzero(Y_data == label).tolist()
         # Mescola gli indici di quella classe per garantire una selezione casuale.
         random.shuffle(indices)
         # Calcola il numero di campioni da destinare al test set per questa classe.
         n_test = int(len(indices) * test_perc)
-        # Seleziona gli indici per il test set.
-        test_indices = indices[:n_test]
-        # I restanti indici sono per il training set.
-        train_indices = indices[n_test:]
-
-        # Popolamento dei set di training e test
-        for i in train_indices:
-            X_train.append(X_data[i])
-            Y_train.append(Y_data[i])
-        for i in test_indices:
-            X_test.append(X_data[i])
-            Y_test.append(Y_data[i])
-
-    # Mescolamento finale dei dati (Training)
-    # Poiché i dati sono stati aggiunti classe per classe, ora sono ordinati (es. tutti i benigni, poi tutti i maligni).
+        # I primi n_test indici vanno al test set, i restanti al training set.
+        test_indices.extend(indices[:n_test])
+        train_indices.extend(indices[n_test:])
+
+    # Mescolamento finale degli indici
+    # Poiché gli indici sono stati aggiunti classe per classe, ora sono ordinati (es. tutti i benigni, poi tutti i maligni).
     # È buona pratica mescolarli per evitare che l'ordine influenzi l'addestramento del modello.
+    random.shuffle(train_indices)
+    random.shuffle(test_indices)
 
-    # Combina le feature e le etichette di training in coppie.
-    train_combined = list(zip(X_train, Y_train))
-    # Mescola le coppie.
-    random.shuffle(train_combined)
-    # Separa nuovamente le feature e le etichette, ora mescolate.
-    # Il controllo 'if train_combined' evita errori se il set di training è vuoto.
-    if train_combined:
-        # UTILIZZO l'asterisco per passare a zip le chiavi e i valori di train_combined invece che l'oggetto in se
-        X_train_tup, Y_train_tup = zip(*train_combined)
-        X_train = list(X_train_tup)
-        Y_train = list(Y_train_tup)
-    else:
-        X_train, Y_train = [], []
-
-    # Mescolamento finale dei dati (Test)
-    # Esegue la stessa operazione di mescolamento per il test set.
-    test_combined = list(zip(X_test, Y_test))
-    random.shuffle(test_combined)
-    if test_combined:
-        X_test_tup, Y_test_tup = zip(*test_combined)
-        X_test = list(X_test_tup)
-        Y_test = list(Y_test_tup)
-    else:
-        X_test, Y_test = [], []
+    # Estrae le righe di training e test con un'unica indicizzazione degli array
+    X_train, Y_train = X_data[train_indices], Y_data[train_indices]
+    X_test, Y_test = X_data[test_indices], Y_data[test_indices]
 
     print(f"\n--- Divisione Holdout ({int((1-test_perc)*100)}/{int(test_perc*100)}) ---")
     print(f"Dimensioni Training Set: {len(X_train)} campioni")
     print(f"Dimensioni Test Set: {len(X_test)} campioni")
     print("------------------------------------")
 
+    split_time = time.perf_counter()
+
     # Addestramento
     print("\nAddestramento del modello KNN...")
-    knn_model = KNN(X_train, Y_train, k)
+    knn_model = KNN(X_train, Y_train, k, **(knn_options or {}))
     print("Addestramento completato.")
 
     # Valutazione
     print("\nValutazione del modello sul Test Set...")
-    y_pred = knn_model.test(X_test)
-    y_pred_proba = knn_model.test_proba(X_test)
+    # Classi e probabilità con un'unica ricerca dei vicini
+    y_pred, y_pred_proba = knn_model.test_with_proba(X_test)
+    y_pred, y_pred_proba = y_pred.tolist(), y_pred_proba.tolist()
     print("Valutazione completata.")
+    predict_time = time.perf_counter()
 
     # Calcolo metriche
     metrics = calculate_metrics(Y_test, y_pred, y_pred_proba)
+    end_time = time.perf_counter()
 
     # Salvataggio Risultati
     # Crea un prefisso unico per i file di output di questa esecuzione
     timestamp = time.strftime("%Y%m%d_%H%M%S")
     prefix = f"holdout_k={k}_{timestamp}"
 
+    # Informazioni sull'esecuzione per il database dei risultati
+    run_info = None
+    if results_store is not None:
+        run_info = {
+            'method': 'holdout',
+            'config': run_config({'k': k, 'test_perc': test_perc}, knn_options),
+            'dataset_fingerprint': dataset_fingerprint(X, Y),
+            'run_durations': [end_time - split_time],
+            # Tempi per fase (Monitoring.timing) più le fasi della validazione
+            'timings': {
+                **TIMER.since(timer_snapshot)['seconds'],
+                'split': split_time - start_time,
+                'predict': predict_time - split_time,
+                'metrics': end_time - predict_time,
+                'total': end_time - start_time
+            }
+        }
+
     handler = HoldoutResultsHandler(
         metrics=metrics,
         y_true=Y_test,
         y_pred=y_pred,
         y_pred_proba=y_pred_proba,
-        filename_prefix=prefix
+        filename_prefix=prefix,
+        plots=plots,
+        results_store=results_store,
+        run_info=run_info,
+        timer_snapshot=timer_snapshot
     )
     handler.save_results()
\ No newline at end of file
@@ -1,5 +1,7 @@
 import math
 
+from Monitoring.timing import timed
+
 def build_confusion_matrix(y_true, y_pred):
     # 0 = Benigno (Negativo)
     # 1 = Maligno (Positivo)
@@ -68,7 +70,8 @@ def calculate_roc_curve(y_true, y_pred_proba):
     sorted_y_true = [y_true_binary[i] for i in sorted_indices]
 
     # Calcola il numero totale di campioni positivi e negativi nel dataset.
-    n_pos = sum(y_true_binary)
+    # (conteggio esplicito: la somma diretta di etichette int8 andrebbe in overflow)
+    n_pos = sum(1 for actual in y_true_binary if actual == 1)
     n_neg = len(y_true_binary) - n_pos
 
     # Inizializza le liste FPR e TPR con il punto (0, 0).
@@ -105,6 +108,7 @@ def calculate_auc(fpr, tpr):
         area += width * height_avg
     return area
 
+@timed('metrics.compute')
 def calculate_metrics(y_true, y_pred, y_pred_proba=None):
     """Calcola tutte le metriche di valutazione."""
     metrics = {
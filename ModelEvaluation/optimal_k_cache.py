@@ -0,0 +1,57 @@
+import os
+import json
+
+# Versione del formato del file: va incrementata se cambia il contenuto salvato
+CACHE_FORMAT_VERSION = 1
+
+
+class OptimalKCache:
+    """
+    Memorizza le accuratezze medie per k calcolate da find_optimal_k, in memoria e in un file JSON.
+
+    La chiave è formata dall'impronta del dataset, dal numero di fold e dalle opzioni del modello KNN;
+    per ogni chiave vengono conservati i punteggi di tutti i k già valutati. Una nuova ricerca sullo
+    stesso dataset calcola solo i k mancanti (ad esempio quando viene richiesto un intervallo più ampio).
+    Il file viene letto alla prima richiesta e riscritto in modo atomico a ogni aggiornamento.
+    """
+    def __init__(self, path=os.path.join('output', 'optimal_k_cache.json')):
+        self.path = path
+        self._entries = None
+
+    @staticmethod
+    def key(fingerprint, k_folds, knn_options=None):
+        """Chiave testuale (JSON ordinato) della ricerca di k."""
+        return json.dumps({'dataset': fingerprint, 'k_folds': k_folds, 'knn_options': knn_options or {}},
+                          sort_keys=True)
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self.path) as f:
+                    data = json.load(f)
+                if data.get('version') == CACHE_FORMAT_VERSION:
+                    self._entries = data['entries']
+            except (OSError, ValueError, KeyError):
+                pass
+        return self._entries
+
+    def scores(self, fingerprint, k_folds, knn_options=None):
+        """Accuratezze medie già calcolate, come dizionario k -> accuratezza."""
+        entry = self._load().get(self.key(fingerprint, k_folds, knn_options), {})
+        return {int(k): accuracy for k, accuracy in entry.items()}
+
+    def update(self, fingerprint, k_folds, knn_options, new_scores):
+        """Aggiunge i punteggi appena calcolati e salva il file (un errore di scrittura non è bloccante)."""
+        entry = self._load().setdefault(self.key(fingerprint, k_folds, knn_options), {})
+        entry.update({str(k): float(accuracy) for k, accuracy in new_scores.items()})
+        try:
+            cache_dir = os.path.dirname(self.path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': CACHE_FORMAT_VERSION, 'entries': self._entries}, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Avviso: impossibile salvare la cache della ricerca di k: {e}")
@@ -0,0 +1,36 @@
+import collections
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+def resolve_jobs(n_jobs):
+    """Numero effettivo di esecuzioni parallele: n_jobs <= 0 significa tutti i core disponibili."""
+    if n_jobs is None or n_jobs == 1:
+        return 1
+    if n_jobs <= 0:
+        return os.cpu_count() or 1
+    return n_jobs
+
+
+def map_runs(function, items, n_jobs=1):
+    """
+    Applica function a ogni elemento di items e restituisce i risultati nello stesso ordine (generatore).
+
+    Con n_jobs > 1 le chiamate vengono eseguite in un pool di thread: addestramento e ricerca dei
+    vicini sono calcoli NumPy che rilasciano il GIL. Al più n_jobs elementi sono in corso alla volta,
+    così se items è un generatore (es. gli split dello Stratified Shuffle Split) vengono materializzati
+    solo i dati degli esperimenti in esecuzione.
+    """
+    n_jobs = resolve_jobs(n_jobs)
+    if n_jobs == 1:
+        for item in items:
+            yield function(item)
+        return
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        pending = collections.deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= n_jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
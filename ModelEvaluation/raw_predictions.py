@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+
+class MemmapRunPredictions:
+    """
+    Contenitore su disco per le predizioni grezze di validazioni con molte esecuzioni
+    (fold della K-Fold o esperimenti dello Stratified Shuffle Split).
+
+    Le etichette reali e predette (int8) e le probabilità (float32) di ogni run vengono
+    scritte man mano in np.memmap preallocati di forma (n_runs, max_test_size): la memoria
+    occupata resta costante al crescere del numero di esperimenti.
+    In lettura l'oggetto si comporta come la lista di dizionari usata dagli handler
+    ({'y_true', 'y_pred', 'y_pred_proba'} per ogni run), caricando una riga alla volta.
+
+    Con lengths (numero di campioni dei run già salvati) i file esistenti nella directory vengono
+    riaperti invece che ricreati: è il caso di una validazione ripresa dal journal (vedi RunJournal).
+    """
+    def __init__(self, n_runs, max_test_size, directory=None, lengths=None):
+        self.n_runs = n_runs
+        self.max_test_size = max_test_size
+        # Se la directory non è indicata ne creiamo una temporanea, rimossa da close()
+        self._owns_directory = directory is None
+        self.directory = tempfile.mkdtemp(prefix='knn_raw_') if directory is None else directory
+        os.makedirs(self.directory, exist_ok=True)
+
+        shape = (n_runs, max_test_size)
+        mode = 'w+' if lengths is None else 'r+'
+        self.y_true = np.memmap(os.path.join(self.directory, 'y_true.int8'), dtype=np.int8, mode=mode, shape=shape)
+        self.y_pred = np.memmap(os.path.join(self.directory, 'y_pred.int8'), dtype=np.int8, mode=mode, shape=shape)
+        self.y_pred_proba = np.memmap(os.path.join(self.directory, 'y_pred_proba.float32'),
+                                      dtype=np.float32, mode=mode, shape=shape)
+        # Numero di campioni di test effettivi per ogni run (l'ultimo fold può essere più grande)
+        self.lengths = np.zeros(n_runs, dtype=np.int64)
+        self._count = 0
+        if lengths is not None:
+            self.lengths[:len(lengths)] = lengths
+            self._count = len(lengths)
+
+    def append(self, y_true, y_pred, y_pred_proba):
+        """Scrive su disco i risultati di un run, nella prima riga libera."""
+        if self._count >= self.n_runs:
+            raise IndexError(f"Spazio esaurito: già salvati {self.n_runs} run.")
+        n = len(y_true)
+        if n > self.max_test_size:
+            raise ValueError(f"Il run ha {n} campioni di test, ma lo spazio preallocato è {self.max_test_size}.")
+        row = self._count
+        self.y_true[row, :n] = np.asarray(y_true, dtype=np.int8)
+        self.y_pred[row, :n] = np.asarray(y_pred, dtype=np.int8)
+        self.y_pred_proba[row, :n] = np.asarray(y_pred_proba, dtype=np.float32)
+        self.lengths[row] = n
+        self._count += 1
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(f"Run {index} non presente ({self._count} run salvati).")
+        n = self.lengths[index]
+        # Le etichette vengono convertite a int64 solo per la riga richiesta:
+        # le somme fatte dalle metriche non devono andare in overflow su int8.
+        return {
+            'y_true': self.y_true[index, :n].astype(np.int64),
+            'y_pred': self.y_pred[index, :n].astype(np.int64),
+            'y_pred_proba': self.y_pred_proba[index, :n]
+        }
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+    def flush(self):
+        """Forza la scrittura su disco dei dati ancora nei buffer."""
+        for array in (self.y_true, self.y_pred, self.y_pred_proba):
+            array.flush()
+
+    def close(self):
+        """Chiude i memmap e rimuove i file se la directory è temporanea."""
+        self.flush()
+        del self.y_true, self.y_pred, self.y_pred_proba
+        if self._owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
@@ -1,25 +1,49 @@
+import csv
+import json
 import os
-import time
 import math
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from abc import ABC, abstractmethod
+
+from Monitoring.memory import format_report
+from Monitoring.timing import TIMER, stage, timings_table
 from .metrics import build_confusion_matrix, calculate_roc_curve
 
 
+def _import_plotting():
+    """
+    Importa matplotlib e seaborn solo quando servono davvero i grafici.
+    In modalità solo metriche (plots=False) lo stack grafico non viene mai caricato,
+    risparmiando diverse centinaia di millisecondi all'avvio.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
+
+
 class BaseResultsHandler(ABC):
     """
     Classe base astratta per la gestione dei risultati.
     Definisce l'interfaccia comune e implementa la logica di plotting.
+    Con plots=False l'handler lavora in modalità solo metriche: salva il CSV
+    e salta la generazione dei grafici (e l'import di matplotlib/seaborn).
+    Se viene passato un results_store, l'esecuzione viene anche aggiunta al database
+    dei risultati insieme a run_info (metodo, configurazione, impronta del dataset, tempi).
+    Se viene passato timer_snapshot (Monitoring.timing.TIMER.snapshot() all'inizio della validazione),
+    viene salvato anche il resoconto dei tempi per fase dell'esecuzione ('<prefisso>_timings.csv') e,
+    con la profilazione della memoria attiva, quello della memoria ('<prefisso>_memory.json').
     """
-    def __init__(self, y_true, y_pred, y_pred_proba, filename_prefix, output_dir='output'):
+    def __init__(self, y_true, y_pred, y_pred_proba, filename_prefix, output_dir='output', plots=True,
+                 results_store=None, run_info=None, timer_snapshot=None):
         self.y_true = y_true
         self.y_pred = y_pred
         self.y_pred_proba = y_pred_proba
         self.output_dir = output_dir
         self.auc_score = 0.0  # Verrà impostato dalle sottoclassi
         self.filename_prefix = filename_prefix
+        self.plots = plots
+        self.results_store = results_store
+        self.run_info = run_info or {}
+        self.timer_snapshot = timer_snapshot
 
     def _create_output_dir(self):
         """Crea la directory di output se non esiste."""
@@ -32,6 +56,55 @@ class BaseResultsHandler(ABC):
             return False
         return True
 
+    def _save_to_store(self, metrics_list):
+        """Aggiunge l'esecuzione al database dei risultati, se configurato."""
+        if self.results_store is None:
+            return
+        try:
+            with stage('results.store'):
+                run_id = self.results_store.save_run(
+                    method=self.run_info.get('method', 'unknown'),
+                    config=self.run_info.get('config', {}),
+                    metrics_list=metrics_list,
+                    dataset_fingerprint=self.run_info.get('dataset_fingerprint'),
+                    run_durations=self.run_info.get('run_durations'),
+                    timings=self.run_info.get('timings'),
+                    filename_prefix=self.filename_prefix
+                )
+            print(f"  - Esecuzione registrata nel database dei risultati (run_id={run_id}).")
+        except Exception as e:
+            print(f"  - ERRORE nel salvataggio sul database dei risultati: {e}")
+
+    def _save_timings(self):
+        """Salva i tempi per fase dall'inizio della validazione (fase, secondi, chiamate), se disponibili."""
+        if self.timer_snapshot is None:
+            return
+        breakdown = TIMER.since(self.timer_snapshot)
+        filepath = os.path.join(self.output_dir, f'{self.filename_prefix}_timings.csv')
+        try:
+            with open(filepath, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['stage', 'seconds', 'calls'])
+                writer.writerows((name, f'{seconds:.6f}', calls) for name, seconds, calls in timings_table(breakdown))
+                writer.writerows((f'count:{name}', '', value) for name, value in sorted(breakdown['counters'].items()))
+            print(f"  - Tempi per fase salvati in '{filepath}'")
+        except OSError as e:
+            print(f"  - ERRORE nel salvataggio dei tempi per fase: {e}")
+        self._save_memory_report()
+
+    def _save_memory_report(self):
+        """Salva picchi e allocazioni per fase e i principali punti di allocazione (profilazione della memoria)."""
+        if TIMER.memory is None or 'memory' not in self.timer_snapshot:
+            return
+        report = TIMER.memory.report(self.timer_snapshot['memory'])
+        filepath = os.path.join(self.output_dir, f'{self.filename_prefix}_memory.json')
+        try:
+            with open(filepath, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"  - Profilo della memoria salvato in '{filepath}':\n{format_report(report)}")
+        except OSError as e:
+            print(f"  - ERRORE nel salvataggio del profilo della memoria: {e}")
+
     @abstractmethod
     def plot_confusion_matrix(self):
         """Metodo astratto per generare la matrice di confusione."""
@@ -50,14 +123,17 @@ class BaseResultsHandler(ABC):
 
 class HoldoutResultsHandler(BaseResultsHandler):
     """Handler specifico per i risultati di una validazione Holdout."""
-    def __init__(self, metrics, y_true, y_pred, y_pred_proba, filename_prefix, output_dir='output'):
-        super().__init__(y_true, y_pred, y_pred_proba, filename_prefix, output_dir)
+    def __init__(self, metrics, y_true, y_pred, y_pred_proba, filename_prefix, output_dir='output', plots=True,
+                 results_store=None, run_info=None, timer_snapshot=None):
+        super().__init__(y_true, y_pred, y_pred_proba, filename_prefix, output_dir, plots, results_store, run_info,
+                         timer_snapshot)
         self.metrics = metrics
         self.auc_score = metrics.get('auc') if metrics.get('auc') is not None else 0.0
 
     def plot_confusion_matrix(self):
         """Genera una singola matrice di confusione."""
         try:
+            plt, sns = _import_plotting()
             tp, tn, fp, fn = build_confusion_matrix(self.y_true, self.y_pred)
             cm = [[tn, fp], [fn, tp]]
 
@@ -77,6 +153,7 @@ class HoldoutResultsHandler(BaseResultsHandler):
     def plot_roc_curve(self):
         """Genera una singola curva ROC."""
         try:
+            plt, _ = _import_plotting()
             fpr, tpr = calculate_roc_curve(self.y_true, self.y_pred_proba)
             if fpr is not None and tpr is not None:
                 plt.figure(figsize=(8, 6))
@@ -101,20 +178,28 @@ class HoldoutResultsHandler(BaseResultsHandler):
             return
 
         try:
-            metrics_record = self.metrics.copy()
-            metrics_record['Validation_Type'] = 'Holdout_Test'
-            df_results = pd.DataFrame([metrics_record]).set_index('Validation_Type')
-            filepath = os.path.join(self.output_dir, f'{self.filename_prefix}_results.csv')
-            df_results.to_csv(filepath, float_format='%.4f')
-            print(f"  - Risultati salvati correttamente in '{filepath}'")
+            with stage('results.csv'):
+                import pandas as pd
+                metrics_record = self.metrics.copy()
+                metrics_record['Validation_Type'] = 'Holdout_Test'
+                df_results = pd.DataFrame([metrics_record]).set_index('Validation_Type')
+                filepath = os.path.join(self.output_dir, f'{self.filename_prefix}_results.csv')
+                df_results.to_csv(filepath, float_format='%.4f')
+                print(f"  - Risultati salvati correttamente in '{filepath}'")
         except Exception as e:
             print(f"  - ERRORE nel salvataggio del file CSV: {e}")
 
+        self._save_to_store([self.metrics])
+
         #chiama la funzione base per plottare la matrice di confusione e la curva ROC
-        self.plot_confusion_matrix()
-        self.plot_roc_curve()
+        if self.plots:
+            with stage('results.plots'):
+                self.plot_confusion_matrix()
+                self.plot_roc_curve()
+        else:
+            print("  - Modalità solo metriche: generazione dei grafici saltata.")
+        self._save_timings()
         print("--- Operazioni completate. ---")
-        time.sleep(2)
         print("\n" + "=" * 60)
         print("AVVISO: I risultati dettagliati e i grafici sono stati salvati.")
         print("Controlla la cartella 'output' nella directory del progetto.")
@@ -129,8 +214,10 @@ class MultiRunResultsHandler(BaseResultsHandler):
     Cambio solo i titoli e le etichette nei metodi specifici (plot specifici).
     """
     def __init__(self, metrics_list, raw_data_list, filename_prefix, output_dir='output', 
-                 run_label='Run', y_true_all=None, y_pred_all=None, y_pred_proba_all=None):
-        super().__init__(y_true_all, y_pred_all, y_pred_proba_all, filename_prefix, output_dir)
+                 run_label='Run', y_true_all=None, y_pred_all=None, y_pred_proba_all=None, plots=True,
+                 results_store=None, run_info=None, timer_snapshot=None):
+        super().__init__(y_true_all, y_pred_all, y_pred_proba_all, filename_prefix, output_dir, plots,
+                         results_store, run_info, timer_snapshot)
         self.metrics_list = metrics_list
         self.raw_data_list = raw_data_list if raw_data_list is not None else []
         self.run_label = run_label
@@ -145,6 +232,8 @@ class MultiRunResultsHandler(BaseResultsHandler):
         try:
             if not self.metrics_list:
                 return
+            import pandas as pd
+            plt, sns = _import_plotting()
             df_runs = pd.DataFrame(self.metrics_list)
             plt.figure(figsize=(12, 7))
             sns.boxplot(data=df_runs[['accuracy', 'sensitivity', 'specificity', 'gmean', 'auc']])
@@ -168,6 +257,7 @@ class MultiRunResultsHandler(BaseResultsHandler):
             return
 
         try:
+            plt, sns = _import_plotting()
             num_runs = len(self.raw_data_list)
             cols = 3 if num_runs > 4 else 2
             rows = math.ceil(num_runs / cols)
@@ -205,6 +295,7 @@ class MultiRunResultsHandler(BaseResultsHandler):
             return
 
         try:
+            plt, _ = _import_plotting()
             plt.figure(figsize=(10, 8))
 
             for i, run_data in enumerate(self.raw_data_list):
@@ -232,30 +323,38 @@ class MultiRunResultsHandler(BaseResultsHandler):
             return
 
         try:
-            records = []
-            for i, metrics in enumerate(self.metrics_list):
-                record = metrics.copy()
-                record[self.run_label] = f'{self.run_label} {i+1}'
-                records.append(record)
-            df_runs = pd.DataFrame(records).set_index(self.run_label)
-            numeric_df = df_runs.select_dtypes(include='number')
-            avg_metrics = numeric_df.mean().to_dict()
-            std_metrics = numeric_df.std().to_dict()
-            avg_metrics[self.run_label] = 'Average'
-            std_metrics[self.run_label] = 'Std_Dev'
-            df_summary = pd.DataFrame([avg_metrics, std_metrics]).set_index(self.run_label)
-            df_results = pd.concat([df_runs, df_summary])
-            filepath = os.path.join(self.output_dir, f'{self.filename_prefix}_results.csv')
-            df_results.to_csv(filepath, float_format='%.4f')
-            print(f"  - Risultati salvati correttamente in '{filepath}'")
+            with stage('results.csv'):
+                import pandas as pd
+                records = []
+                for i, metrics in enumerate(self.metrics_list):
+                    record = metrics.copy()
+                    record[self.run_label] = f'{self.run_label} {i+1}'
+                    records.append(record)
+                df_runs = pd.DataFrame(records).set_index(self.run_label)
+                numeric_df = df_runs.select_dtypes(include='number')
+                avg_metrics = numeric_df.mean().to_dict()
+                std_metrics = numeric_df.std().to_dict()
+                avg_metrics[self.run_label] = 'Average'
+                std_metrics[self.run_label] = 'Std_Dev'
+                df_summary = pd.DataFrame([avg_metrics, std_metrics]).set_index(self.run_label)
+                df_results = pd.concat([df_runs, df_summary])
+                filepath = os.path.join(self.output_dir, f'{self.filename_prefix}_results.csv')
+                df_results.to_csv(filepath, float_format='%.4f')
+                print(f"  - Risultati salvati correttamente in '{filepath}'")
 
         except Exception as e:
 
             print(f"  - ERRORE nel salvataggio del file CSV: {e}")
 
-        self._plot_specific_graphs()
+        self._save_to_store(self.metrics_list)
+
+        if self.plots:
+            with stage('results.plots'):
+                self._plot_specific_graphs()
+        else:
+            print("  - Modalità solo metriche: generazione dei grafici saltata.")
+        self._save_timings()
         print("--- Operazioni completate. ---")
-        time.sleep(2)
         print("\n" + "=" * 60)
         print("AVVISO: I risultati dettagliati e i grafici sono stati salvati.")
         print("Controlla la cartella 'output' nella directory del progetto.")
@@ -271,9 +370,12 @@ class KFoldResultsHandler(MultiRunResultsHandler):
     Handler specifico per K-Fold Cross Validation.
     """
     def __init__(self, all_fold_metrics, filename_prefix, output_dir='output',
-                 y_true_all=None, y_pred_all=None, y_pred_proba_all=None, all_fold_raw_data=None):
+                 y_true_all=None, y_pred_all=None, y_pred_proba_all=None, all_fold_raw_data=None, plots=True,
+                 results_store=None, run_info=None, timer_snapshot=None):
         super().__init__(all_fold_metrics, all_fold_raw_data, filename_prefix, output_dir, 
-                         run_label='Fold', y_true_all=y_true_all, y_pred_all=y_pred_all, y_pred_proba_all=y_pred_proba_all)
+                         run_label='Fold', y_true_all=y_true_all, y_pred_all=y_pred_all, y_pred_proba_all=y_pred_proba_all,
+                         plots=plots, results_store=results_store, run_info=run_info,
+                         timer_snapshot=timer_snapshot)
 
     def _plot_specific_graphs(self):
         self._plot_performance_distribution('Distribuzione delle Performance sulle k-Fold')
@@ -286,9 +388,12 @@ class StratifiedShuffleSplitResultsHandler(MultiRunResultsHandler):
     Handler specifico per Stratified Shuffle Split.
     """
     def __init__(self, all_experiment_metrics, filename_prefix, output_dir='output',
-                 y_true_all=None, y_pred_all=None, y_pred_proba_all=None, all_experiment_raw_data=None):
+                 y_true_all=None, y_pred_all=None, y_pred_proba_all=None, all_experiment_raw_data=None, plots=True,
+                 results_store=None, run_info=None, timer_snapshot=None):
         super().__init__(all_experiment_metrics, all_experiment_raw_data, filename_prefix, output_dir, 
-                         run_label='Experiment', y_true_all=y_true_all, y_pred_all=y_pred_all, y_pred_proba_all=y_pred_proba_all)
+                         run_label='Experiment', y_true_all=y_true_all, y_pred_all=y_pred_all, y_pred_proba_all=y_pred_proba_all,
+                         plots=plots, results_store=results_store, run_info=run_info,
+                         timer_snapshot=timer_snapshot)
 
     def _plot_specific_graphs(self):
         self._plot_performance_distribution('Distribuzione delle Performance su Stratified Shuffle Split')
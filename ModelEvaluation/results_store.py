@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import sqlite3
+
+from Preprocessing.dataset import Dataset, content_fingerprint
+
+# Colonne delle metriche salvate per ogni run (fold / esperimento)
+METRIC_COLUMNS = ['accuracy', 'error_rate', 'sensitivity', 'specificity', 'gmean', 'auc']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    method TEXT NOT NULL,
+    k INTEGER,
+    config TEXT NOT NULL,
+    dataset_fingerprint TEXT,
+    filename_prefix TEXT,
+    n_runs INTEGER NOT NULL,
+    duration_s REAL
+);
+CREATE TABLE IF NOT EXISTS run_metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    run_index INTEGER NOT NULL,
+    accuracy REAL,
+    error_rate REAL,
+    sensitivity REAL,
+    specificity REAL,
+    gmean REAL,
+    auc REAL,
+    duration_s REAL,
+    PRIMARY KEY (run_id, run_index)
+);
+CREATE TABLE IF NOT EXISTS run_timings (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    stage TEXT NOT NULL,
+    seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_method_k ON runs(method, k);
+CREATE INDEX IF NOT EXISTS idx_runs_fingerprint ON runs(dataset_fingerprint);
+CREATE INDEX IF NOT EXISTS idx_run_timings_run ON run_timings(run_id);
+"""
+
+
+def dataset_fingerprint(X, Y):
+    """
+    Calcola un'impronta del contenuto del dataset (feature e target).
+    Per un Dataset viene riutilizzata l'impronta già calcolata.
+
+    Returns:
+        str: Digest esadecimale di 32 caratteri.
+    """
+    if isinstance(X, Dataset):
+        return X.fingerprint
+    return content_fingerprint(X, Y)
+
+
+
+def run_config(config, knn_options=None):
+    """
+    Configurazione di un'esecuzione da registrare: parametri del metodo di validazione
+    più le eventuali opzioni del modello KNN (es. {'pca': 0.95, 'scaling': 'standard'}), solo se presenti.
+    """
+    if knn_options:
+        config = dict(config, knn_options=dict(knn_options))
+    return config
+
+
+class SQLiteResultsStore:
+    """
+    Archivio dei risultati su database SQLite locale.
+    Ogni esecuzione (configurazione, impronta del dataset, metriche per fold/esperimento
+    e tempi) viene aggiunta al database con un'unica transazione, così il confronto
+    tra esecuzioni diverse non richiede di rileggere i CSV nella cartella 'output'.
+    """
+    def __init__(self, db_path=os.path.join('output', 'results.sqlite')):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        """Apre una connessione al database (una per operazione)."""
+        return sqlite3.connect(self.db_path)
+
+    def save_run(self, method, config, metrics_list, dataset_fingerprint=None,
+                 run_durations=None, timings=None, filename_prefix=None):
+        """
+        Salva un'esecuzione completa con inserimenti batch in una sola transazione.
+
+        Args:
+            method (str): Metodo di validazione (es. 'holdout', 'kfold', 'shuffle_split').
+            config (dict): Parametri dell'esecuzione (k, numero di fold, ...).
+            metrics_list (list): Lista di dizionari di metriche, uno per fold/esperimento.
+            dataset_fingerprint (str): Impronta del dataset usato.
+            run_durations (list): Durata in secondi di ogni fold/esperimento.
+            timings (dict): Tempi per fase {nome_fase: secondi}.
+            filename_prefix (str): Prefisso dei file di output associati.
+
+        Returns:
+            int: Identificativo dell'esecuzione nel database.
+        """
+        timings = timings or {}
+        run_durations = run_durations or [None] * len(metrics_list)
+        metric_rows = [
+            [i] + [metrics.get(col) for col in METRIC_COLUMNS] + [duration]
+            for i, (metrics, duration) in enumerate(zip(metrics_list, run_durations), 1)
+        ]
+
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO runs (created_at, method, k, config, dataset_fingerprint, "
+                    "filename_prefix, n_runs, duration_s) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (time.strftime("%Y-%m-%d %H:%M:%S"), method, config.get('k'),
+                     json.dumps(config, sort_keys=True), dataset_fingerprint, filename_prefix,
+                     len(metrics_list), timings.get('total'))
+                )
+                run_id = cursor.lastrowid
+                conn.executemany(
+                    f"INSERT INTO run_metrics (run_id, run_index, {', '.join(METRIC_COLUMNS)}, duration_s) "
+                    f"VALUES ({', '.join(['?'] * (len(METRIC_COLUMNS) + 3))})",
+                    [[run_id] + row for row in metric_rows]
+                )
+                conn.executemany(
+                    "INSERT INTO run_timings (run_id, stage, seconds) VALUES (?, ?, ?)",
+                    [(run_id, stage, seconds) for stage, seconds in timings.items()]
+                )
+        finally:
+            conn.close()
+        return run_id
+
+    def best_configs(self, metric='accuracy', method=None, dataset_fingerprint=None, limit=10):
+        """
+        Restituisce le configurazioni migliori ordinate per valore medio della metrica.
+
+        Args:
+            metric (str): Metrica da ottimizzare (una di METRIC_COLUMNS).
+            method (str): Filtra per metodo di validazione.
+            dataset_fingerprint (str): Filtra per dataset.
+            limit (int): Numero massimo di configurazioni restituite.
+
+        Returns:
+            pandas.DataFrame: Una riga per configurazione con media, minimo, massimo
+            della metrica e numero di run.
+        """
+        if metric not in METRIC_COLUMNS:
+            raise ValueError(f"Metrica '{metric}' non valida. Valori ammessi: {METRIC_COLUMNS}")
+        import pandas as pd
+
+        filters, params = [], []
+        if method is not None:
+            filters.append("r.method = ?")
+            params.append(method)
+        if dataset_fingerprint is not None:
+            filters.append("r.dataset_fingerprint = ?")
+            params.append(dataset_fingerprint)
+        where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+        query = f"""
+            SELECT r.method, r.k, r.config, r.dataset_fingerprint,
+                   AVG(m.{metric}) AS mean_{metric},
+                   MIN(m.{metric}) AS min_{metric},
+                   MAX(m.{metric}) AS max_{metric},
+                   COUNT(m.run_index) AS n_runs,
+                   COUNT(DISTINCT r.run_id) AS n_executions
+            FROM runs r JOIN run_metrics m ON m.run_id = r.run_id
+            {where}
+            GROUP BY r.method, r.config, r.dataset_fingerprint
+            ORDER BY mean_{metric} DESC
+            LIMIT ?
+        """
+        conn = self._connect()
+        try:
+            return pd.read_sql_query(query, conn, params=params + [limit])
+        finally:
+            conn.close()
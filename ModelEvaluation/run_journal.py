@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import random
+import shutil
+
+# Versione del formato del journal: va incrementata se cambia il contenuto dei record
+JOURNAL_FORMAT_VERSION = 1
+
+
+def _json_default(value):
+    """Serializza i tipi NumPy (scalari e array) presenti in metriche e stati dei generatori."""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Tipo non serializzabile nel journal: {type(value).__name__}")
+
+
+def restore_random_state(state):
+    """Ripristina lo stato del modulo random salvato nel journal (random.getstate() serializzato in JSON)."""
+    version, internal_state, gauss_next = state
+    random.setstate((version, tuple(internal_state), gauss_next))
+
+
+class RunJournal:
+    """
+    Journal di una validazione lunga (fold della K-Fold, esperimenti dello Stratified Shuffle Split),
+    per riprenderla dopo un'interruzione senza ripetere il lavoro già fatto.
+
+    Il file è in formato JSONL:
+        - un record 'header' con la configurazione dell'esecuzione: prefisso dei file di output,
+          forma dei dati grezzi e stato iniziale dei generatori casuali;
+        - un record 'run' per ogni unità completata, nell'ordine: indice, metriche, durata,
+          puntatore alla riga delle predizioni grezze (MemmapRunPredictions nella cartella
+          raw_directory) e stato del generatore casuale dopo la sua suddivisione.
+
+    Ogni record viene scritto con una sola write in append seguita da fsync: un'interruzione durante
+    la scrittura lascia al più una riga incompleta in coda, che alla rilettura viene scartata e troncata.
+    Il nome del file dipende da metodo, configurazione e impronta del dataset (vedi for_run), quindi
+    un'esecuzione viene ripresa solo con gli stessi dati e gli stessi parametri.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.header = None
+        self.runs = []
+        self._load()
+
+    @classmethod
+    def for_run(cls, directory, method, config, dataset_fingerprint):
+        """Journal dell'esecuzione identificata da metodo, configurazione e impronta del dataset."""
+        key = json.dumps({'method': method, 'config': config, 'dataset': dataset_fingerprint}, sort_keys=True,
+                         default=_json_default)
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+        return cls(os.path.join(directory, f"{method}_{digest}.jsonl"))
+
+    @property
+    def raw_directory(self):
+        """Cartella delle predizioni grezze dell'esecuzione (memmap persistenti accanto al journal)."""
+        return f"{os.path.splitext(self.path)[0]}_raw"
+
+    def _load(self):
+        """Rilegge i record validi; una coda incompleta o non valida viene troncata."""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        valid_size = 0
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line) if line.endswith(b'\n') else None
+                except ValueError:
+                    record = None
+                if record is None:
+                    break
+                if record.get('type') == 'header' and self.header is None:
+                    if record.get('version') != JOURNAL_FORMAT_VERSION:
+                        break
+                    self.header = record
+                elif record.get('type') == 'run' and self.header is not None and record.get('index') == len(self.runs):
+                    self.runs.append(record)
+                else:
+                    break
+                valid_size += len(line)
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+        if self.header is None:
+            self.runs = []
+            valid_size = 0
+        if valid_size < size:
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_size)
+
+    def _append(self, record):
+        """Aggiunge un record in modo atomico (una sola write in append) e lo forza su disco."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = (json.dumps(record, default=_json_default) + '\n').encode('utf-8')
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def begin(self, header, resume=False):
+        """
+        Con resume=True riprende il journal esistente (se ci sono anche i dati grezzi), altrimenti
+        ne inizia uno nuovo con l'header indicato, eliminando un eventuale journal precedente.
+
+        Returns:
+            dict: L'header effettivo: quello dell'esecuzione originale se ripresa (stesso prefisso
+                  dei file di output e stessi stati iniziali dei generatori casuali).
+        """
+        if resume and self.header is not None and os.path.isdir(self.raw_directory):
+            print(f"Ripresa dal journal '{self.path}': {len(self.runs)} unità già completate.")
+            return self.header
+        if resume:
+            print(f"Nessun journal da riprendere in '{self.path}': esecuzione da capo.")
+        self.discard()
+        self.header = dict(header, type='header', version=JOURNAL_FORMAT_VERSION)
+        self._append(self.header)
+        return self.header
+
+    def record_run(self, index, metrics, duration, raw_pointer, rng_state=None):
+        """Registra un'unità completata; le unità vanno registrate nell'ordine degli indici."""
+        if index != len(self.runs):
+            raise ValueError(f"Unità {index} registrata fuori ordine (attesa l'unità {len(self.runs)}).")
+        record = {'type': 'run', 'index': index, 'metrics': metrics, 'duration': duration, 'raw': raw_pointer,
+                  'rng_state': rng_state}
+        self._append(record)
+        self.runs.append(record)
+
+    def discard(self):
+        """Elimina journal e predizioni grezze (a esecuzione completata o per ricominciare da capo)."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        shutil.rmtree(self.raw_directory, ignore_errors=True)
+        self.header = None
+        self.runs = []
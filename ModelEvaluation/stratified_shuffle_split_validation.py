@@ -2,18 +2,33 @@ import time
 import numpy as np
 
 # Assicurati che questi import funzionino nel tuo progetto
+from Monitoring.timing import TIMER, stage
 from ModelDevelopment.knn_scratch import KNN
-from ModelEvaluation.metrics import calculate_metrics
+from ModelEvaluation.cross_validation import evaluate_split
+from ModelEvaluation.parallel import map_runs
 from ModelEvaluation.results_handler import StratifiedShuffleSplitResultsHandler
+from ModelEvaluation.results_store import dataset_fingerprint, run_config
+from ModelEvaluation.raw_predictions import MemmapRunPredictions
+from ModelEvaluation.run_journal import RunJournal
+from Preprocessing.dataset import as_arrays
 
 
-def binary_stratified_shuffle_split(Y, n_experiments=1, test_size=0.2, random_seed=50):
+def stratified_test_counts(Y, test_size=0.2):
+    """Numero di campioni di test prelevati da ciascuna classe (0 e 1) in ogni esperimento."""
+    Y = np.asarray(Y)
+    return int(np.count_nonzero(Y == 0) * test_size), int(np.count_nonzero(Y == 1) * test_size)
+
+
+def binary_stratified_shuffle_split(Y, n_experiments=1, test_size=0.2, random_seed=50, rng=None):
     """
     Generatore procedurale per Stratified Shuffle Split su 2 Classi (0 e 1).
     Restituisce gli INDICI di train e test.
+    Se rng (np.random.Generator) è fornito viene usato al posto di un nuovo generatore con random_seed:
+    così una validazione ripresa continua la sequenza di split da dove si era interrotta.
     """
-    Y = np.array(Y)
-    rng = np.random.default_rng(random_seed)
+    Y = np.asarray(Y)
+    if rng is None:
+        rng = np.random.default_rng(random_seed)
     n_samples = len(Y)
     #creo un array di indici da 0 a n_samples-1
     indices = np.arange(n_samples)
@@ -26,8 +41,7 @@ def binary_stratified_shuffle_split(Y, n_experiments=1, test_size=0.2, random_se
     indices_1 = indices[Y == classes[1]]  # Solitamente classe 1 o Positiva (maligno)
 
     # Calcoliamo subito quanti prenderne per il test da ciascun gruppo
-    n_test_0 = int(len(indices_0) * test_size)
-    n_test_1 = int(len(indices_1) * test_size)
+    n_test_0, n_test_1 = stratified_test_counts(Y, test_size)
 
     # Ciclo per il numero di split richiesti
     for _ in range(n_experiments):
@@ -59,63 +73,123 @@ def binary_stratified_shuffle_split(Y, n_experiments=1, test_size=0.2, random_se
         yield final_train, final_test
 
 
-def stratified_shuffle_split_validation(X, Y, k, n_experiments):
+def stratified_shuffle_split_validation(X, Y, k, n_experiments, plots=True, results_store=None, knn_options=None,
+                                        n_jobs=1, checkpoint_dir=None, resume=False):
     """
     Esegue la validazione utilizzando Stratified Shuffle Split.
+    Con plots=False vengono salvate solo le metriche, senza generare grafici.
+    Se results_store è fornito, l'esecuzione viene registrata anche nel database dei risultati.
+    knn_options (es. {'pca': 0.95, 'scaling': 'standard'}) viene passato al modello KNN di ogni esperimento.
+    Con n_jobs > 1 gli esperimenti vengono eseguiti in parallelo (vedi ModelEvaluation.parallel.map_runs).
+    Con checkpoint_dir ogni esperimento completato viene registrato in un journal (RunJournal), insieme allo
+    stato del generatore casuale; con resume=True un'esecuzione interrotta riprende dal primo esperimento mancante.
     """
-    # Assicuriamoci che siano numpy array per l'indicizzazione avanzata
-    X = np.array(X)
-    Y = np.array(Y)
+    start_time = time.perf_counter()
+    timer_snapshot = TIMER.snapshot()
 
-    print(f"\nAvvio Stratified Shuffle Split con {n_experiments} esperimenti...")
+    # Assicuriamoci che siano numpy array per l'indicizzazione avanzata (senza copia se X è un Dataset)
+    config = run_config({'k': k, 'n_experiments': n_experiments, 'test_size': 0.2}, knn_options)
+    fingerprint = dataset_fingerprint(X, Y) if results_store is not None or checkpoint_dir is not None else None
+    X, Y = as_arrays(X, Y)
+
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    prefix = f"shuffle_split_k={k}_n={n_experiments}_{timestamp}"
 
-    # Inizializziamo il generatore
-    splitter = binary_stratified_shuffle_split(Y, n_experiments=n_experiments, test_size=0.2)
+    print(f"\nAvvio Stratified Shuffle Split con {n_experiments} esperimenti...")
 
-    all_experiment_metrics = []
-    all_experiment_raw_data = []
+    # I dati grezzi vengono scritti su un memmap preallocato (il test set ha sempre la stessa
+    # dimensione) così la memoria non cresce con n_experiments.
+    test_size = sum(stratified_test_counts(Y, 0.2))
+    rng = np.random.default_rng(50)
+    journal = None
+    completed = []
+    if checkpoint_dir is None:
+        all_experiment_raw_data = MemmapRunPredictions(n_experiments, test_size)
+    else:
+        journal = RunJournal.for_run(checkpoint_dir, 'shuffle_split', config, fingerprint)
+        prefix = journal.begin({'prefix': prefix, 'raw_shape': [n_experiments, test_size]}, resume=resume)['prefix']
+        completed = journal.runs
+        lengths = [run['raw']['length'] for run in completed] if completed else None
+        all_experiment_raw_data = MemmapRunPredictions(n_experiments, test_size, directory=journal.raw_directory,
+                                                       lengths=lengths)
+        if completed:
+            # Il generatore riparte dallo stato registrato dopo l'ultimo esperimento completato
+            rng.bit_generator.state = completed[-1]['rng_state']
+            print(f"  Esperimenti già completati (dal journal): {len(completed)}/{n_experiments}")
+
+    all_experiment_metrics = [run['metrics'] for run in completed]
+    all_experiment_durations = [run['duration'] for run in completed]
+
+    # Inizializziamo il generatore dei soli esperimenti mancanti
+    splitter = binary_stratified_shuffle_split(Y, n_experiments=n_experiments - len(completed), test_size=0.2,
+                                               rng=rng)
+
+    def numbered_splits():
+        # Lo stato del generatore viene letto subito dopo ogni split, prima che venga prodotto il successivo
+        for index, split_indices in enumerate(splitter, len(completed)):
+            yield index, split_indices, rng.bit_generator.state
+
+    def run_experiment(numbered_split):
+        # SLICING: Convertiamo gli indici in dati reali, addestriamo e testiamo (+ probabilità)
+        index, (train_idx, test_idx), rng_state = numbered_split
+        with stage('data.split'):
+            split = (X[train_idx], Y[train_idx], X[test_idx], Y[test_idx])
+        return index, train_idx, test_idx, rng_state, evaluate_split(KNN, k, knn_options, split)
 
     # Iteriamo sul generatore
-    # Nota: enumerate parte da 1 solo per estetica nel print
-    for i, (train_idx, test_idx) in enumerate(splitter, 1):
-
-        # SLICING: Convertiamo gli indici in dati reali
-        X_train, X_test = X[train_idx], X[test_idx]
-        Y_train, Y_test = Y[train_idx], Y[test_idx]
+    for index, train_idx, test_idx, rng_state, result in map_runs(run_experiment, numbered_splits(), n_jobs):
+        y_pred, y_pred_proba, metrics, duration = result
+        i = index + 1  # numerazione da 1 solo per estetica nel print
+        Y_test = Y[test_idx]
 
         print(f"  - Iterazione {i}/{n_experiments}")
-        print(f"    Training samples: {len(X_train)} | Test samples: {len(X_test)}")
+        print(f"    Training samples: {len(train_idx)} | Test samples: {len(test_idx)}")
 
         # Controllo rapido proporzione classi 0 / 1  nel test set
         prop_test = np.sum(Y_test == 1) / len(Y_test)
         print(f"    Proporzione Classe 1  (maligni) nel Test: {prop_test:.2%}")
 
-        # Addestramento e test + probabilità
-        knn_model = KNN(X_train, Y_train, k)
-        y_pred = knn_model.test(X_test)
-        y_pred_proba = knn_model.test_proba(X_test)
-
         # Metriche
-        metrics = calculate_metrics(Y_test, y_pred, y_pred_proba)
         all_experiment_metrics.append(metrics)
+        all_experiment_durations.append(duration)
 
         # Dati grezzi per i grafici
-        all_experiment_raw_data.append({
-            'y_true': Y_test,
-            'y_pred': y_pred,
-            'y_pred_proba': y_pred_proba
-        })
+        all_experiment_raw_data.append(Y_test, y_pred, y_pred_proba)
+
+        # Registra l'esperimento nel journal solo dopo che le sue predizioni grezze sono su disco
+        if journal is not None:
+            all_experiment_raw_data.flush()
+            journal.record_run(index, metrics, duration, {'row': index, 'length': len(test_idx)}, rng_state)
 
     print("\nValutazione completata.")
+    end_time = time.perf_counter()
 
     # Salvataggio Risultati
-    timestamp = time.strftime("%Y%m%d_%H%M%S")
-    prefix = f"shuffle_split_k={k}_n={n_experiments}_{timestamp}"
+    # Informazioni sull'esecuzione per il database dei risultati
+    run_info = None
+    if results_store is not None:
+        run_info = {
+            'method': 'shuffle_split',
+            'config': config,
+            'dataset_fingerprint': fingerprint,
+            'run_durations': all_experiment_durations,
+            # Tempi per fase (Monitoring.timing) più durata complessiva
+            'timings': dict(TIMER.since(timer_snapshot)['seconds'], evaluation=end_time - start_time,
+                            total=end_time - start_time)
+        }
 
     handler = StratifiedShuffleSplitResultsHandler(
         all_experiment_metrics=all_experiment_metrics,
         all_experiment_raw_data=all_experiment_raw_data,
-        filename_prefix=prefix
+        filename_prefix=prefix,
+        plots=plots,
+        results_store=results_store,
+        run_info=run_info,
+        timer_snapshot=timer_snapshot
     )
     handler.save_results()
+    all_experiment_raw_data.close()
+    if journal is not None:
+        # Esecuzione completata: il journal e le predizioni grezze non servono più
+        journal.discard()
     print(f"Risultati salvati con prefisso: {prefix}")
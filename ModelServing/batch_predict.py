@@ -0,0 +1,147 @@
+"""
+Classificazione in streaming di CSV di casi non etichettati con un modello KNN salvato.
+
+Il CSV di input viene letto a blocchi di chunksize righe da un thread dedicato, che applica a
+ogni blocco la stessa trasformazione della pulizia (vedi data_cleaner.transform_features) e lo
+accoda in una coda limitata (prefetch): mentre il modello classifica un blocco, il successivo
+viene già letto dal disco. Le predizioni vengono scritte in coda al file di output blocco per
+blocco, quindi la memoria usata dipende da chunksize e prefetch, non dalla dimensione del file.
+
+Colonne del file di output:
+    - 'Sample code number' (se presente nell'input), per ricollegare le righe;
+    - prediction: classe predetta (0 = Benigno, 1 = Maligno);
+    - probability: probabilità della classe Maligno (frazione dei vicini maligni).
+
+Esecuzione (dalla cartella principale del progetto):
+    python main.py predict output/modello nuovi_casi.csv predizioni.csv
+    python -m ModelServing.batch_predict output/modello nuovi_casi.csv predizioni.csv --chunksize 50000
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+
+import pandas as pd
+
+from ModelDevelopment.knn_scratch import KNN
+from Preprocessing.csv_reader import read_typed_csv
+from Preprocessing.data_cleaner import COLS_TO_FIX, COLUMNS_TO_DROP, TARGET_COLUMN, transform_features
+from Preprocessing.imputer import MeanImputer
+
+ID_COLUMN = 'Sample code number'
+_END = object()
+
+
+def _feature_names(model, input_csv):
+    """Feature del modello; per i modelli senza nomi, le colonne dell'input esclusi target e colonne scartate."""
+    if model.feature_names is not None:
+        return model.feature_names
+    header = pd.read_csv(input_csv, nrows=0).columns
+    return [col for col in header if col != TARGET_COLUMN and col not in COLUMNS_TO_DROP]
+
+
+def _put(chunks, item, stop):
+    """Accoda un elemento attendendo spazio nella coda; rinuncia se la classificazione è stata interrotta."""
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _read_chunks(input_csv, feature_names, imputer, chunksize, chunks, stop):
+    """Thread di lettura: accoda (identificativi, feature trasformate) e infine _END o l'eccezione."""
+    try:
+        for chunk in read_typed_csv(input_csv, string_columns=COLS_TO_FIX, chunksize=chunksize):
+            ids = chunk[ID_COLUMN].to_numpy() if ID_COLUMN in chunk.columns else None
+            if not _put(chunks, (ids, transform_features(chunk, feature_names, imputer)), stop):
+                return
+        _put(chunks, _END, stop)
+    except BaseException as e:
+        _put(chunks, e, stop)
+
+
+def predict_csv(model, input_csv, output_csv, chunksize=100_000, prefetch=2, imputer=None):
+    """
+    Classifica input_csv a blocchi e scrive le predizioni in output_csv.
+
+    Args:
+        model (KNN | str): Modello addestrato o cartella di un modello salvato (aperto in memory mapping).
+        imputer (MeanImputer, opzionale): Imputer dei valori mancanti; di default quello salvato nel modello.
+        prefetch (int): Blocchi letti in anticipo al massimo (coda limitata).
+
+    Returns:
+        int: Numero di righe classificate.
+    """
+    if isinstance(model, str):
+        model = KNN.load(model, mmap=True)
+    imputer = imputer if imputer is not None else model.imputer
+    feature_names = _feature_names(model, input_csv)
+
+    chunks = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+    reader = threading.Thread(target=_read_chunks, daemon=True,
+                              args=(input_csv, feature_names, imputer, chunksize, chunks, stop))
+    reader.start()
+    tmp_path = f"{output_csv}.tmp"
+    n_rows = 0
+    try:
+        with open(tmp_path, 'w', newline='') as f:
+            first = True
+            while True:
+                item = chunks.get()
+                if item is _END:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                ids, X = item
+                predictions, probabilities = model.test_with_proba(X)
+                output = pd.DataFrame({'prediction': predictions, 'probability': probabilities})
+                if ids is not None:
+                    output.insert(0, ID_COLUMN, ids)
+                output.to_csv(f, header=first, index=False)
+                first = False
+                n_rows += len(output)
+            if first:
+                # Input senza righe: solo l'intestazione
+                pd.DataFrame(columns=['prediction', 'probability']).to_csv(f, index=False)
+        os.replace(tmp_path, output_csv)
+    finally:
+        stop.set()
+        reader.join()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return n_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classifica un CSV di nuovi casi con un modello KNN salvato.")
+    parser.add_argument('model', help="Cartella del modello salvato con KNN.save")
+    parser.add_argument('input_csv', help="CSV dei casi da classificare (grezzo o pulito)")
+    parser.add_argument('output_csv', help="CSV di destinazione delle predizioni")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Righe lette e classificate per blocco")
+    parser.add_argument('--prefetch', type=int, default=2, help="Blocchi letti in anticipo al massimo")
+    parser.add_argument('--imputer', help="File .npz dell'imputer (default: quello salvato nel modello)")
+    parser.add_argument('--cache-size', type=int,
+                        help="Campioni distinti i cui vicini restano in cache (utile se i casi si ripetono)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    imputer = MeanImputer.load(args.imputer) if args.imputer else None
+    model = KNN.load(args.model, mmap=True)
+    if args.cache_size is not None:
+        model.enable_cache(args.cache_size)
+    n_rows = predict_csv(model, args.input_csv, args.output_csv, args.chunksize, args.prefetch, imputer)
+    elapsed = time.perf_counter() - start
+    print(f"Classificate {n_rows} righe in {elapsed:.2f} s ({n_rows / elapsed if elapsed else 0:,.0f} righe/s). "
+          f"Predizioni salvate in '{args.output_csv}'.")
+    if model.cache_info() is not None:
+        print(f"Cache dei vicini: {model.cache_info()}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,307 @@
+"""
+Server locale di predizione con micro-batching (asyncio, solo libreria standard).
+
+Il modello KNN salvato (vedi KNN.save) viene caricato una sola volta all'avvio. Le richieste
+che arrivano insieme vengono raccolte in un micro-batch per al più batch_window_ms millisecondi
+(o fino a max_batch_rows campioni) e classificate con un'unica ricerca vettorizzata dei vicini,
+invece di pagare il costo di KNN.test per ogni singolo campione.
+
+Protocollo HTTP/1.1 minimale, su localhost o su socket Unix:
+    POST /predict  {"samples": [[...feature...], ...]}  oppure  {"samples": [{"nome feature": valore}, ...]}
+                   -> {"predictions": [...], "probabilities": [...]}
+    GET  /stats    -> latenze p50/p99 (ms), richieste, campioni, batch, throughput e contatori della cache
+    GET  /health   -> {"status": "ok"}
+I valori mancanti (null o feature assenti) vengono imputati con l'imputer salvato nel modello.
+
+Avvio (dalla cartella principale del progetto):
+    python -m ModelServing.prediction_server output/modello --port 8080 --batch-window-ms 2
+"""
+import argparse
+import asyncio
+import collections
+import json
+import time
+
+import numpy as np
+
+from ModelDevelopment.knn_scratch import KNN
+
+# Latenze conservate per il calcolo dei percentili (le più recenti)
+LATENCY_WINDOW = 10_000
+MAX_BODY_BYTES = 64 << 20
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+            500: 'Internal Server Error'}
+
+
+class LatencyStats:
+    """Contatori del server: latenze delle richieste (finestra scorrevole), campioni, batch e throughput."""
+    def __init__(self, window=LATENCY_WINDOW):
+        self.started = time.perf_counter()
+        self.latencies = collections.deque(maxlen=window)
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.batch_rows = 0
+        self.errors = 0
+
+    def record_request(self, seconds, n_rows):
+        self.latencies.append(seconds)
+        self.requests += 1
+        self.rows += n_rows
+
+    def record_batch(self, n_rows):
+        self.batches += 1
+        self.batch_rows += n_rows
+
+    def snapshot(self):
+        """Statistiche correnti in un dizionario serializzabile in JSON."""
+        uptime = time.perf_counter() - self.started
+        latencies_ms = np.array(self.latencies) * 1000
+        p50, p99 = np.percentile(latencies_ms, [50, 99]) if len(latencies_ms) else (0.0, 0.0)
+        return {
+            'uptime_s': round(uptime, 3),
+            'requests': self.requests,
+            'rows': self.rows,
+            'errors': self.errors,
+            'batches': self.batches,
+            'mean_batch_rows': round(self.batch_rows / self.batches, 2) if self.batches else 0.0,
+            'latency_p50_ms': round(float(p50), 3),
+            'latency_p99_ms': round(float(p99), 3),
+            'requests_per_s': round(self.requests / uptime, 2) if uptime > 0 else 0.0,
+            'rows_per_s': round(self.rows / uptime, 2) if uptime > 0 else 0.0
+        }
+
+
+class MicroBatcher:
+    """
+    Raccoglie le richieste concorrenti in micro-batch e le classifica con una sola chiamata al modello.
+
+    Il batch si chiude quando scade la finestra di attesa (dalla prima richiesta del batch) o quando
+    raggiunge max_batch_rows campioni. Il calcolo avviene in un thread separato, così nel frattempo
+    il ciclo asyncio continua ad accettare le richieste del batch successivo.
+    """
+    def __init__(self, model, batch_window_ms=2.0, max_batch_rows=1024, stats=None):
+        self.model = model
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_rows = max_batch_rows
+        self.stats = stats if stats is not None else LatencyStats()
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def predict(self, rows):
+        """Classifica una matrice di campioni; restituisce (classi, probabilità della classe positiva)."""
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((rows, future))
+        result = await future
+        self.stats.record_request(time.perf_counter() - start, len(rows))
+        return result
+
+    async def _next_batch(self):
+        """Attende la prima richiesta e raccoglie le successive entro la finestra di attesa."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        n_rows = len(batch[0][0])
+        deadline = loop.time() + self.batch_window
+        while n_rows < self.max_batch_rows:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            # Anche vstack sta nel try: un errore deve arrivare alle richieste del batch,
+            # non terminare il ciclo lasciando in attesa tutte le richieste successive
+            try:
+                rows = np.vstack([item[0] for item in batch])
+                predictions, probabilities = await loop.run_in_executor(None, self.model.test_with_proba, rows)
+            except Exception as e:
+                self.stats.errors += len(batch)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.stats.record_batch(len(rows))
+            start = 0
+            for item_rows, future in batch:
+                end = start + len(item_rows)
+                if not future.done():
+                    future.set_result((predictions[start:end], probabilities[start:end]))
+                start = end
+
+
+def parse_samples(payload, feature_names=None, imputer=None, n_features=None):
+    """
+    Converte il corpo di una richiesta di predizione in una matrice float64 (campioni x feature).
+    I campioni possono essere liste di valori (nell'ordine delle feature del modello) o dizionari
+    nome feature -> valore; null e feature assenti diventano NaN e vengono imputati se c'è un imputer.
+    n_features (numero di feature del modello) serve a controllare la larghezza dei campioni
+    quando il modello non ha nomi di feature.
+    """
+    samples = payload.get('samples') if isinstance(payload, dict) else None
+    if not isinstance(samples, list) or not samples:
+        raise ValueError("Il corpo deve contenere 'samples': una lista non vuota di campioni.")
+    if isinstance(samples[0], dict):
+        if feature_names is None:
+            raise ValueError("Il modello non ha nomi di feature: inviare i campioni come liste di valori.")
+        samples = [[sample.get(name) for name in feature_names] for sample in samples]
+    rows = np.array([[np.nan if value is None else value for value in sample] for sample in samples],
+                    dtype=np.float64)
+    if rows.ndim != 2:
+        raise ValueError("Tutti i campioni devono avere lo stesso numero di feature.")
+    expected = len(feature_names) if feature_names is not None else n_features
+    if expected is not None and rows.shape[1] != expected:
+        raise ValueError(f"Attese {expected} feature per campione, ricevute {rows.shape[1]}.")
+    if imputer is not None:
+        rows = imputer.transform(rows)
+    if np.isnan(rows).any():
+        raise ValueError("Valori mancanti nei campioni e nessun imputer salvato nel modello.")
+    return rows
+
+
+class PredictionServer:
+    """Server HTTP minimale (asyncio) davanti a un MicroBatcher."""
+    def __init__(self, model, batch_window_ms=2.0, max_batch_rows=1024):
+        self.model = model
+        self.stats = LatencyStats()
+        self.batcher = MicroBatcher(model, batch_window_ms, max_batch_rows, self.stats)
+        self._server = None
+
+    async def start(self, host='127.0.0.1', port=8080, unix_socket=None):
+        """Avvia il server; restituisce l'indirizzo effettivo (utile con port=0)."""
+        self.batcher.start()
+        if unix_socket is not None:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=unix_socket)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.batcher.stop()
+
+    async def _handle_connection(self, reader, writer):
+        """Gestisce le richieste di una connessione (keep-alive) finché il client non la chiude."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target = request_line.decode('latin-1').split()[:2]
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': "Corpo della richiesta troppo grande."}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                status, payload = await self._dispatch(method, target, body)
+                close = headers.get('connection', '').lower() == 'close'
+                await self._respond(writer, status, payload, close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, target, body):
+        path = target.split('?', 1)[0]
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path == '/stats':
+            snapshot = self.stats.snapshot()
+            if self.model.cache_info() is not None:
+                snapshot['cache'] = self.model.cache_info()
+            return 200, snapshot
+        if path != '/predict':
+            return 404, {'error': f"Percorso non trovato: {path}"}
+        if method != 'POST':
+            return 405, {'error': "Usare POST per /predict."}
+        try:
+            rows = parse_samples(json.loads(body or b'null'), self.model.feature_names, self.model.imputer,
+                                 self.model.n_features)
+        except (ValueError, TypeError) as e:
+            return 400, {'error': str(e)}
+        try:
+            predictions, probabilities = await self.batcher.predict(rows)
+        except Exception as e:
+            return 500, {'error': str(e)}
+        return 200, {'predictions': predictions.tolist(), 'probabilities': probabilities.tolist()}
+
+    @staticmethod
+    async def _respond(writer, status, payload, close=False):
+        body = json.dumps(payload).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+async def _serve(args):
+    model = KNN.load(args.model, mmap=True)
+    if args.cache_size is not None:
+        model.enable_cache(args.cache_size)
+    server = PredictionServer(model, args.batch_window_ms, args.max_batch_rows)
+    address = await server.start(args.host, args.port, args.unix_socket)
+    print(f"Modello '{args.model}' caricato ({model.n_samples} campioni, k={model.k}). "
+          f"In ascolto su {address}; finestra di batch {args.batch_window_ms} ms.")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.stop()
+        print(f"Statistiche finali: {server.stats.snapshot()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server locale di predizione KNN con micro-batching.")
+    parser.add_argument('model', help="Cartella del modello salvato con KNN.save")
+    parser.add_argument('--host', default='127.0.0.1', help="Indirizzo di ascolto (default: solo locale)")
+    parser.add_argument('--port', type=int, default=8080, help="Porta TCP")
+    parser.add_argument('--unix-socket', help="Percorso di un socket Unix (al posto di host e porta)")
+    parser.add_argument('--batch-window-ms', type=float, default=2.0,
+                        help="Attesa massima per riempire un micro-batch, in millisecondi")
+    parser.add_argument('--max-batch-rows', type=int, default=1024, help="Campioni massimi per micro-batch")
+    parser.add_argument('--cache-size', type=int,
+                        help="Campioni distinti i cui vicini restano in cache (default: quella salvata nel modello)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
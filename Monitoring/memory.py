@@ -0,0 +1,160 @@
+"""
+Profilazione della memoria per fase (opzionale, attivata con enable_memory_profiling o --memory-profile).
+
+Quando è attiva, ogni fase misurata dal timer di processo (vedi Monitoring.timing: data.split,
+knn.distance, knn.search, metrics.compute, results.* ...) registra anche, con tracemalloc:
+    - net: memoria allocata e non ancora liberata alla fine della fase;
+    - peak: picco di memoria raggiunto durante la fase, rispetto all'inizio della fase.
+Il resoconto di un'esecuzione (MemoryTracker.report) aggiunge il picco di RSS del processo e i punti
+del codice che occupavano più memoria nel momento di massima occupazione; i validatori lo salvano
+come '<prefisso>_memory.json' accanto ai risultati, per confrontare le versioni nel tempo.
+
+tracemalloc rallenta sensibilmente le allocazioni: la modalità è pensata per esecuzioni di misura.
+Le fasi eseguite in thread diversi dal principale (--jobs > 1) non vengono registrate.
+"""
+import contextlib
+import threading
+import tracemalloc
+
+from Monitoring.timing import TIMER
+
+try:
+    import resource
+except ImportError:  # Windows: picco di RSS non disponibile
+    resource = None
+
+# Frame di stack conservati per ogni allocazione e punti di allocazione riportati
+TRACEBACK_FRAMES = 10
+TOP_SITES = 15
+# Crescita minima della memoria occupata perché venga ripresa la fotografia delle allocazioni
+HIGH_WATER_GROWTH = 1.05
+
+
+def peak_rss_mb():
+    """Picco di memoria residente del processo in MB (None se non disponibile sulla piattaforma)."""
+    if resource is None:
+        return None
+    # ru_maxrss è in kilobyte su Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class MemoryTracker:
+    """
+    Picco e allocazione netta per fase, misurati con tracemalloc.
+
+    Il picco di tracemalloc è unico per il processo: all'ingresso di ogni fase viene azzerato
+    (tracemalloc.reset_peak) e il picco già raggiunto dalla fase esterna viene conservato nella
+    pila delle fasi aperte, così anche le fasi annidate hanno picchi corretti.
+
+    Alla fine di una fase i dati restituiti (fold, blocchi di distanze, vicini) sono ancora in memoria:
+    quando la memoria occupata supera il massimo precedente dell'esecuzione viene ripresa una
+    fotografia delle allocazioni (tracemalloc.take_snapshot), da cui report ricava i punti di allocazione.
+    """
+    def __init__(self, frames=TRACEBACK_FRAMES, top_sites=TOP_SITES):
+        self.frames = frames
+        self.top_sites = top_sites
+        self.peaks = {}
+        self.nets = {}
+        self._stack = []
+        self._high_water = 0
+        self._high_water_allocations = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stop(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if threading.current_thread() is not threading.main_thread() or not tracemalloc.is_tracing():
+            yield
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            self._stack[-1]['inner_peak'] = max(self._stack[-1]['inner_peak'], peak)
+        tracemalloc.reset_peak()
+        frame = {'start': current, 'inner_peak': 0}
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            current, peak = tracemalloc.get_traced_memory()
+            stage_peak = max(peak, frame['inner_peak'])
+            if self._stack:
+                self._stack[-1]['inner_peak'] = max(self._stack[-1]['inner_peak'], stage_peak)
+            self.peaks.setdefault(name, []).append(stage_peak - frame['start'])
+            self.nets.setdefault(name, []).append(current - frame['start'])
+            if current > self._high_water * HIGH_WATER_GROWTH:
+                self._high_water = current
+                self._high_water_allocations = tracemalloc.take_snapshot()
+
+    def snapshot(self):
+        """
+        Inizio di un'esecuzione: chiamate già registrate per fase e picco di RSS, da passare a report.
+        Azzera il massimo di memoria occupata, così i punti di allocazione riguardano solo l'esecuzione.
+        """
+        self._high_water = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        self._high_water_allocations = None
+        return {
+            'calls': {name: len(values) for name, values in self.peaks.items()},
+            'peak_rss_mb': peak_rss_mb()
+        }
+
+    def report(self, snapshot):
+        """
+        Resoconto dall'istante dello snapshot: per fase chiamate, picco massimo e allocazione netta
+        totale (in KB), picco di RSS del processo e punti del codice che occupavano più memoria
+        nel momento di massima occupazione.
+        """
+        stages = {}
+        for name, peaks in self.peaks.items():
+            first = snapshot['calls'].get(name, 0)
+            if len(peaks) > first:
+                stages[name] = {
+                    'calls': len(peaks) - first,
+                    'peak_kb': round(max(peaks[first:]) / 1024, 1),
+                    'net_kb': round(sum(self.nets[name][first:]) / 1024, 1)
+                }
+        sites = []
+        if self._high_water_allocations is not None:
+            ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, '<frozen *>')]
+            statistics = self._high_water_allocations.filter_traces(ignore).statistics('lineno')
+            for stat in statistics[:self.top_sites]:
+                frame = stat.traceback[0]
+                sites.append({'site': f"{frame.filename}:{frame.lineno}", 'size_kb': round(stat.size / 1024, 1),
+                              'count': stat.count})
+        return {
+            'stages': dict(sorted(stages.items(), key=lambda item: -item[1]['peak_kb'])),
+            'peak_rss_mb_start': snapshot['peak_rss_mb'],
+            'peak_rss_mb': peak_rss_mb(),
+            'high_water_kb': round(self._high_water / 1024, 1),
+            'top_allocation_sites': sites
+        }
+
+
+def enable_memory_profiling(frames=TRACEBACK_FRAMES, top_sites=TOP_SITES):
+    """Attiva la profilazione della memoria sulle fasi del timer di processo."""
+    tracker = MemoryTracker(frames, top_sites)
+    tracker.start()
+    TIMER.memory = tracker
+    return tracker
+
+
+def disable_memory_profiling():
+    if TIMER.memory is not None:
+        TIMER.memory.stop()
+        TIMER.memory = None
+
+
+def format_report(report):
+    """Tabella testuale di un resoconto di MemoryTracker.report."""
+    lines = [f"  {'fase':<28} {'picco KB':>12} {'netto KB':>12} {'chiamate':>9}"]
+    for name, values in report['stages'].items():
+        lines.append(f"  {name:<28} {values['peak_kb']:>12,.1f} {values['net_kb']:>12,.1f} {values['calls']:>9}")
+    if report['peak_rss_mb'] is not None:
+        lines.append(f"  Picco RSS del processo: {report['peak_rss_mb']:,.1f} MB")
+    return "\n".join(lines)
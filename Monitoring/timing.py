@@ -0,0 +1,142 @@
+"""
+Strumentazione leggera dei tempi per fase (pulizia, caricamento, ricerca di k, distanze, voto,
+metriche, salvataggio dei risultati).
+
+Le fasi vengono misurate con il context manager stage(nome) o con il decoratore timed(nome) e
+accumulate nel timer di processo TIMER (secondi totali e numero di chiamate per fase), insieme a
+contatori liberi (count). Le fasi possono essere annidate: ogni fase conta il proprio tempo
+complessivo, quindi i tempi di fasi annidate non vanno sommati. Con più thread (--jobs) i tempi
+delle fasi eseguite in parallelo si sommano.
+
+I validatori leggono il resoconto della propria esecuzione con TIMER.since(snapshot) e lo salvano
+con i risultati (file '<prefisso>_timings.csv' e tabella run_timings del database).
+Con la profilazione della memoria attiva (Monitoring.memory) le stesse fasi misurano anche la memoria.
+"""
+import collections
+import contextlib
+import cProfile
+import functools
+import os
+import pstats
+import threading
+import time
+
+
+class StageTimer:
+    """
+    Tempi cumulativi e numero di chiamate per fase, più contatori; sicuro tra thread.
+    memory è il MemoryTracker della profilazione della memoria, se attiva (vedi Monitoring.memory).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds = collections.defaultdict(float)
+        self.calls = collections.Counter()
+        self.counters = collections.Counter()
+        self.memory = None
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        memory_stage = self.memory.stage(name) if self.memory is not None else contextlib.nullcontext()
+        start = time.perf_counter()
+        try:
+            with memory_stage:
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.seconds[name] += elapsed
+                self.calls[name] += 1
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def snapshot(self):
+        """
+        Stato corrente: {'seconds': {...}, 'calls': {...}, 'counters': {...}}, più 'memory'
+        (MemoryTracker.snapshot) se la profilazione della memoria è attiva.
+        """
+        with self._lock:
+            snapshot = {'seconds': dict(self.seconds), 'calls': dict(self.calls), 'counters': dict(self.counters)}
+        if self.memory is not None:
+            snapshot['memory'] = self.memory.snapshot()
+        return snapshot
+
+    def since(self, snapshot):
+        """Differenza di tempi, chiamate e contatori rispetto a uno snapshot precedente (solo le voci cambiate)."""
+        with self._lock:
+            current = {'seconds': dict(self.seconds), 'calls': dict(self.calls), 'counters': dict(self.counters)}
+        return {
+            part: {name: value - snapshot[part].get(name, 0) for name, value in values.items()
+                   if value != snapshot[part].get(name, 0)}
+            for part, values in current.items()
+        }
+
+    def reset(self):
+        with self._lock:
+            self.seconds.clear()
+            self.calls.clear()
+            self.counters.clear()
+
+    def report(self, snapshot=None):
+        """Tabella testuale delle fasi ordinate per tempo (dell'intero processo o di un resoconto di since)."""
+        data = snapshot if snapshot is not None else self.snapshot()
+        lines = [f"  {'fase':<28} {'secondi':>10} {'chiamate':>9}"]
+        for name, seconds in sorted(data['seconds'].items(), key=lambda item: -item[1]):
+            lines.append(f"  {name:<28} {seconds:>10.4f} {data['calls'].get(name, 0):>9}")
+        for name, value in sorted(data['counters'].items()):
+            lines.append(f"  {name:<28} {value:>10,}")
+        return "\n".join(lines)
+
+
+# Timer di processo usato da tutta la pipeline
+TIMER = StageTimer()
+
+
+def stage(name):
+    """Context manager che misura una fase nel timer di processo."""
+    return TIMER.stage(name)
+
+
+def count(name, n=1):
+    """Incrementa un contatore del timer di processo (es. campioni di test classificati)."""
+    TIMER.count(name, n)
+
+
+def timed(name):
+    """Decoratore: misura ogni chiamata della funzione come fase name."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with TIMER.stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timings_table(breakdown):
+    """Righe (fase, secondi, chiamate) di un resoconto di StageTimer.since, ordinate per tempo."""
+    return [(name, seconds, breakdown['calls'].get(name, 0))
+            for name, seconds in sorted(breakdown['seconds'].items(), key=lambda item: -item[1])]
+
+
+def run_profiled(function, *args, output_dir='output', name='profile', **kwargs):
+    """
+    Esegue function sotto cProfile e salva in output_dir le statistiche grezze ('.prof', leggibili
+    con pstats o snakeviz) e un resoconto testuale ordinato per tempo cumulativo ('.txt').
+
+    Returns:
+        tuple: (risultato di function, percorso del resoconto testuale)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}")
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(function, *args, **kwargs)
+    finally:
+        profiler.dump_stats(f"{path}.prof")
+        with open(f"{path}.txt", 'w') as f:
+            stats = pstats.Stats(profiler, stream=f)
+            stats.sort_stats('cumulative').print_stats(60)
+            stats.sort_stats('tottime').print_stats(30)
+    return result, f"{path}.txt"
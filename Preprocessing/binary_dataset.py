@@ -0,0 +1,235 @@
+"""
+Formato binario su disco per dataset più grandi della RAM (estensione '.knnbin').
+
+Struttura del file:
+    - 8 byte: identificativo del formato (MAGIC)
+    - 8 byte: lunghezza dell'intestazione JSON (intero little-endian senza segno)
+    - intestazione JSON: numero di righe e di feature, tipo delle feature, nomi delle colonne,
+      impronta del contenuto e posizione (offset) della matrice e delle etichette
+    - matrice delle feature grezza, riga per riga (float32 o uint8), allineata a 64 byte
+    - vettore delle etichette int8 (0 = Benigno, 1 = Maligno)
+
+load_data apre questi file con np.memmap: i dati vengono letti dal disco solo quando servono
+e il KNN li scorre a blocchi consecutivi di righe, con accessi sequenziali.
+
+Conversione di un CSV pulito (a blocchi, dalla cartella principale del progetto):
+    python -m Preprocessing.binary_dataset dati_cleaned.csv dati.knnbin --dtype uint8
+"""
+import argparse
+import json
+import os
+import shutil
+import struct
+
+import numpy as np
+
+from Preprocessing.csv_reader import read_typed_csv
+from Preprocessing.dataset import Dataset, content_fingerprint
+
+MAGIC = b'KNNBIN01'
+FORMAT_VERSION = 1
+BINARY_SUFFIX = '.knnbin'
+SUPPORTED_DTYPES = ('float32', 'uint8')
+_ALIGNMENT = 64
+_LENGTH_FORMAT = '<Q'
+# Mappatura delle classi originali sulle etichette binarie (come in load_data)
+LABEL_MAPPING = {2: 0, 4: 1}
+
+
+def _aligned(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _read_header(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Il file non è un dataset binario valido (identificativo non riconosciuto).")
+    (header_length,) = struct.unpack(_LENGTH_FORMAT, f.read(struct.calcsize(_LENGTH_FORMAT)))
+    header = json.loads(f.read(header_length).decode('utf-8'))
+    if header.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Versione del dataset binario non supportata: {header.get('version')}.")
+    return header
+
+
+def _header_region_size(feature_names, target_name, dtype):
+    """
+    Spazio riservato all'intestazione prima della matrice delle feature.
+    Viene calcolato con i valori più lunghi possibili di numero di righe, offset e impronta,
+    così la matrice può essere scritta subito e l'intestazione completata alla chiusura.
+    """
+    widest = {
+        'version': FORMAT_VERSION, 'n_rows': 2 ** 64, 'n_features': len(feature_names), 'dtype': dtype,
+        'feature_names': list(feature_names), 'target_name': target_name, 'fingerprint': '0' * 32,
+        'x_offset': 2 ** 64, 'y_offset': 2 ** 64
+    }
+    return _aligned(len(MAGIC) + struct.calcsize(_LENGTH_FORMAT) + len(json.dumps(widest).encode('utf-8')))
+
+
+def _check_features(X, dtype):
+    """Verifica che le feature siano rappresentabili nel tipo scelto senza perdita di informazione."""
+    X = np.asarray(X)
+    if dtype == 'uint8' and X.size:
+        if np.any((X < 0) | (X > 255)) or np.any(X != np.round(X)):
+            raise ValueError("Il tipo uint8 richiede feature intere comprese tra 0 e 255.")
+    return np.ascontiguousarray(X, dtype=dtype)
+
+
+class BinaryDatasetWriter:
+    """
+    Scrive un dataset binario a blocchi di righe, senza tenerlo interamente in memoria.
+    Le feature vengono scritte subito nel file (dopo lo spazio riservato all'intestazione);
+    le etichette in un file temporaneo che viene accodato alla chiusura, quando è noto
+    il numero totale di righe. Il file definitivo compare solo a scrittura completata.
+    """
+    def __init__(self, path, feature_names, target_name=None, dtype='float32'):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Tipo delle feature non supportato: {dtype}. Usare uno tra {SUPPORTED_DTYPES}.")
+        self.path = path
+        self.feature_names = list(feature_names)
+        self.target_name = target_name
+        self.dtype = dtype
+        self.n_rows = 0
+        self._x_offset = _header_region_size(self.feature_names, target_name, dtype)
+        self._tmp_path = f"{path}.tmp"
+        self._labels_path = f"{path}.labels.tmp"
+        self._file = open(self._tmp_path, 'w+b')
+        self._file.seek(self._x_offset)
+        self._labels_file = open(self._labels_path, 'w+b')
+
+    def append(self, X_block, y_block):
+        """Accoda un blocco di righe (feature) e le rispettive etichette 0/1."""
+        X_block = _check_features(X_block, self.dtype)
+        y_block = np.ascontiguousarray(y_block, dtype=np.int8)
+        if X_block.ndim != 2 or X_block.shape[1] != len(self.feature_names):
+            raise ValueError(f"Attese {len(self.feature_names)} feature per riga, ricevuta forma {X_block.shape}.")
+        if len(y_block) != len(X_block):
+            raise ValueError("Il numero di etichette non corrisponde al numero di righe del blocco.")
+        self._file.write(X_block.tobytes())
+        self._labels_file.write(y_block.tobytes())
+        self.n_rows += len(X_block)
+
+    def close(self):
+        """Completa il file: etichette, impronta del contenuto e intestazione."""
+        try:
+            shape = (self.n_rows, len(self.feature_names))
+            y_offset = _aligned(self._file.tell())
+            self._file.write(b'\0' * (y_offset - self._file.tell()))
+            self._labels_file.seek(0)
+            shutil.copyfileobj(self._labels_file, self._file, length=1 << 22)
+            self._file.flush()
+
+            # L'impronta viene calcolata a blocchi rileggendo il file in memory mapping
+            if self.n_rows:
+                X = np.memmap(self._tmp_path, dtype=self.dtype, mode='r', offset=self._x_offset, shape=shape)
+                y = np.memmap(self._tmp_path, dtype=np.int8, mode='r', offset=y_offset, shape=(self.n_rows,))
+                fingerprint = content_fingerprint(X, y)
+                del X, y
+            else:
+                fingerprint = content_fingerprint(np.empty(shape), np.empty(0))
+
+            header = json.dumps({
+                'version': FORMAT_VERSION,
+                'n_rows': self.n_rows,
+                'n_features': len(self.feature_names),
+                'dtype': self.dtype,
+                'feature_names': self.feature_names,
+                'target_name': self.target_name,
+                'fingerprint': fingerprint,
+                'x_offset': self._x_offset,
+                'y_offset': y_offset
+            }).encode('utf-8')
+            self._file.seek(0)
+            self._file.write(MAGIC + struct.pack(_LENGTH_FORMAT, len(header)) + header)
+            self._file.close()
+            self._labels_file.close()
+            os.replace(self._tmp_path, self.path)
+        finally:
+            self.discard()
+        return self.path
+
+    def discard(self):
+        """Interrompe la scrittura eliminando i file temporanei."""
+        for f, path in ((self._file, self._tmp_path), (self._labels_file, self._labels_path)):
+            f.close()
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def write_binary_dataset(path, dataset, dtype='float32'):
+    """Salva un Dataset nel formato binario."""
+    with BinaryDatasetWriter(path, dataset.feature_names, dataset.target_name, dtype) as writer:
+        writer.append(dataset.X, dataset.y)
+    return path
+
+
+def open_binary_dataset(path):
+    """
+    Apre un dataset binario in memory mapping (sola lettura).
+
+    Returns:
+        Dataset: con X e y che sono np.memmap sul file.
+    """
+    with open(path, 'rb') as f:
+        header = _read_header(f)
+    shape = (header['n_rows'], header['n_features'])
+    if header['n_rows'] == 0:
+        X = np.empty(shape, dtype=header['dtype'])
+        y = np.empty(0, dtype=np.int8)
+    else:
+        X = np.memmap(path, dtype=header['dtype'], mode='r', offset=header['x_offset'], shape=shape)
+        y = np.memmap(path, dtype=np.int8, mode='r', offset=header['y_offset'], shape=(header['n_rows'],))
+    return Dataset(X, y, header['feature_names'], header['target_name'], header['fingerprint'])
+
+
+def convert_cleaned_csv(cleaned_csv_path, output_path=None, dtype='float32', chunksize=100_000,
+                        target_col='classtype_v1'):
+    """
+    Converte un CSV pulito nel formato binario leggendolo a blocchi di righe.
+    Le classi 2 (Benigno) e 4 (Maligno) vengono mappate su 0 e 1 come in load_data.
+    """
+    if output_path is None:
+        output_path = os.path.splitext(cleaned_csv_path)[0] + BINARY_SUFFIX
+    writer = None
+    try:
+        for chunk in read_typed_csv(cleaned_csv_path, chunksize=chunksize):
+            if target_col not in chunk.columns:
+                raise ValueError(f"Colonna target '{target_col}' non trovata nel file.")
+            feature_cols = [col for col in chunk.columns if col != target_col]
+            labels = chunk[target_col].map(LABEL_MAPPING)
+            if labels.isnull().any():
+                raise ValueError(f"Il dataset deve contenere esattamente le classi 2 e 4. "
+                                 f"Trovate: {sorted(chunk[target_col].dropna().unique())}")
+            if writer is None:
+                writer = BinaryDatasetWriter(output_path, feature_cols, target_col, dtype)
+            writer.append(chunk[feature_cols].to_numpy(), labels.to_numpy())
+    except BaseException:
+        if writer is not None:
+            writer.discard()
+        raise
+    if writer is None:
+        raise ValueError(f"Il file '{cleaned_csv_path}' non contiene righe.")
+    writer.close()
+    print(f"Dataset binario salvato in '{output_path}' ({writer.n_rows} righe, feature {dtype}).")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converte un CSV pulito nel formato binario '.knnbin'.")
+    parser.add_argument('cleaned_csv', help="CSV prodotto da clean_data")
+    parser.add_argument('output', nargs='?', help="File di destinazione (default: stesso nome con estensione .knnbin)")
+    parser.add_argument('--dtype', choices=SUPPORTED_DTYPES, default='float32', help="Tipo delle feature su disco")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Righe lette per blocco")
+    args = parser.parse_args()
+    convert_cleaned_csv(args.cleaned_csv, args.output, args.dtype, args.chunksize)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import importlib.util
+
+import pandas as pd
+
+
+def fastest_engine(chunksize=None):
+    """
+    Sceglie il parser CSV più veloce disponibile: pyarrow (multi-thread) se installato,
+    altrimenti il parser C di pandas. pyarrow non supporta la lettura a blocchi,
+    quindi con chunksize si usa sempre il parser C.
+    """
+    if chunksize is None and importlib.util.find_spec('pyarrow') is not None:
+        return 'pyarrow'
+    return 'c'
+
+
+def _coerced_chunks(reader, numeric_columns, numeric_dtype):
+    """
+    Converte le colonne numeriche di ogni blocco in numeric_dtype. I valori non convertibili
+    (es. '?') diventano NaN, come nella pulizia con pd.to_numeric(errors='coerce').
+    """
+    for chunk in reader:
+        for col in numeric_columns:
+            values = chunk[col]
+            if not pd.api.types.is_numeric_dtype(values):
+                coerced = pd.to_numeric(values, errors='coerce')
+                invalid = int((coerced.isna() & values.notna()).sum())
+                if invalid:
+                    print(f"Avviso: {invalid} valori non numerici nella colonna '{col}' convertiti in NaN.")
+                values = coerced
+            chunk[col] = values.astype(numeric_dtype, copy=False)
+        yield chunk
+
+
+def read_typed_csv(path, string_columns=(), skip_columns=(), numeric_dtype='float64', chunksize=None, nrows=None):
+    """
+    Legge un CSV dichiarando i tipi delle colonne prima del parsing.
+
+    - Le colonne in string_columns (es. quelle con la virgola decimale) vengono lette come
+      categoriche (ogni stringa distinta viene memorizzata una volta sola), tutte le altre
+      direttamente come numeric_dtype, senza inferenza dei tipi.
+    - Le colonne in skip_columns vengono escluse già in fase di parsing tramite usecols.
+    - Se una colonna numerica contiene valori non convertibili, si ripiega sulla lettura
+      con inferenza dei tipi (comportamento originale di pd.read_csv).
+    - Con chunksize un valore non convertibile può trovarsi in un blocco qualsiasi: le colonne
+      numeriche vengono convertite blocco per blocco e i valori non validi diventano NaN.
+
+    Returns:
+        DataFrame, oppure un iteratore di DataFrame se chunksize è indicato.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [col for col in header if col not in skip_columns]
+    dtype = {col: ('category' if col in string_columns else numeric_dtype) for col in usecols}
+    engine = fastest_engine(chunksize)
+    if nrows is not None and engine == 'pyarrow':
+        engine = 'c'  # pyarrow non supporta nrows
+
+    if chunksize is not None:
+        numeric_columns = [col for col in usecols if col not in string_columns]
+        reader = pd.read_csv(path, usecols=usecols, dtype={col: 'category' for col in string_columns if col in usecols},
+                             engine=engine, chunksize=chunksize, nrows=nrows)
+        return _coerced_chunks(reader, numeric_columns, numeric_dtype)
+
+    try:
+        return pd.read_csv(path, usecols=usecols, dtype=dtype, engine=engine, nrows=nrows)
+    except (ValueError, TypeError) as e:
+        print(f"Avviso: lettura tipizzata non riuscita ({e}). Uso la lettura con inferenza dei tipi.")
+        return pd.read_csv(path, usecols=usecols, nrows=nrows)
@@ -1,10 +1,139 @@
+import numpy as np
 import pandas as pd
 import os
 
-def clean_data(input_csv_path=None):
+from Monitoring.timing import timed
+from Preprocessing.csv_reader import read_typed_csv
+from Preprocessing.dataset_cache import CleanedDatasetCache
+from Preprocessing.imputer import MeanImputer
+
+# Colonne con la virgola come separatore decimale (es. "3,0")
+COLS_TO_FIX = ['Single Epithelial Cell Size', 'Bland Chromatin']
+# Colonna target
+TARGET_COLUMN = 'classtype_v1'
+# Colonne che non sono utili per l'analisi
+COLUMNS_TO_DROP = ['Sample code number', 'BareNucleix_wrong', 'Blood Pressure', 'Heart Rate']
+# Configurazione della pulizia: fa parte della chiave della cache, se cambia la cache non è più valida
+CLEANER_CONFIG = {
+    'version': 1,
+    'cols_to_fix': COLS_TO_FIX,
+    'target': TARGET_COLUMN,
+    'columns_to_drop': COLUMNS_TO_DROP
+}
+
+
+def _parse_decimal_strings(values):
+    """Converte in numerico stringhe con virgola o punto decimale (valori non validi -> NaN)."""
+    return pd.to_numeric(pd.Series(values).str.replace(',', '.', regex=False), errors='coerce')
+
+
+def _fix_decimal_columns(df, warn=True):
+    """
+    Uniforma i dati: sostituisce le virgole con i punti nelle colonne COLS_TO_FIX
+    e le converte in numerico.
+    Con read_typed_csv le colonne arrivano come categoriche: la conversione viene fatta una sola
+    volta per ogni valore distinto (pochi, le feature sono ordinali) e poi applicata ai codici
+    con un'indicizzazione NumPy, senza conversioni riga per riga float -> str -> float.
+    """
+    for col in COLS_TO_FIX:
+        if col in df.columns:
+            if pd.api.types.is_numeric_dtype(df[col]):
+                continue  # Nessuna virgola decimale da correggere
+            try:
+                if isinstance(df[col].dtype, pd.CategoricalDtype):
+                    category_values = _parse_decimal_strings(df[col].cat.categories).to_numpy(dtype=np.float64)
+                    codes = df[col].cat.codes.to_numpy()
+                    # Il codice -1 indica un valore mancante
+                    df[col] = np.where(codes >= 0, category_values[codes], np.nan)
+                else:
+                    # Convertire in numerico, forzando gli errori a NaN (anche se ci aspettiamo che siano correggibili)
+                    df[col] = _parse_decimal_strings(df[col].astype(str)).to_numpy()
+            except Exception as e:
+                print(f"Errore durante l'elaborazione della colonna '{col}': {e}")
+        elif warn:
+            print(f"Avviso: Colonna '{col}' non trovata nel dataset.")
+    return df
+
+
+def imputer_path(cleaned_csv_path):
+    """Percorso del file con l'imputer appreso, salvato accanto al CSV pulito."""
+    return f"{os.path.splitext(cleaned_csv_path)[0]}_imputer.npz"
+
+
+def _report_imputation(imputer, cols_with_missing):
+    """Stampa le medie usate per l'imputazione delle colonne con valori mancanti."""
+    for col in cols_with_missing:
+        mean_value = imputer.means[imputer.feature_names.index(col)]
+        print(f"  - Imputati valori mancanti nella colonna '{col}' con la media ({mean_value:.2f}).")
+    if not cols_with_missing:
+        print("  - Nessuna imputazione necessaria, non ci sono valori mancanti nelle colonne numeriche.")
+
+
+def _save_imputer(imputer, output_columns, cleaned_csv_path):
+    """
+    Salva l'imputer limitato alle feature del dataset pulito, così i nuovi dati in inferenza
+    vengono imputati con le medie del dataset di addestramento.
+    """
+    feature_cols = [col for col in output_columns if col != TARGET_COLUMN and col in imputer.feature_names]
+    try:
+        imputer.select(feature_cols).save(imputer_path(cleaned_csv_path))
+    except OSError as e:
+        print(f"Avviso: impossibile salvare l'imputer: {e}")
+
+
+def _cleaner_config(prune_columns):
+    """Configurazione effettiva della pulizia, usata come parte della chiave della cache."""
+    return dict(CLEANER_CONFIG, prune_columns=prune_columns)
+
+
+def transform_features(chunk, feature_names, imputer=None):
+    """
+    Applica a un blocco di nuovi dati (anche senza target) la trasformazione della pulizia usata in
+    addestramento: correzione delle virgole decimali, selezione delle feature nell'ordine del modello
+    e imputazione dei valori mancanti con le medie del dataset di addestramento.
+
+    Returns:
+        np.ndarray: Matrice float64 (righe x feature).
+    """
+    chunk = _fix_decimal_columns(chunk, warn=False)
+    missing = [name for name in feature_names if name not in chunk.columns]
+    if missing:
+        raise ValueError(f"Colonne mancanti nei dati da classificare: {missing}")
+    values = chunk[list(feature_names)].to_numpy(dtype=np.float64, na_value=np.nan)
+    return imputer.transform(values) if imputer is not None else values
+
+
+def _read_source_csv(input_csv_path, prune_columns, chunksize=None):
+    """
+    Legge il CSV sorgente con tipi dichiarati (vedi read_typed_csv).
+    Con prune_columns=True le colonne di COLUMNS_TO_DROP non vengono nemmeno lette.
+    """
+    return read_typed_csv(input_csv_path, string_columns=COLS_TO_FIX,
+                          skip_columns=COLUMNS_TO_DROP if prune_columns else (), chunksize=chunksize)
+
+
+def _record_cache(input_csv_path, output_csv_path, prune_columns):
+    """Registra nella cache la pulizia appena completata (gli errori non bloccano la pulizia)."""
+    try:
+        CleanedDatasetCache.for_source(input_csv_path).record_cleaning(input_csv_path, _cleaner_config(prune_columns),
+                                                                       output_csv_path)
+    except OSError as e:
+        print(f"Avviso: impossibile aggiornare la cache del dataset: {e}")
+
+
+@timed('data.clean')
+def clean_data(input_csv_path=None, chunksize=None, use_cache=True, prune_columns=False, interactive=True):
     """
     Pulisce il dataset specificato.
-    Se input_csv_path non è fornito, chiede all'utente di inserirlo.
+    Se input_csv_path non è fornito, chiede all'utente di inserirlo; con interactive=False
+    (esecuzioni automatiche) non chiede nulla e solleva un'eccezione se il file non è valido.
+    Se chunksize è indicato, il file viene elaborato in streaming a blocchi di chunksize righe
+    (vedi _clean_data_streaming), così la memoria resta limitata anche per CSV più grandi della RAM.
+    Con use_cache=True la pulizia viene saltata se il CSV sorgente (dimensione, mtime, hash) e la
+    configurazione non sono cambiati dall'ultima esecuzione (vedi CleanedDatasetCache).
+    Con prune_columns=True le colonne da eliminare non vengono lette dal parser: è più veloce, ma
+    i duplicati vengono cercati solo sulle colonne rimaste (righe che differivano solo per
+    'Sample code number' o per le colonne di rumore vengono considerate duplicate).
     """
     
     # Costruisce un percorso robusto per i file, partendo dalla posizione dello script.
@@ -13,6 +142,8 @@ def clean_data(input_csv_path=None):
     csv_container_dir = os.path.join(project_root, 'contenitore csv')
 
     while True:
+        if input_csv_path is None and not interactive:
+            raise ValueError("Nessun file CSV valido da pulire.")
         if input_csv_path is None:
             print(f"\n--- Pulizia Dati ---")
             
@@ -67,9 +198,19 @@ def clean_data(input_csv_path=None):
         filename_without_ext = os.path.splitext(input_filename)[0]
         output_csv_path = os.path.join(input_dir, f"{filename_without_ext}_cleaned.csv")
 
+        # Se il file sorgente non è cambiato dall'ultima pulizia, riusa il risultato senza rileggerlo
+        if use_cache and CleanedDatasetCache.for_source(input_csv_path).is_fresh(
+                input_csv_path, _cleaner_config(prune_columns), output_csv_path):
+            print(f"File '{input_filename}' invariato dall'ultima pulizia: uso il dataset pulito in cache.")
+            return output_csv_path
+
         # Legge il file CSV in un DataFrame
+        # (in modalità streaming legge solo l'intestazione per verificare che il file sia valido)
         try:
-            df = pd.read_csv(input_csv_path)
+            if chunksize:
+                df = pd.read_csv(input_csv_path, nrows=0)
+            else:
+                df = _read_source_csv(input_csv_path, prune_columns)
             print(f"File '{os.path.basename(input_csv_path)}' letto correttamente.")
             break # Esce dal ciclo while se la lettura ha successo
         except FileNotFoundError:
@@ -86,25 +227,16 @@ def clean_data(input_csv_path=None):
             input_csv_path = None
             continue
 
-    # 1. Uniformare i dati: Sostituire le virgole con i punti e convertire in numerico
-    cols_to_fix = ['Single Epithelial Cell Size', 'Bland Chromatin']
+    if chunksize:
+        return _clean_data_streaming(input_csv_path, output_csv_path, chunksize, prune_columns)
 
-    for col in cols_to_fix:
-        if col in df.columns:
-            try:
-                # Assicurarsi che la colonna sia di tipo stringa prima della sostituzione
-                df[col] = df[col].astype(str).str.replace(',', '.')
-                # Convertire in numerico, forzando gli errori a NaN (anche se ci aspettiamo che siano correggibili)
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-            except Exception as e:
-                print(f"Errore durante l'elaborazione della colonna '{col}': {e}")
-        else:
-            print(f"Avviso: Colonna '{col}' non trovata nel dataset.")
+    # 1. Uniformare i dati: Sostituire le virgole con i punti e convertire in numerico
+    df = _fix_decimal_columns(df)
 
     # Analisi dei valori mancanti e sostituzione dei valori non validi
     # Rimuovere le righe con valori target mancanti perché non possono essere utilizzate per l'apprendimento supervisionato
-    if 'classtype_v1' in df.columns:
-        df_clean = df.dropna(subset=['classtype_v1'])
+    if TARGET_COLUMN in df.columns:
+        df_clean = df.dropna(subset=[TARGET_COLUMN])
     else:
         print("Avviso: Colonna target 'classtype_v1' non trovata. Impossibile rimuovere righe con target mancante.")
         df_clean = df.copy()
@@ -113,20 +245,16 @@ def clean_data(input_csv_path=None):
     # Imputazione dei valori mancanti con la media
     # Per ogni colonna che ha ancora valori mancanti, sostituiamo i NaN con la media di quella colonna.
     # Questo è un approccio comune per gestire i dati mancanti senza perdere righe intere.
+    # Le medie di tutte le colonne numeriche vengono apprese in un solo passaggio (MeanImputer)
+    # e salvate accanto al CSV pulito per applicarle ai nuovi dati in inferenza.
     print("\nInizio imputazione dei valori mancanti con la media...")
-    imputation_performed = False
-    for col in df_clean.columns:
-        # Applica l'imputazione solo a colonne numeriche che hanno valori mancanti
-        if pd.api.types.is_numeric_dtype(df_clean[col]) and df_clean[col].isnull().any():
-            # Calcola la media della colonna (ignorando i valori NaN esistenti)
-            mean_value = df_clean[col].mean()
-            # Sostituisci i NaN con la media calcolata
-            df_clean[col].fillna(mean_value, inplace=True)
-            print(f"  - Imputati valori mancanti nella colonna '{col}' con la media ({mean_value:.2f}).")
-            imputation_performed = True
-
-    if not imputation_performed:
-        print("  - Nessuna imputazione necessaria, non ci sono valori mancanti nelle colonne numeriche.")
+    numeric_cols = [col for col in df_clean.columns if pd.api.types.is_numeric_dtype(df_clean[col])]
+    imputer = MeanImputer().fit(df_clean[numeric_cols])
+    cols_with_missing = [col for col in numeric_cols if df_clean[col].isnull().any()]
+    if cols_with_missing:
+        imputed = imputer.select(cols_with_missing).transform(df_clean[cols_with_missing])
+        df_clean = df_clean.assign(**dict(zip(cols_with_missing, imputed.T)))
+    _report_imputation(imputer, cols_with_missing)
 
     # Rimozione delle righe duplicate
     # Questo passaggio viene eseguito dopo la pulizia e l'imputazione per massimizzare l'efficacia,
@@ -138,15 +266,99 @@ def clean_data(input_csv_path=None):
 
 
     # Rimuovere le colonne che non sono utili per l'analisi
-    columns_to_drop = ['Sample code number', 'BareNucleix_wrong', 'Blood Pressure', 'Heart Rate']
-    df_clean = df_clean.drop(columns=columns_to_drop, errors='ignore')
+    df_clean = df_clean.drop(columns=COLUMNS_TO_DROP, errors='ignore')
 
     # Salvare il dataset pulito
     try:
         df_clean.to_csv(output_csv_path, index=False)
         print(f"\nDataset pulito salvato in: {output_csv_path}")
         print("Dimensioni dopo la pulizia:", df_clean.shape)
+        _save_imputer(imputer, df_clean.columns, output_csv_path)
+        _record_cache(input_csv_path, output_csv_path, prune_columns)
         return output_csv_path
     except Exception as e:
         print(f"Errore durante il salvataggio del file pulito: {e}")
         return None
+
+
+def _clean_data_streaming(input_csv_path, output_csv_path, chunksize, prune_columns=False):
+    """
+    Versione a blocchi di clean_data per CSV più grandi della memoria disponibile.
+    Applica gli stessi passaggi della versione in memoria con due letture del file:
+    1. Primo passaggio: aggiorna a blocchi le medie di ogni colonna numerica (MeanImputer.partial_fit).
+    2. Secondo passaggio: corregge e imputa ogni blocco, elimina i duplicati (anche tra blocchi
+       diversi) tramite un insieme di hash delle righe e accoda il blocco al file '_cleaned.csv'.
+    Il picco di memoria dipende da chunksize, non dalla dimensione del file.
+    """
+    def prepare_chunk(chunk, warn=False):
+        chunk = _fix_decimal_columns(chunk, warn=warn)
+        if TARGET_COLUMN in chunk.columns:
+            chunk = chunk.dropna(subset=[TARGET_COLUMN])
+        return chunk
+
+    print(f"\nPulizia in streaming a blocchi di {chunksize} righe...")
+
+    # 1. Primo passaggio: medie cumulative
+    imputer = MeanImputer()
+    numeric_cols = None
+    float_cols = set()
+    cols_with_missing = set()
+    for i, chunk in enumerate(_read_source_csv(input_csv_path, prune_columns, chunksize)):
+        chunk = prepare_chunk(chunk, warn=(i == 0))
+        if i == 0 and TARGET_COLUMN not in chunk.columns:
+            print("Avviso: Colonna target 'classtype_v1' non trovata. Impossibile rimuovere righe con target mancante.")
+        # Una colonna è numerica solo se lo è in tutti i blocchi
+        chunk_numeric = [col for col in chunk.columns if pd.api.types.is_numeric_dtype(chunk[col])]
+        numeric_cols = chunk_numeric if numeric_cols is None else [c for c in numeric_cols if c in chunk_numeric]
+        imputer.partial_fit(chunk[chunk_numeric])
+        float_cols.update(col for col in chunk_numeric if pd.api.types.is_float_dtype(chunk[col]))
+        cols_with_missing.update(chunk.columns[chunk.isnull().any()])
+
+    if numeric_cols is None:
+        print("ERRORE: il file non contiene righe da elaborare.")
+        return None
+
+    print("\nInizio imputazione dei valori mancanti con la media...")
+    cols_to_impute = [col for col in numeric_cols if col in cols_with_missing]
+    missing_imputer = imputer.select(cols_to_impute)
+    _report_imputation(imputer, cols_to_impute)
+
+    # 2. Secondo passaggio: imputazione, deduplicazione e scrittura a blocchi
+    # Le colonne che in almeno un blocco sono float vengono convertite a float in tutti i blocchi,
+    # così la stessa riga produce lo stesso hash indipendentemente dal blocco in cui si trova.
+    float_cols = [col for col in numeric_cols if col in float_cols]
+    seen_digests = set()
+    rows_read = rows_written = 0
+    n_columns = 0
+    output_columns = []
+    try:
+        for i, chunk in enumerate(_read_source_csv(input_csv_path, prune_columns, chunksize)):
+            chunk = prepare_chunk(chunk)
+            rows_read += len(chunk)
+            chunk = chunk.astype({col: 'float64' for col in float_cols})
+            if cols_to_impute:
+                chunk[cols_to_impute] = missing_imputer.transform(chunk[cols_to_impute])
+
+            digests = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+            # Scarta i duplicati interni al blocco e quelli già visti nei blocchi precedenti
+            keep = ~pd.Series(digests).duplicated().to_numpy()
+            keep &= [digest not in seen_digests for digest in digests.tolist()]
+            seen_digests.update(digests[keep].tolist())
+            chunk = chunk[keep]
+
+            chunk = chunk.drop(columns=COLUMNS_TO_DROP, errors='ignore')
+            chunk.to_csv(output_csv_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            rows_written += len(chunk)
+            n_columns = chunk.shape[1]
+            output_columns = chunk.columns
+    except Exception as e:
+        print(f"Errore durante il salvataggio del file pulito: {e}")
+        return None
+
+    print("\nRimozione delle righe duplicate...")
+    print(f"  - Rimosse {rows_read - rows_written} righe duplicate.")
+    print(f"\nDataset pulito salvato in: {output_csv_path}")
+    print("Dimensioni dopo la pulizia:", (rows_written, n_columns))
+    _save_imputer(imputer, output_columns, output_csv_path)
+    _record_cache(input_csv_path, output_csv_path, prune_columns)
+    return output_csv_path
@@ -0,0 +1,118 @@
+import hashlib
+
+import numpy as np
+
+
+def content_fingerprint(X, Y, block_rows=65536):
+    """
+    Calcola un'impronta del contenuto del dataset (feature e target).
+    Due dataset con gli stessi valori producono la stessa impronta,
+    indipendentemente dal formato (lista, array numpy, memmap, DataFrame).
+    Le righe vengono convertite e lette a blocchi, così anche i dataset su disco più grandi
+    della RAM possono essere elaborati.
+
+    Returns:
+        str: Digest esadecimale di 32 caratteri.
+    """
+    X_arr = X if isinstance(X, np.ndarray) else np.asarray(X, dtype=np.float64)
+    Y_arr = Y if isinstance(Y, np.ndarray) else np.asarray(Y, dtype=np.int64)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(X_arr.shape).encode())
+    for start in range(0, len(X_arr), block_rows):
+        digest.update(np.ascontiguousarray(X_arr[start:start + block_rows], dtype=np.float64).tobytes())
+    for start in range(0, len(Y_arr), block_rows):
+        digest.update(np.ascontiguousarray(Y_arr[start:start + block_rows], dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def _contiguous(values, dtype):
+    """Array contiguo del tipo richiesto; gli array (e i memmap) già conformi vengono restituiti tali e quali."""
+    if isinstance(values, np.ndarray) and values.dtype == dtype and values.flags.c_contiguous:
+        return values
+    return np.ascontiguousarray(values, dtype=dtype)
+
+
+class Dataset:
+    """
+    Contenitore compatto del dataset, passato così com'è da load_data ai validatori e al KNN.
+
+    - X: matrice delle feature float32 (o uint8 per feature intere 0-255) contigua
+      (righe = campioni), anche in memory mapping.
+    - y: vettore delle etichette int8 (0 = Benigno, 1 = Maligno).
+    - feature_names / target_name: nomi delle colonne del CSV pulito.
+    - fingerprint: impronta del contenuto, calcolata una sola volta alla prima richiesta.
+
+    Se X e y hanno già il tipo e la disposizione attesi non vengono copiati.
+    """
+    FEATURE_DTYPE = np.float32
+    COMPACT_FEATURE_DTYPE = np.uint8
+    LABEL_DTYPE = np.int8
+
+    def __init__(self, X, y, feature_names=None, target_name=None, fingerprint=None):
+        feature_dtype = self.COMPACT_FEATURE_DTYPE if getattr(X, 'dtype', None) == self.COMPACT_FEATURE_DTYPE \
+            else self.FEATURE_DTYPE
+        self.X = _contiguous(X, feature_dtype)
+        self.y = _contiguous(y, self.LABEL_DTYPE)
+        if self.X.ndim != 2:
+            raise ValueError(f"La matrice delle feature deve essere 2D, ricevuta forma {self.X.shape}.")
+        if self.y.shape != (self.X.shape[0],):
+            raise ValueError(f"Etichette ({self.y.shape[0] if self.y.ndim else 0}) e campioni "
+                             f"({self.X.shape[0]}) non corrispondono.")
+        if feature_names is None:
+            feature_names = [str(i) for i in range(self.X.shape[1])]
+        self.feature_names = list(feature_names)
+        if len(self.feature_names) != self.X.shape[1]:
+            raise ValueError(f"Attesi {self.X.shape[1]} nomi di feature, ricevuti {len(self.feature_names)}.")
+        self.target_name = target_name
+        self._fingerprint = fingerprint
+
+    @classmethod
+    def from_frame(cls, X, Y):
+        """Crea un Dataset da DataFrame/Series pandas (o da liste/array)."""
+        feature_names = [str(col) for col in X.columns] if hasattr(X, 'columns') else None
+        target_name = getattr(Y, 'name', None)
+        X_values = X.to_numpy(dtype=cls.FEATURE_DTYPE) if hasattr(X, 'to_numpy') else X
+        Y_values = Y.to_numpy() if hasattr(Y, 'to_numpy') else Y
+        return cls(X_values, Y_values, feature_names, target_name)
+
+    def __len__(self):
+        return self.X.shape[0]
+
+    def __repr__(self):
+        return f"Dataset(campioni={len(self)}, feature={self.n_features})"
+
+    @property
+    def n_features(self):
+        return self.X.shape[1]
+
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = content_fingerprint(self.X, self.y)
+        return self._fingerprint
+
+    def subset(self, indices):
+        """Restituisce un nuovo Dataset con le sole righe indicate (nell'ordine dato)."""
+        indices = np.asarray(indices, dtype=np.intp)
+        return Dataset(self.X[indices], self.y[indices], self.feature_names, self.target_name)
+
+
+def as_arrays(X, Y=None):
+    """
+    Converte feature e target nel formato usato dal KNN: una matrice numerica 2D e un vettore.
+
+    - Se X è un Dataset, vengono restituiti direttamente i suoi array (Y viene ignorato).
+    - Gli array numpy in virgola mobile o uint8 (anche memmap) vengono restituiti senza copia;
+      DataFrame, Series e liste vengono convertiti una sola volta.
+    """
+    if isinstance(X, Dataset):
+        return X.X, X.y
+    X_arr = X.to_numpy() if hasattr(X, 'to_numpy') else np.asarray(X)
+    if not np.issubdtype(X_arr.dtype, np.floating) and X_arr.dtype != Dataset.COMPACT_FEATURE_DTYPE:
+        X_arr = X_arr.astype(np.float64)
+    if X_arr.ndim == 1:
+        X_arr = X_arr.reshape(-1, 1) if len(X_arr) else X_arr.reshape(0, 0)
+    Y_arr = None
+    if Y is not None:
+        Y_arr = Y.to_numpy() if hasattr(Y, 'to_numpy') else np.asarray(Y)
+    return X_arr, Y_arr
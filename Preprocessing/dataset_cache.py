@@ -0,0 +1,156 @@
+import os
+import json
+import hashlib
+
+import numpy as np
+
+# Versione del formato della cache: va incrementata se cambia il contenuto dei file salvati
+CACHE_FORMAT_VERSION = 2
+CLEANED_SUFFIX = '_cleaned.csv'
+
+
+def file_fingerprint(path, with_hash=True, block_size=1 << 20):
+    """
+    Calcola l'impronta di un file: dimensione, data di modifica e (opzionalmente)
+    hash del contenuto letto a blocchi.
+    """
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        fingerprint['hash'] = digest.hexdigest()
+    return fingerprint
+
+
+def _atomic_write_json(path, data):
+    """Scrive un file JSON in modo atomico (file temporaneo + rename)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+class CleanedDatasetCache:
+    """
+    Cache binaria del dataset pulito, salvata nella cartella '<nome>_cache' accanto al CSV sorgente.
+
+    - clean_data registra in 'meta.json' l'impronta del CSV sorgente (dimensione, mtime, hash),
+      la configurazione della pulizia e lo stato del file '_cleaned.csv' prodotto.
+      Se al lancio successivo impronta e configurazione coincidono, la pulizia viene saltata.
+    - load_data, al primo caricamento, salva feature (float32) e target (int8) come file .npy insieme
+      all'impronta del contenuto; dai caricamenti successivi li apre direttamente con
+      np.load(mmap_mode='r') senza rileggere il CSV né ricalcolare l'impronta.
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.meta_path = os.path.join(cache_dir, 'meta.json')
+        self.x_path = os.path.join(cache_dir, 'X.npy')
+        self.y_path = os.path.join(cache_dir, 'Y.npy')
+
+    @classmethod
+    def for_source(cls, source_csv_path):
+        """Cache associata a un CSV sorgente (es. 'dati.csv' -> 'dati_cache/')."""
+        source_dir = os.path.dirname(source_csv_path)
+        stem = os.path.splitext(os.path.basename(source_csv_path))[0]
+        return cls(os.path.join(source_dir, f"{stem}_cache"))
+
+    @classmethod
+    def for_cleaned(cls, cleaned_csv_path):
+        """
+        Cache associata a un CSV pulito (es. 'dati_cleaned.csv' -> 'dati_cache/').
+        Restituisce None se il nome del file non segue la convenzione di clean_data.
+        """
+        filename = os.path.basename(cleaned_csv_path)
+        if not filename.endswith(CLEANED_SUFFIX):
+            return None
+        stem = filename[:-len(CLEANED_SUFFIX)]
+        return cls(os.path.join(os.path.dirname(cleaned_csv_path), f"{stem}_cache"))
+
+    def read_meta(self):
+        """Legge i metadati della cache (None se assenti, corrotti o di un'altra versione)."""
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('version') != CACHE_FORMAT_VERSION:
+            return None
+        return meta
+
+    def _cleaned_matches(self, meta, cleaned_csv_path):
+        """Verifica che il CSV pulito sia ancora quello registrato nei metadati."""
+        if not os.path.exists(cleaned_csv_path):
+            return False
+        recorded = meta.get('cleaned', {})
+        return (recorded.get('filename') == os.path.basename(cleaned_csv_path)
+                and recorded.get('fingerprint') == file_fingerprint(cleaned_csv_path, with_hash=False))
+
+    def is_fresh(self, source_csv_path, config, cleaned_csv_path):
+        """
+        True se il CSV sorgente e la configurazione della pulizia non sono cambiati
+        dall'ultima esecuzione e il CSV pulito è ancora presente e intatto.
+        """
+        meta = self.read_meta()
+        if meta is None or meta.get('config') != config:
+            return False
+        if not self._cleaned_matches(meta, cleaned_csv_path):
+            return False
+        recorded_source = meta.get('source', {})
+        # Confronto rapido su dimensione e mtime prima di calcolare l'hash del contenuto
+        quick = file_fingerprint(source_csv_path, with_hash=False)
+        if any(recorded_source.get(key) != value for key, value in quick.items()):
+            return False
+        return recorded_source == file_fingerprint(source_csv_path)
+
+    def record_cleaning(self, source_csv_path, config, cleaned_csv_path):
+        """Registra una pulizia appena completata, invalidando gli array salvati in precedenza."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for path in (self.x_path, self.y_path):
+            if os.path.exists(path):
+                os.remove(path)
+        _atomic_write_json(self.meta_path, {
+            'version': CACHE_FORMAT_VERSION,
+            'config': config,
+            'source': file_fingerprint(source_csv_path),
+            'cleaned': {
+                'filename': os.path.basename(cleaned_csv_path),
+                'fingerprint': file_fingerprint(cleaned_csv_path, with_hash=False)
+            }
+        })
+
+    def has_arrays(self, cleaned_csv_path):
+        """True se gli array binari corrispondono al CSV pulito indicato."""
+        meta = self.read_meta()
+        return (meta is not None and 'arrays' in meta and self._cleaned_matches(meta, cleaned_csv_path)
+                and os.path.exists(self.x_path) and os.path.exists(self.y_path))
+
+    def can_store_arrays(self, cleaned_csv_path):
+        """True se il CSV pulito è stato registrato da clean_data e si possono salvare gli array."""
+        meta = self.read_meta()
+        return meta is not None and self._cleaned_matches(meta, cleaned_csv_path)
+
+    def store_arrays(self, X, Y, feature_names, target_name, fingerprint=None):
+        """Salva feature e target come .npy (memory-mappable) e aggiorna i metadati."""
+        meta = self.read_meta()
+        for path, array in ((self.x_path, X), (self.y_path, Y)):
+            tmp_path = f"{path}.tmp.npy"
+            np.save(tmp_path, np.ascontiguousarray(array))
+            os.replace(tmp_path, path)
+        meta['arrays'] = {'feature_names': list(feature_names), 'target': target_name, 'fingerprint': fingerprint}
+        _atomic_write_json(self.meta_path, meta)
+
+    def load_arrays(self, mmap_mode='r'):
+        """
+        Apre gli array salvati in memory mapping.
+
+        Returns:
+            tuple: (X, Y, feature_names, target_name, fingerprint)
+        """
+        meta = self.read_meta()
+        X = np.load(self.x_path, mmap_mode=mmap_mode)
+        Y = np.load(self.y_path, mmap_mode=mmap_mode)
+        arrays = meta['arrays']
+        return X, Y, arrays['feature_names'], arrays['target'], arrays.get('fingerprint')
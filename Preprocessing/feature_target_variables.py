@@ -1,10 +1,22 @@
 import pandas as pd
 import os
 
-def load_data(cleaned_file_path=None):
+from Monitoring.timing import timed
+from Preprocessing.binary_dataset import BINARY_SUFFIX, open_binary_dataset
+from Preprocessing.csv_reader import read_typed_csv
+from Preprocessing.dataset import Dataset
+from Preprocessing.dataset_cache import CleanedDatasetCache
+
+@timed('data.load')
+def load_data(cleaned_file_path=None, use_cache=True, interactive=True):
     """
-    Carica il dataset pulito e restituisce le feature (X) e la variabile target (Y).
-    Se cleaned_file_path non è fornito, lo chiede all'utente.
+    Carica il dataset pulito e lo restituisce come Dataset (feature float32, target int8 0/1).
+    Se cleaned_file_path non è fornito, lo chiede all'utente; con interactive=False non chiede
+    nulla e solleva FileNotFoundError se il file non esiste.
+    I file in formato binario ('.knnbin') vengono aperti in memory mapping, senza caricarli in RAM.
+    Con use_cache=True, se il file è stato prodotto da clean_data, feature e target vengono
+    salvati in formato binario al primo caricamento e riaperti in memory mapping nei successivi,
+    senza rileggere il CSV (il Dataset usa direttamente gli array mappati, senza copia).
     """
     # Ottiene il percorso della directory padre di questo file
     current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -13,6 +25,8 @@ def load_data(cleaned_file_path=None):
     csv_container_dir = os.path.join(project_root, 'contenitore csv')
 
     while True:
+        if cleaned_file_path is None and not interactive:
+            raise FileNotFoundError("Nessun file di dataset pulito da caricare.")
         if cleaned_file_path is None:
             print(f"\n--- Caricamento Dati ---")
             
@@ -20,10 +34,10 @@ def load_data(cleaned_file_path=None):
             available_cleaned = []
             
             # Cerca nella root
-            available_cleaned += [os.path.join(project_root, f) for f in os.listdir(project_root) if f.endswith('_cleaned.csv')]
+            available_cleaned += [os.path.join(project_root, f) for f in os.listdir(project_root) if f.endswith(('_cleaned.csv', BINARY_SUFFIX))]
             # Cerca in 'contenitore csv'
             if os.path.exists(csv_container_dir):
-                available_cleaned += [os.path.join(csv_container_dir, f) for f in os.listdir(csv_container_dir) if f.endswith('_cleaned.csv')]
+                available_cleaned += [os.path.join(csv_container_dir, f) for f in os.listdir(csv_container_dir) if f.endswith(('_cleaned.csv', BINARY_SUFFIX))]
 
             if available_cleaned:
                 print("File puliti trovati:")
@@ -74,8 +88,20 @@ def load_data(cleaned_file_path=None):
         
         break
 
-    # Carica il dataset pulito
-    df_clean = pd.read_csv(cleaned_file_path)
+    if cleaned_file_path.endswith(BINARY_SUFFIX):
+        dataset = open_binary_dataset(cleaned_file_path)
+        print(f"File '{os.path.basename(cleaned_file_path)}' aperto in memory mapping "
+              f"({len(dataset)} campioni, feature {dataset.X.dtype}).")
+        return dataset
+
+    cache = CleanedDatasetCache.for_cleaned(cleaned_file_path) if use_cache else None
+    if cache is not None and cache.has_arrays(cleaned_file_path):
+        X_arr, Y_arr, feature_cols, target_col, fingerprint = cache.load_arrays()
+        print(f"File '{os.path.basename(cleaned_file_path)}' caricato dalla cache binaria.")
+        return Dataset(X_arr, Y_arr, feature_cols, target_col, fingerprint)
+
+    # Carica il dataset pulito: dopo la pulizia tutte le colonne sono numeriche
+    df_clean = read_typed_csv(cleaned_file_path)
     print(f"File '{os.path.basename(cleaned_file_path)}' caricato con successo.")
 
     # Definisce la variabile target
@@ -92,8 +118,15 @@ def load_data(cleaned_file_path=None):
 
     # Definisce le feature (tutte le colonne tranne la variabile target)
     feature_cols = [col for col in df_clean.columns if col not in [target_col]]
-    # Crea il dataset delle feature (X) e la variabile target (Y)
-    X = df_clean[feature_cols]
-    Y = df_clean[target_col]
+    # Crea il dataset compatto: feature (X) e variabile target (Y)
+    dataset = Dataset.from_frame(df_clean[feature_cols], df_clean[target_col])
+
+    # Salva le versioni binarie per i caricamenti successivi
+    if cache is not None and cache.can_store_arrays(cleaned_file_path):
+        try:
+            cache.store_arrays(dataset.X, dataset.y, dataset.feature_names, dataset.target_name,
+                               dataset.fingerprint)
+        except OSError as e:
+            print(f"Avviso: impossibile salvare la cache binaria del dataset: {e}")
 
-    return X, Y
+    return dataset
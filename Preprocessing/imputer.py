@@ -0,0 +1,111 @@
+import numpy as np
+
+
+class MeanImputer:
+    """
+    Imputazione dei valori mancanti con la media, con stato appreso riutilizzabile.
+
+    fit() calcola le medie di tutte le colonne in un unico passaggio vettoriale; partial_fit()
+    le aggiorna a blocchi (somme e conteggi cumulativi) per i file letti in streaming.
+    transform() applica le medie apprese con un solo np.where sull'intera matrice: nuovi
+    batch in inferenza vengono imputati con le medie del dataset di addestramento, non con le loro.
+    """
+    def __init__(self):
+        self.feature_names = None
+        self.means = None
+        self._sums = None
+        self._counts = None
+
+    @staticmethod
+    def _as_matrix(X, feature_names=None):
+        """Converte X (DataFrame o array 2D) in una matrice float64 e ne ricava i nomi delle colonne."""
+        if hasattr(X, 'columns'):
+            return X.to_numpy(dtype=np.float64, na_value=np.nan), [str(col) for col in X.columns]
+        values = np.asarray(X, dtype=np.float64)
+        if values.ndim != 2:
+            raise ValueError(f"Attesa una matrice 2D, ricevuto un array con forma {values.shape}.")
+        names = list(feature_names) if feature_names is not None else [str(i) for i in range(values.shape[1])]
+        return values, names
+
+    def _update_means(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.means = np.where(self._counts > 0, self._sums / np.maximum(self._counts, 1), np.nan)
+
+    def fit(self, X, feature_names=None):
+        """Apprende le medie di ogni colonna (ignorando i NaN)."""
+        self.feature_names = None
+        return self.partial_fit(X, feature_names)
+
+    def partial_fit(self, X, feature_names=None):
+        """
+        Aggiorna le medie con un nuovo blocco di righe.
+        Le colonne vengono allineate per nome: un blocco può contenere colonne nuove o non averne alcune.
+        """
+        values, names = self._as_matrix(X, feature_names)
+        present = ~np.isnan(values)
+        block_sums = np.where(present, values, 0.0).sum(axis=0)
+        block_counts = present.sum(axis=0)
+
+        if self.feature_names is None:
+            self.feature_names = names
+            self._sums = block_sums
+            self._counts = block_counts
+        else:
+            new_names = [name for name in names if name not in self.feature_names]
+            if new_names:
+                self.feature_names = self.feature_names + new_names
+                self._sums = np.concatenate([self._sums, np.zeros(len(new_names))])
+                self._counts = np.concatenate([self._counts, np.zeros(len(new_names), dtype=self._counts.dtype)])
+            positions = [self.feature_names.index(name) for name in names]
+            self._sums[positions] += block_sums
+            self._counts[positions] += block_counts
+        self._update_means()
+        return self
+
+    def transform(self, X):
+        """
+        Sostituisce i NaN con le medie apprese.
+        Se X è un DataFrame, le colonne vengono selezionate (e ordinate) per nome.
+
+        Returns:
+            np.ndarray: Matrice float64 senza valori mancanti (salvo colonne mai osservate).
+        """
+        if self.means is None:
+            raise RuntimeError("MeanImputer non addestrato: chiamare fit() prima di transform().")
+        if hasattr(X, 'columns'):
+            missing = [name for name in self.feature_names if name not in X.columns]
+            if missing:
+                raise ValueError(f"Colonne mancanti nei dati da trasformare: {missing}")
+            X = X[self.feature_names]
+        values, _ = self._as_matrix(X)
+        if values.shape[1] != len(self.means):
+            raise ValueError(f"Attese {len(self.means)} colonne, ricevute {values.shape[1]}.")
+        return np.where(np.isnan(values), self.means, values)
+
+    def fit_transform(self, X, feature_names=None):
+        return self.fit(X, feature_names).transform(X)
+
+    def select(self, feature_names):
+        """Restituisce un nuovo imputer limitato (e ordinato) alle colonne indicate."""
+        positions = [self.feature_names.index(name) for name in feature_names]
+        selected = MeanImputer()
+        selected.feature_names = list(feature_names)
+        selected._sums = self._sums[positions].copy()
+        selected._counts = self._counts[positions].copy()
+        selected._update_means()
+        return selected
+
+    def save(self, path):
+        """Salva lo stato appreso in un file .npz."""
+        np.savez(path, feature_names=np.array(self.feature_names, dtype=str), sums=self._sums, counts=self._counts)
+
+    @classmethod
+    def load(cls, path):
+        """Carica un imputer salvato con save()."""
+        with np.load(path) as data:
+            imputer = cls()
+            imputer.feature_names = data['feature_names'].tolist()
+            imputer._sums = data['sums']
+            imputer._counts = data['counts']
+        imputer._update_means()
+        return imputer
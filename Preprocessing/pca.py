@@ -0,0 +1,99 @@
+import numpy as np
+
+# Righe elaborate per blocco in fit/transform (i dati possono essere np.memmap su disco)
+BLOCK_ROWS = 1 << 16
+
+
+class PCA:
+    """
+    Analisi delle componenti principali calcolata con la SVD di NumPy.
+
+    fit() va chiamato sul solo training set (per ogni fold/esperimento), così il test set non
+    influenza le componenti. Vengono tenute le prime componenti che spiegano almeno la quota
+    di varianza variance_ratio (oppure esattamente n_components, se indicato).
+
+    La matrice di covarianza (feature x feature) viene accumulata a blocchi di righe in due
+    passaggi (media, poi scarti), quindi anche un training set in memory mapping non viene
+    caricato interamente in RAM; la sua SVD dà direzioni e varianze delle componenti.
+
+    Con fit(X, scale=...) la PCA viene calcolata sulle feature divise per scale (es. la scala di
+    un FeatureScaler): la divisione è inclusa nella matrice di proiezione, quindi transform()
+    riceve le feature originali e non serve una copia scalata dei dati.
+    """
+    def __init__(self, variance_ratio=0.95, n_components=None):
+        if n_components is None and not 0 < variance_ratio <= 1:
+            raise ValueError("La quota di varianza deve essere compresa tra 0 (escluso) e 1.")
+        self.variance_ratio = variance_ratio
+        self.n_components = n_components
+        self.mean = None
+        self.components = None
+        self.explained_variance_ratio = None
+        self.scale = None
+        self._projection = None
+
+    @staticmethod
+    def _blocks(X):
+        for start in range(0, len(X), BLOCK_ROWS):
+            yield np.asarray(X[start:start + BLOCK_ROWS], dtype=np.float64)
+
+    def fit(self, X, scale=None):
+        """
+        Calcola media e componenti principali di X (campioni x feature).
+        Se scale è indicato, le componenti sono quelle delle feature divise per scale.
+        """
+        if len(X) < 2:
+            raise ValueError("Servono almeno 2 campioni per calcolare la PCA.")
+        self.mean = sum(block.sum(axis=0) for block in self._blocks(X)) / len(X)
+        scatter = sum((block - self.mean).T @ (block - self.mean) for block in self._blocks(X))
+        covariance = scatter / (len(X) - 1)
+        self.scale = None if scale is None else np.asarray(scale, dtype=np.float64)
+        if self.scale is not None:
+            # Covarianza delle feature scalate: D C D con D = diag(1 / scale)
+            covariance = covariance / np.outer(self.scale, self.scale)
+
+        # La covarianza è simmetrica semidefinita positiva: la sua SVD coincide con la decomposizione
+        # spettrale, con i valori singolari (varianze) già in ordine decrescente
+        directions, variances, _ = np.linalg.svd(covariance)
+        total = variances.sum()
+        ratios = variances / total if total > 0 else np.zeros_like(variances)
+
+        if self.n_components is not None:
+            n_keep = min(self.n_components, len(variances))
+        else:
+            # Prima componente per cui la varianza cumulata raggiunge la quota richiesta
+            n_keep = int(np.searchsorted(np.cumsum(ratios), self.variance_ratio - 1e-12) + 1)
+            n_keep = min(max(n_keep, 1), len(variances))
+
+        components = directions[:, :n_keep].T
+        # Segno deterministico: in ogni componente il coefficiente di modulo massimo è positivo
+        signs = np.sign(components[np.arange(n_keep), np.abs(components).argmax(axis=1)])
+        signs[signs == 0] = 1
+        self.components = components * signs[:, None]
+        self.explained_variance_ratio = ratios[:n_keep]
+        # Matrice di proiezione sulle feature originali (con l'eventuale scalatura inclusa)
+        self._projection = self.components.T if self.scale is None else self.components.T / self.scale[:, None]
+        return self
+
+    @property
+    def n_components_(self):
+        return 0 if self.components is None else len(self.components)
+
+    def transform(self, X, dtype=None):
+        """
+        Proietta X sulle componenti principali.
+
+        Returns:
+            np.ndarray: Matrice (campioni x componenti); float32 se X è float32/uint8, altrimenti float64.
+        """
+        if self.components is None:
+            raise RuntimeError("PCA non addestrata: chiamare fit() prima di transform().")
+        X = np.asarray(X) if not isinstance(X, np.ndarray) else X
+        if dtype is None:
+            dtype = np.float64 if X.dtype == np.float64 else np.float32
+        projected = np.empty((len(X), self.n_components_), dtype=dtype)
+        for start, block in zip(range(0, len(X), BLOCK_ROWS), self._blocks(X)):
+            projected[start:start + len(block)] = (block - self.mean) @ self._projection
+        return projected
+
+    def fit_transform(self, X):
+        return self.fit(X).transform(X)
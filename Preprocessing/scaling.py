@@ -0,0 +1,53 @@
+import numpy as np
+
+# Righe elaborate per blocco nel calcolo delle statistiche (i dati possono essere np.memmap su disco)
+BLOCK_ROWS = 1 << 16
+SCALING_METHODS = ('standard', 'minmax')
+
+
+class FeatureScaler:
+    """
+    Statistiche di scalatura delle feature, calcolate sul solo training set.
+
+    - 'standard': (x - media) / deviazione standard
+    - 'minmax':   (x - minimo) / (massimo - minimo)
+
+    Nella distanza euclidea lo spostamento (media o minimo) si annulla, quindi scalare le feature
+    equivale a pesare ogni feature con weights = 1 / scale^2: il KNN usa questi pesi direttamente
+    nel calcolo delle distanze, senza creare copie scalate di training e test set.
+    Le feature costanti (scala nulla) mantengono scala 1.
+    """
+    def __init__(self, method='standard'):
+        if method not in SCALING_METHODS:
+            raise ValueError(f"Metodo di scalatura non valido: {method}. Usare uno tra {SCALING_METHODS}.")
+        self.method = method
+        self.offset = None
+        self.scale = None
+
+    @staticmethod
+    def _blocks(X):
+        for start in range(0, len(X), BLOCK_ROWS):
+            yield np.asarray(X[start:start + BLOCK_ROWS], dtype=np.float64)
+
+    def fit(self, X):
+        """Calcola spostamento e scala di ogni feature leggendo X a blocchi di righe."""
+        if len(X) == 0:
+            raise ValueError("Impossibile calcolare la scalatura su un training set vuoto.")
+        if self.method == 'standard':
+            self.offset = sum(block.sum(axis=0) for block in self._blocks(X)) / len(X)
+            variance = sum(((block - self.offset) ** 2).sum(axis=0) for block in self._blocks(X)) / len(X)
+            scale = np.sqrt(variance)
+        else:
+            self.offset = np.min([block.min(axis=0) for block in self._blocks(X)], axis=0)
+            scale = np.max([block.max(axis=0) for block in self._blocks(X)], axis=0) - self.offset
+        self.scale = np.where(scale > 0, scale, 1.0)
+        return self
+
+    @property
+    def weights(self):
+        """Pesi per feature della distanza euclidea pesata equivalente alla scalatura."""
+        return 1.0 / self.scale ** 2
+
+    def transform(self, X):
+        """Restituisce una copia scalata di X (da usare solo quando serve la matrice scalata)."""
+        return (np.asarray(X, dtype=np.float64) - self.offset) / self.scale
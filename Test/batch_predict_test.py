@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from ModelDevelopment.knn_scratch import KNN
+from ModelServing.batch_predict import predict_csv
+from Preprocessing.dataset import Dataset
+from Preprocessing.imputer import MeanImputer
+
+
+class TestBatchPredict(unittest.TestCase):
+    """Test per la classificazione in streaming di un CSV con un modello salvato"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        self.features = ['Clump Thickness', 'Single Epithelial Cell Size', 'Bland Chromatin']
+        X = rng.integers(1, 11, (200, 3)).astype(float)
+        self.model = KNN(Dataset(X, (X.sum(axis=1) > 16).astype(int), self.features), None, 5)
+        self.model.imputer = MeanImputer().fit(X, self.features)
+        self.model_path = os.path.join(self.tmp_dir.name, 'modello')
+        self.model.save(self.model_path)
+
+        # Nuovi casi grezzi: virgole decimali, valori mancanti e colonne non usate dal modello
+        self.new_X = rng.integers(1, 11, (53, 3)).astype(float)
+        self.new_X[[3, 20], 0] = np.nan
+        raw = pd.DataFrame({
+            'Sample code number': np.arange(1000, 1053),
+            'Clump Thickness': self.new_X[:, 0],
+            'Single Epithelial Cell Size': [f"{value:.1f}".replace('.', ',') for value in self.new_X[:, 1]],
+            'Bland Chromatin': self.new_X[:, 2],
+            'Heart Rate': rng.integers(60, 100, 53)
+        })
+        self.input_csv = os.path.join(self.tmp_dir.name, 'nuovi.csv')
+        raw.to_csv(self.input_csv, index=False)
+        self.output_csv = os.path.join(self.tmp_dir.name, 'predizioni.csv')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_streamed_predictions_match_model(self):
+        n_rows = predict_csv(self.model_path, self.input_csv, self.output_csv, chunksize=7, prefetch=1)
+        output = pd.read_csv(self.output_csv)
+        expected_labels, expected_proba = self.model.test_with_proba(self.model.imputer.transform(self.new_X))
+
+        self.assertEqual(n_rows, 53)
+        self.assertEqual(list(output.columns), ['Sample code number', 'prediction', 'probability'])
+        np.testing.assert_array_equal(output['Sample code number'], np.arange(1000, 1053))
+        np.testing.assert_array_equal(output['prediction'], expected_labels)
+        np.testing.assert_allclose(output['probability'], expected_proba)
+
+    def test_missing_feature_column_fails_without_output(self):
+        pd.read_csv(self.input_csv).drop(columns=['Bland Chromatin']).to_csv(self.input_csv, index=False)
+
+        with self.assertRaises(ValueError):
+            predict_csv(self.model, self.input_csv, self.output_csv, chunksize=10)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ['modello', 'nuovi.csv'])
+
+
+if __name__ == '__main__':
+    unittest.main()
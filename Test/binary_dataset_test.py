@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from Preprocessing.binary_dataset import (BinaryDatasetWriter, convert_cleaned_csv, open_binary_dataset,
+                                          write_binary_dataset)
+from Preprocessing.dataset import Dataset
+from Preprocessing.feature_target_variables import load_data
+
+
+class TestBinaryDataset(unittest.TestCase):
+    """Test per il formato binario su disco aperto in memory mapping"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'dati.knnbin')
+        rng = np.random.default_rng(0)
+        self.dataset = Dataset(rng.integers(1, 11, (50, 3)), rng.integers(0, 2, 50), ['a', 'b', 'c'], 'classtype_v1')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip_opens_memmap(self):
+        write_binary_dataset(self.path, self.dataset)
+
+        opened = open_binary_dataset(self.path)
+
+        self.assertIsInstance(opened.X, np.memmap)
+        self.assertIsInstance(opened.y, np.memmap)
+        np.testing.assert_array_equal(opened.X, self.dataset.X)
+        np.testing.assert_array_equal(opened.y, self.dataset.y)
+        self.assertEqual(opened.feature_names, ['a', 'b', 'c'])
+        self.assertEqual(opened.fingerprint, self.dataset.fingerprint)
+
+    def test_writer_appends_blocks_and_uint8(self):
+        with BinaryDatasetWriter(self.path, self.dataset.feature_names, dtype='uint8') as writer:
+            for start in range(0, 50, 7):
+                writer.append(self.dataset.X[start:start + 7], self.dataset.y[start:start + 7])
+
+        opened = open_binary_dataset(self.path)
+
+        self.assertEqual(opened.X.dtype, np.uint8)
+        np.testing.assert_array_equal(opened.X, self.dataset.X)
+        self.assertEqual(os.listdir(self.tmp_dir.name), ['dati.knnbin'])
+
+    def test_uint8_rejects_non_integer_features(self):
+        with self.assertRaises(ValueError):
+            with BinaryDatasetWriter(self.path, ['a'], dtype='uint8') as writer:
+                writer.append([[1.5]], [0])
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+    def test_load_data_opens_converted_csv(self):
+        csv_path = os.path.join(self.tmp_dir.name, 'dati_cleaned.csv')
+        with open(csv_path, 'w') as f:
+            f.write("Mitoses,Bland Chromatin,classtype_v1\n1.0,3.0,2.0\n2.0,1.0,4.0\n5.0,2.0,2.0\n")
+
+        dataset = load_data(convert_cleaned_csv(csv_path, chunksize=2))
+
+        self.assertIsInstance(dataset.X, np.memmap)
+        self.assertEqual(dataset.y.tolist(), [0, 1, 0])
+        self.assertEqual(dataset.fingerprint, load_data(csv_path, use_cache=False).fingerprint)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,8 @@
 import unittest
 from unittest.mock import patch, Mock, MagicMock
+
+import numpy as np
+
 from ModelEvaluation.cross_validation import k_fold_split, evaluate_kfold, kfold_validation
 
 
@@ -44,8 +47,8 @@ class TestKFoldSplit(unittest.TestCase):
         # Mock del modello KNN
         mock_knn_model_class = Mock()
         mock_knn_instance = Mock()
-        mock_knn_instance.test.return_value = [0, 1, 0, 1, 0]
-        mock_knn_instance.test_proba.return_value = [[0.8, 0.2], [0.3, 0.7], [0.9, 0.1], [0.4, 0.6], [0.95, 0.05]]
+        mock_knn_instance.test_with_proba.return_value = (np.array([0, 1, 0, 1, 0]),
+                                                          np.array([0.2, 0.7, 0.1, 0.6, 0.05]))
         mock_knn_model_class.return_value = mock_knn_instance
 
         results = evaluate_kfold(X, Y, mock_knn_model_class, k_neighbors, k_folds)
@@ -53,4 +56,56 @@ class TestKFoldSplit(unittest.TestCase):
         self.assertIn("all_fold_metrics", results)
         self.assertIn("all_fold_raw_data", results)
         self.assertEqual(len(results["all_fold_metrics"]), k_folds)
-        self.assertEqual(len(results["all_fold_raw_data"]), k_folds)
\ No newline at end of file
+        self.assertEqual(len(results["all_fold_raw_data"]), k_folds)
+
+class TestEvaluateKFoldMemmap(unittest.TestCase):
+    """Test per evaluate_kfold con le predizioni grezze su memmap"""
+
+    @patch('ModelEvaluation.cross_validation.random.shuffle')
+    def test_evaluate_kfold_writes_raw_data_to_store(self, mock_shuffle):
+        """Le predizioni di ogni fold vengono scritte nel contenitore passato"""
+        from ModelEvaluation.raw_predictions import MemmapRunPredictions
+        mock_shuffle.side_effect = lambda x: x
+
+        X = [[i] for i in range(20)]
+        Y = [i % 2 for i in range(20)]
+        k_folds = 4
+
+        mock_knn_model_class = Mock()
+        mock_knn_instance = Mock()
+        mock_knn_instance.test_with_proba.return_value = (np.array([0, 1, 0, 1, 0]), np.array([0.2, 0.7, 0.1, 0.6, 0.05]))
+        mock_knn_model_class.return_value = mock_knn_instance
+
+        store = MemmapRunPredictions(k_folds, 5)
+        try:
+            results = evaluate_kfold(X, Y, mock_knn_model_class, 3, k_folds, raw_data_store=store)
+
+            self.assertIs(results["all_fold_raw_data"], store)
+            self.assertEqual(len(store), k_folds)
+            self.assertEqual(list(store[0]['y_true']), Y[:5])
+            self.assertEqual(list(store[3]['y_pred']), [0, 1, 0, 1, 0])
+        finally:
+            store.close()
+
+
+class TestKnnOptions(unittest.TestCase):
+    """Test per il passaggio delle opzioni del modello KNN ai fold"""
+
+    @patch('ModelEvaluation.cross_validation.random.shuffle')
+    def test_evaluate_kfold_forwards_knn_options(self, mock_shuffle):
+        mock_shuffle.side_effect = lambda x: x
+
+        X = [[i] for i in range(20)]
+        Y = [i % 2 for i in range(20)]
+
+        mock_knn_model_class = Mock()
+        mock_knn_instance = Mock()
+        mock_knn_instance.test_with_proba.return_value = (np.array([0, 1, 0, 1, 0]), np.array([0.2, 0.7, 0.1, 0.6, 0.05]))
+        mock_knn_model_class.return_value = mock_knn_instance
+
+        evaluate_kfold(X, Y, mock_knn_model_class, 3, 4, knn_options={'pca': 0.95})
+
+        self.assertEqual(mock_knn_model_class.call_count, 4)
+        for call in mock_knn_model_class.call_args_list:
+            self.assertEqual(call.kwargs, {'pca': 0.95})
+            self.assertEqual(len(call.args[0]), 15)
@@ -0,0 +1,110 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from Preprocessing.csv_reader import read_typed_csv
+from Preprocessing.data_cleaner import clean_data
+
+CSV_HEADER = "Blood Pressure,Sample code number,Single Epithelial Cell Size,Mitoses,Bland Chromatin,classtype_v1\n"
+CSV_ROWS = [
+    '95,1000025.0,"2,0",1.0,"3,0",2.0',
+    '100,1002945.0,7.0,,3.0,4.0',
+    '95,1000025.0,"2,0",1.0,"3,0",2.0',   # duplicato della prima riga (stesso blocco)
+    '120,1015425.0,2.0,1.0,"3,0",',       # target mancante: la riga viene eliminata
+    '88,1016277.0,"3,0",3.0,,4.0',
+    '100,1002945.0,"7,0",,"3,0",4.0',     # dopo l'imputazione è un duplicato della seconda riga
+    '95,1000025.0,2.0,1.0,3.0,2.0',       # duplicato della prima riga (blocco diverso)
+    '91,1017023.0,"4,0",1.0,"1,0",2.0',
+]
+
+
+class TestCleanDataStreaming(unittest.TestCase):
+    """Test per la pulizia dati a blocchi (chunksize)"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write_csv(self, name, rows=CSV_ROWS):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, 'w') as f:
+            f.write(CSV_HEADER + "\n".join(rows) + "\n")
+        return path
+
+    def test_streaming_matches_in_memory_cleaning(self):
+        """Il risultato a blocchi è identico a quello in memoria"""
+        in_memory_path = clean_data(self._write_csv('in_memory.csv'))
+        streaming_path = clean_data(self._write_csv('streaming.csv'), chunksize=3)
+
+        expected = pd.read_csv(in_memory_path)
+        result = pd.read_csv(streaming_path)
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_streaming_removes_duplicates_across_chunks(self):
+        cleaned_path = clean_data(self._write_csv('dups.csv'), chunksize=2)
+        result = pd.read_csv(cleaned_path)
+
+        self.assertEqual(len(result), 4)
+        self.assertFalse(result.duplicated().any())
+        self.assertNotIn('Sample code number', result.columns)
+        self.assertNotIn('Blood Pressure', result.columns)
+
+    def test_streaming_imputes_with_global_mean(self):
+        """La media usata per l'imputazione è quella dell'intero file, non del singolo blocco"""
+        cleaned_path = clean_data(self._write_csv('means.csv'), chunksize=2)
+        result = pd.read_csv(cleaned_path)
+
+        # Media di 'Mitoses' sulle righe con target valido: (1 + 1 + 3 + 1 + 1) / 5
+        self.assertAlmostEqual(result['Mitoses'].iloc[1], 1.4)
+
+    def test_non_numeric_value_after_first_chunk(self):
+        """Un valore non numerico oltre il primo blocco diventa NaN e viene imputato come un valore mancante"""
+        bad_rows, missing_rows = list(CSV_ROWS), list(CSV_ROWS)
+        bad_rows[4] = '88,1016277.0,"3,0",?,,4.0'
+        missing_rows[4] = '88,1016277.0,"3,0",,,4.0'
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected_path = clean_data(self._write_csv('missing.csv', missing_rows), chunksize=2, use_cache=False)
+            streaming_path = clean_data(self._write_csv('bad.csv', bad_rows), chunksize=2, use_cache=False)
+            chunks = list(read_typed_csv(self._write_csv('bad_chunks.csv', bad_rows), chunksize=2))
+
+        pd.testing.assert_frame_equal(pd.read_csv(streaming_path), pd.read_csv(expected_path))
+        mitoses = pd.concat(chunks)['Mitoses']
+        self.assertEqual(mitoses.dtype, 'float64')
+        self.assertTrue(pd.isna(mitoses.iloc[4]))
+
+class TestTypedCsvReading(unittest.TestCase):
+    """Test per la lettura tipizzata del CSV sorgente"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'typed.csv')
+        with open(self.path, 'w') as f:
+            f.write(CSV_HEADER + "\n".join(CSV_ROWS) + "\n")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_comma_decimals_are_parsed(self):
+        result = pd.read_csv(clean_data(self.path, use_cache=False))
+
+        self.assertEqual(result['Single Epithelial Cell Size'].dtype, 'float64')
+        self.assertEqual(list(result['Single Epithelial Cell Size']), [2.0, 7.0, 3.0, 4.0])
+
+    def test_prune_columns_skips_dropped_columns_at_parse_time(self):
+        """Con prune_columns le colonne da eliminare non arrivano mai al DataFrame"""
+        from Preprocessing.data_cleaner import _read_source_csv
+        df = _read_source_csv(self.path, prune_columns=True)
+
+        self.assertNotIn('Sample code number', df.columns)
+        self.assertNotIn('Blood Pressure', df.columns)
+        self.assertEqual(df['Mitoses'].dtype, 'float64')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from Preprocessing.data_cleaner import clean_data
+from Preprocessing.dataset_cache import CleanedDatasetCache
+from Preprocessing.feature_target_variables import load_data
+
+CSV_CONTENT = (
+    "Sample code number,Single Epithelial Cell Size,Mitoses,Bland Chromatin,classtype_v1\n"
+    '1000025.0,"2,0",1.0,"3,0",2.0\n'
+    "1002945.0,7.0,2.0,3.0,4.0\n"
+    '1015425.0,"3,0",,"1,0",2.0\n'
+    "1016277.0,8.0,3.0,7.0,4.0\n"
+)
+
+
+class TestCleanedDatasetCache(unittest.TestCase):
+    """Test per la cache binaria del dataset pulito"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.tmp_dir.name, 'dati.csv')
+        with open(self.source_path, 'w') as f:
+            f.write(CSV_CONTENT)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_second_run_skips_both_csv_parses(self):
+        """Al secondo lancio clean_data e load_data non leggono nessun CSV"""
+        first = load_data(clean_data(self.source_path))
+
+        with patch('pandas.read_csv') as mock_read_csv:
+            cached = load_data(clean_data(self.source_path))
+
+        mock_read_csv.assert_not_called()
+        self.assertIsInstance(cached.X, np.memmap)
+        np.testing.assert_array_equal(cached.X, first.X)
+        np.testing.assert_array_equal(cached.y, first.y)
+        self.assertEqual(cached.feature_names, first.feature_names)
+        self.assertEqual(cached.fingerprint, first.fingerprint)
+
+    def test_modified_source_invalidates_cache(self):
+        """Se il CSV sorgente cambia, la pulizia viene rieseguita"""
+        load_data(clean_data(self.source_path))
+        with open(self.source_path, 'a') as f:
+            f.write('1017023.0,"4,0",1.0,"1,0",2.0\n')
+
+        dataset = load_data(clean_data(self.source_path))
+
+        self.assertEqual(len(dataset), 5)
+        self.assertEqual(len(dataset.y), 5)
+
+    def test_changed_config_invalidates_cache(self):
+        cleaned_path = clean_data(self.source_path)
+        cache = CleanedDatasetCache.for_source(self.source_path)
+
+        self.assertTrue(cache.is_fresh(self.source_path, cache.read_meta()['config'], cleaned_path))
+        self.assertFalse(cache.is_fresh(self.source_path, {'version': -1}, cleaned_path))
+
+    def test_cleaned_file_without_cache_is_parsed(self):
+        """Un CSV pulito non prodotto da clean_data viene letto normalmente, senza cache"""
+        cleaned_path = os.path.join(self.tmp_dir.name, 'esterno_cleaned.csv')
+        pd.DataFrame({'a': [1.0, 2.0], 'classtype_v1': [2, 4]}).to_csv(cleaned_path, index=False)
+
+        dataset = load_data(cleaned_path)
+
+        self.assertEqual(dataset.y.tolist(), [0, 1])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, 'esterno_cache')))
+
+
+if __name__ == '__main__':
+    unittest.main()
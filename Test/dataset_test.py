@@ -0,0 +1,62 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from Preprocessing.dataset import Dataset, as_arrays
+
+
+class TestDataset(unittest.TestCase):
+    """Test per il contenitore compatto del dataset"""
+
+    def test_from_frame_uses_compact_dtypes(self):
+        X = pd.DataFrame({'a': [1.0, 2.0, 3.0], 'b': [4.0, 5.0, 6.0]})
+        Y = pd.Series([0, 1, 0], name='classtype_v1')
+
+        dataset = Dataset.from_frame(X, Y)
+
+        self.assertEqual(dataset.X.dtype, np.float32)
+        self.assertEqual(dataset.y.dtype, np.int8)
+        self.assertTrue(dataset.X.flags.c_contiguous)
+        self.assertEqual(dataset.feature_names, ['a', 'b'])
+        self.assertEqual(dataset.target_name, 'classtype_v1')
+        self.assertEqual((len(dataset), dataset.n_features), (3, 2))
+
+    def test_conforming_arrays_are_not_copied(self):
+        X = np.zeros((4, 2), dtype=np.float32)
+        y = np.zeros(4, dtype=np.int8)
+
+        dataset = Dataset(X, y)
+
+        self.assertIs(dataset.X, X)
+        self.assertIs(dataset.y, y)
+        self.assertIs(as_arrays(dataset)[0], X)
+
+    def test_fingerprint_depends_on_content(self):
+        first = Dataset([[1, 2], [3, 4]], [0, 1])
+        same = Dataset(np.array([[1, 2], [3, 4]], dtype=np.float32), [0, 1])
+        other = Dataset([[1, 2], [3, 5]], [0, 1])
+
+        self.assertEqual(first.fingerprint, same.fingerprint)
+        self.assertNotEqual(first.fingerprint, other.fingerprint)
+
+    def test_subset_and_validation(self):
+        dataset = Dataset([[1], [2], [3]], [0, 1, 0], ['f'])
+
+        subset = dataset.subset([2, 0])
+
+        self.assertEqual(subset.X[:, 0].tolist(), [3.0, 1.0])
+        self.assertEqual(subset.feature_names, ['f'])
+        with self.assertRaises(ValueError):
+            Dataset([[1], [2]], [0, 1, 0])
+
+    def test_as_arrays_converts_lists(self):
+        X, Y = as_arrays([[1, 2], [3, 4]], [0, 1])
+
+        self.assertEqual(X.dtype, np.float64)
+        self.assertEqual(X.shape, (2, 2))
+        self.assertEqual(Y.tolist(), [0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
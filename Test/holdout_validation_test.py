@@ -1,6 +1,8 @@
 import unittest
 from unittest.mock import patch, MagicMock
 
+import numpy as np
+
 
 class TestHoldoutValidation(unittest.TestCase):
     """
@@ -52,8 +54,7 @@ class TestHoldoutValidation(unittest.TestCase):
 
         # Mock del modello KNN
         mock_knn_instance = MagicMock()
-        mock_knn_instance.test.return_value = [0, 1]  # Predizioni
-        mock_knn_instance.test_proba.return_value = [0.2, 0.8]  # Probabilità
+        mock_knn_instance.test_with_proba.return_value = (np.array([0, 1]), np.array([0.2, 0.8]))
         mock_knn_class.return_value = mock_knn_instance
 
         # Mock delle metriche
@@ -71,9 +72,10 @@ class TestHoldoutValidation(unittest.TestCase):
         call_args = mock_knn_class.call_args
         self.assertEqual(call_args[0][2], 3)  # k=3
 
-        # Verifica che test e test_proba siano stati chiamati
-        mock_knn_instance.test.assert_called_once()
-        mock_knn_instance.test_proba.assert_called_once()
+        # Verifica che classi e probabilità siano calcolate con un'unica ricerca dei vicini
+        mock_knn_instance.test_with_proba.assert_called_once()
+        mock_knn_instance.test.assert_not_called()
+        mock_knn_instance.test_proba.assert_not_called()
 
         # Verifica che calculate_metrics sia stato chiamato
         mock_calc_metrics.assert_called_once()
@@ -108,8 +110,7 @@ class TestHoldoutValidation(unittest.TestCase):
             captured_train_data['Y_train'] = y_train
             captured_train_data['k'] = k
             mock_instance = MagicMock()
-            mock_instance.test.return_value = [0, 1]
-            mock_instance.test_proba.return_value = [0.3, 0.7]
+            mock_instance.test_with_proba.return_value = (np.array([0, 1]), np.array([0.3, 0.7]))
             return mock_instance
 
         mock_knn_class.side_effect = capture_knn_init
@@ -148,8 +149,7 @@ class TestHoldoutValidation(unittest.TestCase):
         expected_y_proba = [0.1, 0.9, 0.2, 0.8]
 
         mock_knn_instance = MagicMock()
-        mock_knn_instance.test.return_value = expected_y_pred
-        mock_knn_instance.test_proba.return_value = expected_y_proba
+        mock_knn_instance.test_with_proba.return_value = (np.array(expected_y_pred), np.array(expected_y_proba))
         mock_knn_class.return_value = mock_knn_instance
 
         mock_calc_metrics.return_value = self.mock_metrics
@@ -175,33 +175,63 @@ class TestHoldoutValidation(unittest.TestCase):
                                    mock_calc_metrics, mock_handler_class):
         """
         Test: verifica che la funzione gestisca correttamente
-        input in formato DataFrame/Series (con attributo .values).
+        input in formato DataFrame/Series, convertiti in array numpy.
         """
+        import numpy as np
+        import pandas as pd
         from ModelEvaluation.holdout_validation import holdout_validation
 
         mock_random.seed = MagicMock()
         mock_random.shuffle = MagicMock(side_effect=lambda x: None)
-        # Simula DataFrame e Series con attributo .values
-        mock_X = MagicMock()
-        mock_X.values.tolist.return_value = self.X
-
-        mock_Y = MagicMock()
-        mock_Y.values.tolist.return_value = self.Y
+        X_df = pd.DataFrame(self.X, columns=['f1', 'f2'])
+        Y_series = pd.Series(self.Y)
 
         mock_knn_instance = MagicMock()
-        mock_knn_instance.test.return_value = [0, 1]
-        mock_knn_instance.test_proba.return_value = [0.3, 0.7]
+        mock_knn_instance.test_with_proba.return_value = (np.array([0, 1]), np.array([0.3, 0.7]))
         mock_knn_class.return_value = mock_knn_instance
 
         mock_calc_metrics.return_value = self.mock_metrics
         mock_handler_class.return_value = MagicMock()
 
         # Non deve sollevare eccezioni
-        holdout_validation(mock_X, mock_Y, k=3, test_perc=0.2)
+        holdout_validation(X_df, Y_series, k=3, test_perc=0.2)
+
+        # Il KNN riceve le righe di training come matrice numpy
+        x_train, y_train, _ = mock_knn_class.call_args[0]
+        self.assertIsInstance(x_train, np.ndarray)
+        self.assertEqual(x_train.shape, (8, 2))
+        self.assertEqual(y_train.tolist(), [0, 0, 0, 0, 1, 1, 1, 1])
+
+    @patch('ModelEvaluation.holdout_validation.HoldoutResultsHandler')
+    @patch('ModelEvaluation.holdout_validation.calculate_metrics')
+    @patch('ModelEvaluation.holdout_validation.KNN')
+    @patch('ModelEvaluation.holdout_validation.time')
+    @patch('ModelEvaluation.holdout_validation.random')
+    def test_with_dataset_input(self, mock_random, mock_time, mock_knn_class,
+                                mock_calc_metrics, mock_handler_class):
+        """
+        Test: con un Dataset le righe di training vengono estratte dalla sua matrice float32.
+        """
+        import numpy as np
+        from ModelEvaluation.holdout_validation import holdout_validation
+        from Preprocessing.dataset import Dataset
+
+        mock_random.seed = MagicMock()
+        mock_random.shuffle = MagicMock(side_effect=lambda x: None)
+        dataset = Dataset(self.X, self.Y)
+
+        mock_knn_instance = MagicMock()
+        mock_knn_instance.test_with_proba.return_value = (np.array([0, 1]), np.array([0.3, 0.7]))
+        mock_knn_class.return_value = mock_knn_instance
+        mock_calc_metrics.return_value = self.mock_metrics
+        mock_handler_class.return_value = MagicMock()
+
+        holdout_validation(dataset, None, k=3, test_perc=0.2)
 
-        # Verifica che .values.tolist() sia stato chiamato
-        mock_X.values.tolist.assert_called_once()
-        mock_Y.values.tolist.assert_called_once()
+        x_train, y_train, _ = mock_knn_class.call_args[0]
+        self.assertEqual(x_train.dtype, np.float32)
+        self.assertEqual(y_train.dtype, np.int8)
+        self.assertEqual(len(x_train), 8)
 
     @patch('ModelEvaluation.holdout_validation.HoldoutResultsHandler')
     @patch('ModelEvaluation.holdout_validation.calculate_metrics')
@@ -224,8 +254,7 @@ class TestHoldoutValidation(unittest.TestCase):
         def capture_knn_init(x_train, y_train, k):
             captured_sizes.append(len(x_train))
             mock_instance = MagicMock()
-            mock_instance.test.return_value = [0]
-            mock_instance.test_proba.return_value = [0.5]
+            mock_instance.test_with_proba.return_value = (np.array([0]), np.array([0.5]))
             return mock_instance
 
         mock_knn_class.side_effect = capture_knn_init
@@ -259,8 +288,7 @@ class TestHoldoutValidation(unittest.TestCase):
         def capture_knn_init(x_train, y_train, k):
             captured_data['train_size'] = len(x_train)
             mock_instance = MagicMock()
-            mock_instance.test.return_value = []
-            mock_instance.test_proba.return_value = []
+            mock_instance.test_with_proba.return_value = (np.array([]), np.array([]))
             return mock_instance
 
         mock_knn_class.side_effect = capture_knn_init
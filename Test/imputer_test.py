@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from Preprocessing.data_cleaner import clean_data, imputer_path
+from Preprocessing.imputer import MeanImputer
+
+
+class TestMeanImputer(unittest.TestCase):
+    """Test per l'imputazione con la media appresa"""
+
+    def setUp(self):
+        self.train = pd.DataFrame({'a': [1.0, np.nan, 3.0], 'b': [4.0, 6.0, np.nan]})
+
+    def test_fit_learns_column_means(self):
+        imputer = MeanImputer().fit(self.train)
+
+        self.assertEqual(imputer.feature_names, ['a', 'b'])
+        np.testing.assert_allclose(imputer.means, [2.0, 5.0])
+
+    def test_transform_uses_training_means(self):
+        """I nuovi dati vengono imputati con le medie di addestramento, non con le proprie"""
+        imputer = MeanImputer().fit(self.train)
+        batch = pd.DataFrame({'b': [np.nan, 100.0], 'a': [np.nan, np.nan]})
+
+        result = imputer.transform(batch)
+
+        np.testing.assert_allclose(result, [[2.0, 5.0], [2.0, 100.0]])
+
+    def test_partial_fit_matches_fit(self):
+        full = MeanImputer().fit(self.train)
+        chunked = MeanImputer().partial_fit(self.train.iloc[:2]).partial_fit(self.train.iloc[2:])
+
+        np.testing.assert_allclose(chunked.means, full.means)
+
+    def test_transform_errors(self):
+        with self.assertRaises(RuntimeError):
+            MeanImputer().transform(self.train)
+        with self.assertRaises(ValueError):
+            MeanImputer().fit(self.train).transform(self.train[['a']])
+
+    def test_save_and_load(self):
+        imputer = MeanImputer().fit(self.train)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'imputer.npz')
+            imputer.save(path)
+            loaded = MeanImputer.load(path)
+
+        self.assertEqual(loaded.feature_names, imputer.feature_names)
+        np.testing.assert_allclose(loaded.means, imputer.means)
+
+    def test_clean_data_saves_feature_imputer(self):
+        """clean_data salva accanto al CSV pulito l'imputer delle sole feature"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source_path = os.path.join(tmp_dir, 'dati.csv')
+            with open(source_path, 'w') as f:
+                f.write("Sample code number,Mitoses,Bland Chromatin,classtype_v1\n"
+                        "1,1.0,3.0,2.0\n2,,3.0,4.0\n3,2.0,1.0,2.0\n")
+            for chunksize in (None, 2):
+                cleaned_path = clean_data(source_path, chunksize=chunksize, use_cache=False)
+                imputer = MeanImputer.load(imputer_path(cleaned_path))
+
+                self.assertEqual(imputer.feature_names, ['Mitoses', 'Bland Chromatin'])
+                np.testing.assert_allclose(imputer.means, [1.5, 7 / 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
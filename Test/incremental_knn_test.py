@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+
+from ModelDevelopment.knn_scratch import KNN
+
+
+class TestIncrementalKNN(unittest.TestCase):
+    """Test per l'aggiunta e l'eliminazione incrementale di campioni di training"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(0, 1, (500, 4)).astype(np.float32)
+        self.y = (self.X[:, 0] + self.X[:, 1] > 0).astype(np.int8)
+        self.x_test = rng.normal(0, 1, (50, 4))
+
+    def assert_index_consistent(self, model):
+        """Le tabelle LSH aggiornate coincidono con quelle ricalcolate da zero sugli stessi campioni"""
+        codes = model.lsh._hash(np.asarray(model._x, dtype=model._dtype))
+        for table in range(model.lsh.n_tables):
+            expected_order = np.argsort(codes[:, table], kind='stable')
+            np.testing.assert_array_equal(model.lsh._order[table], expected_order)
+            np.testing.assert_array_equal(model.lsh._sorted_codes[table], codes[expected_order, table])
+
+    def test_add_samples_matches_full_model(self):
+        model = KNN(self.X[:100], self.y[:100], 5)
+        for start in range(100, 500, 37):
+            new_indices = model.add_samples(self.X[start:start + 37], self.y[start:start + 37])
+            np.testing.assert_array_equal(new_indices, np.arange(start, min(start + 37, 500)))
+        full = KNN(self.X, self.y, 5)
+
+        self.assertEqual(model.n_samples, 500)
+        np.testing.assert_array_equal(model.kneighbors(self.x_test), full.kneighbors(self.x_test))
+        self.assertEqual(model.test(self.x_test), full.test(self.x_test))
+        # Crescita geometrica del buffer: poche riallocazioni
+        self.assertGreaterEqual(len(model._x_buffer), 500)
+
+    def test_partial_fit_does_not_modify_caller_arrays(self):
+        X = self.X[:100].copy()
+        model = KNN(X, self.y[:100], 3).partial_fit(self.X[100:110], self.y[100:110])
+        model.remove_samples([0, 1, 2])
+
+        np.testing.assert_array_equal(X, self.X[:100])
+        self.assertEqual(model.n_samples, 107)
+
+    def test_remove_samples_matches_model_without_them(self):
+        model = KNN(self.X, self.y, 5)
+        removed = [3, 10, 11, 250, 499]
+        model.remove_samples(removed)
+        remaining = np.setdiff1d(np.arange(500), removed)
+        expected = KNN(self.X[remaining], self.y[remaining], 5)
+
+        np.testing.assert_array_equal(model.kneighbors(self.x_test), expected.kneighbors(self.x_test))
+        with self.assertRaises(IndexError):
+            model.remove_samples([495])
+
+    def test_lsh_index_updated_incrementally(self):
+        model = KNN(self.X[:300], self.y[:300], 5, lsh_tables=4, lsh_bits=6)
+        model.add_samples(self.X[300:], self.y[300:])
+        self.assert_index_consistent(model)
+
+        model.remove_samples(np.arange(0, 500, 7))
+        self.assert_index_consistent(model)
+        neighbors = model.kneighbors(self.x_test)
+        self.assertTrue(np.all(neighbors < model.n_samples))
+
+    def test_new_samples_use_fitted_preprocessing(self):
+        model = KNN(self.X[:300], self.y[:300], 5, pca=0.9, scaling='standard')
+        offset = model.scaler.offset.copy()
+        model.add_samples(self.X[300:], self.y[300:])
+
+        np.testing.assert_array_equal(model.scaler.offset, offset)
+        np.testing.assert_allclose(model._x[300:], model.pca.transform(self.X[300:]), rtol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
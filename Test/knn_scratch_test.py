@@ -29,3 +29,43 @@ class TestKNN(unittest.TestCase):
     def test_test_method(self):
         """Testa il metodo di predizione."""
         x_test = [[2, 2], [5, 6]]
+
+
+class TestKNNArrays(unittest.TestCase):
+    """Test del KNN vettorizzato con input numpy e Dataset"""
+
+    def test_accepts_dataset_without_copy(self):
+        import numpy as np
+        from Preprocessing.dataset import Dataset
+        dataset = Dataset([[1, 2], [2, 3], [3, 4], [6, 7]], [0, 0, 1, 1])
+
+        knn = KNN(dataset, None, 3)
+
+        self.assertTrue(np.shares_memory(knn._x, dataset.X))
+        self.assertEqual(knn.test([[2, 2], [5, 6]]), [0, 1])
+        self.assertEqual(knn.test_proba([[2, 2], [5, 6]]), [1 / 3, 2 / 3])
+
+    def test_ties_follow_training_order(self):
+        """A parità di distanza vince il campione di training con indice minore, come nella versione a liste"""
+        knn = KNN([[0.0], [2.0], [-2.0]], [1, 0, 0], 2)
+
+        self.assertEqual(knn.kneighbors([[1.0]]).tolist(), [[0, 1]])
+        # Voto 1-1: vince la classe del vicino più prossimo
+        self.assertEqual(knn.test([[1.0]]), [1])
+
+    def test_streamed_training_blocks_match_single_block(self):
+        """La ricerca a blocchi del training set (con top-k corrente) dà gli stessi vicini"""
+        import numpy as np
+        from unittest.mock import patch
+        rng = np.random.default_rng(0)
+        x_train = rng.integers(1, 4, (300, 3)).astype(np.float32)
+        y_train = rng.integers(0, 2, 300)
+        x_test = rng.integers(1, 4, (40, 3)).astype(np.float32)
+
+        expected = KNN(x_train, y_train, 7).kneighbors(x_test)
+        with patch('ModelDevelopment.knn_scratch.TRAIN_BLOCK_ROWS', 16):
+            streamed = KNN(x_train, y_train, 7)
+            neighbors, distances = streamed.kneighbors(x_test, return_distance=True)
+
+        np.testing.assert_array_equal(neighbors, expected)
+        np.testing.assert_allclose(distances, np.sort(streamed.euclidean_distance(x_test), axis=1)[:, :7], atol=1e-5)
@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from ModelDevelopment.knn_scratch import KNN
+from ModelDevelopment.lsh_index import LSHIndex, recall_at_k
+
+
+class TestLSHIndex(unittest.TestCase):
+    """Test per la ricerca approssimata dei vicini con LSH a proiezioni casuali"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        centers = rng.normal(0, 10, (20, 6))
+        labels = rng.integers(0, 2, 20)
+        rows = rng.integers(0, 20, 3000)
+        self.X = centers[rows] + rng.normal(0, 1, (3000, 6))
+        self.y = labels[rows]
+        self.x_test = centers[rng.integers(0, 20, 200)] + rng.normal(0, 1, (200, 6))
+
+    def test_recall_at_k(self):
+        exact = np.array([[0, 1, 2], [3, 4, 5]])
+
+        self.assertEqual(recall_at_k(exact, exact), 1.0)
+        self.assertAlmostEqual(recall_at_k([[2, 1, 9], [9, 9, 9]], exact), 2 / 6)
+
+    def test_high_recall_with_many_tables(self):
+        exact = KNN(self.X, self.y, 5)
+        approximate = KNN(self.X, self.y, 5, lsh_tables=16, lsh_bits=8)
+        neighbors, dists = approximate.kneighbors(self.x_test, return_distance=True)
+
+        self.assertGreater(recall_at_k(neighbors, exact.kneighbors(self.x_test)), 0.9)
+        # I candidati vengono riordinati con la distanza esatta
+        np.testing.assert_allclose(dists, np.sqrt(((self.x_test[:, None] - self.X[neighbors]) ** 2).sum(-1)),
+                                   rtol=1e-4, atol=1e-3)
+        self.assertTrue(np.all(np.diff(dists, axis=1) >= 0))
+        self.assertEqual(approximate.lsh.stats['queries'], len(self.x_test))
+        self.assertLess(approximate.lsh.stats['candidates'], len(self.x_test) * len(self.X))
+
+    def test_falls_back_to_exact_search_without_candidates(self):
+        """Con bucket quasi vuoti i campioni senza abbastanza candidati vengono cercati in modo esatto"""
+        exact = KNN(self.X, self.y, 5)
+        approximate = KNN(self.X, self.y, 5, lsh_tables=1, lsh_bits=62)
+        far_away = self.x_test + 1000
+
+        np.testing.assert_array_equal(approximate.kneighbors(far_away), exact.kneighbors(far_away))
+        self.assertEqual(approximate.lsh.stats['fallbacks'], len(far_away))
+
+    def test_small_candidate_blocks(self):
+        expected = KNN(self.X, self.y, 5, lsh_tables=8, lsh_bits=8).test(self.x_test)
+        with patch('ModelDevelopment.lsh_index.CANDIDATE_BLOCK_ELEMENTS', 500):
+            blockwise = KNN(self.X, self.y, 5, lsh_tables=8, lsh_bits=8).test(self.x_test)
+
+        self.assertEqual(blockwise, expected)
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            LSHIndex(n_tables=0)
+        with self.assertRaises(ValueError):
+            LSHIndex(n_bits=63)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import contextlib
+import io
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+import main
+from ModelDevelopment.knn_scratch import KNN
+from ModelEvaluation.parallel import map_runs
+
+
+class TestBatchCLI(unittest.TestCase):
+    """Test per la modalità non interattiva di main.py"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp_dir.name)  # output/ e database dei risultati nella cartella temporanea
+        rng = np.random.default_rng(0)
+        X = rng.integers(1, 11, (120, 3)).astype(float)
+        y = np.where(X.sum(axis=1) > 16, 4, 2)
+        pd.DataFrame({'Clump Thickness': X[:, 0], 'Bland Chromatin': X[:, 1], 'Mitoses': X[:, 2],
+                      'classtype_v1': y}).to_csv('dati_cleaned.csv', index=False)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+    def run_cli(self, *argv):
+        """Esegue la CLI senza stdin (un prompt fallirebbe) e restituisce (codice di uscita, stdout)."""
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(io.StringIO()), \
+                patch('builtins.input', side_effect=AssertionError("prompt inatteso")):
+            try:
+                code = main.cli(list(argv))
+            except SystemExit as e:
+                code = e.code
+        return code, stdout.getvalue()
+
+    def test_kfold_runs_without_prompts_and_saves_model(self):
+        code, output = self.run_cli('--data', 'dati_cleaned.csv', '--method', 'kfold', '--k', '3',
+                                    '--folds', '4', '--no-plots', '--jobs', '2', '--save-model', 'modello')
+        self.assertEqual(code, main.EXIT_OK)
+        self.assertIn("Esperimento 4/4", output)
+        self.assertTrue(os.path.exists(os.path.join('modello', 'manifest.json')))
+        self.assertEqual([f for f in os.listdir('output') if f.endswith('.png')], [])
+
+    def test_optimal_k_searched_when_not_given(self):
+        code, output = self.run_cli('--data', 'dati_cleaned.csv', '--method', 'sss', '--experiments', '3',
+                                    '--no-plots')
+        self.assertEqual(code, main.EXIT_OK)
+        self.assertIn("K ottimale trovato", output)
+
+    def test_exit_codes(self):
+        self.assertEqual(self.run_cli('--data', 'manca.csv', '--method', 'holdout', '--k', '3')[0],
+                         main.EXIT_DATA_ERROR)
+        self.assertEqual(self.run_cli('--data', 'dati_cleaned.csv', '--method', 'loo')[0], main.EXIT_USAGE)
+        self.assertEqual(self.run_cli('--data', 'dati_cleaned.csv', '--method', 'kfold', '--folds', '1')[0],
+                         main.EXIT_USAGE)
+        # k non compatibile con il training set
+        self.assertEqual(self.run_cli('--data', 'dati_cleaned.csv', '--method', 'holdout', '--k', '500',
+                                      '--no-plots')[0], main.EXIT_USAGE)
+        # predict: cartella del modello inesistente o CSV da classificare mancante
+        self.assertEqual(self.run_cli('predict', 'nessun_modello', 'dati_cleaned.csv', 'pred.csv')[0],
+                         main.EXIT_DATA_ERROR)
+        X = np.array([[1.0, 2.0, 3.0], [8.0, 9.0, 7.0], [2.0, 1.0, 2.0]])
+        KNN(X, np.array([2, 4, 2]), 1).save('modello')
+        self.assertEqual(self.run_cli('predict', 'modello', 'manca.csv', 'pred.csv')[0], main.EXIT_DATA_ERROR)
+        self.assertFalse(os.path.exists('pred.csv'))
+
+
+class TestMapRuns(unittest.TestCase):
+    """Test per l'esecuzione parallela di fold ed esperimenti"""
+
+    def test_results_keep_input_order(self):
+        def slow_square(x):
+            time.sleep(0.01 * (5 - x))
+            return x * x
+        self.assertEqual(list(map_runs(slow_square, range(6), n_jobs=3)), [x * x for x in range(6)])
+        self.assertEqual(list(map_runs(slow_square, iter(range(6)), n_jobs=1)), [x * x for x in range(6)])
+
+
+if __name__ == '__main__':
+    unittest.main()
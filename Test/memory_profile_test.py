@@ -0,0 +1,69 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from ModelEvaluation.results_handler import HoldoutResultsHandler
+from Monitoring.memory import disable_memory_profiling, enable_memory_profiling
+from Monitoring.timing import TIMER, stage
+
+MB = 1 << 20
+
+
+class TestMemoryProfiling(unittest.TestCase):
+    """Test per la profilazione della memoria per fase"""
+
+    def setUp(self):
+        self.tracker = enable_memory_profiling()
+        self.snapshot = TIMER.snapshot()
+
+    def tearDown(self):
+        disable_memory_profiling()
+
+    def test_peak_and_net_per_stage(self):
+        with stage('test.temporanea'):
+            temporary = np.ones(MB)  # 8 MB liberati alla fine della fase
+            del temporary
+        with stage('test.trattenuta'):
+            kept = np.ones(MB // 8)  # 1 MB ancora in memoria alla fine della fase
+        report = self.tracker.report(self.snapshot['memory'])
+
+        self.assertGreaterEqual(report['stages']['test.temporanea']['peak_kb'], 8 * 1024)
+        self.assertLess(report['stages']['test.temporanea']['net_kb'], 64)
+        self.assertGreaterEqual(report['stages']['test.trattenuta']['net_kb'], 1024)
+        self.assertEqual(report['stages']['test.trattenuta']['calls'], 1)
+        del kept
+
+    def test_nested_stage_peak_propagates_to_outer_stage(self):
+        with stage('test.esterna'):
+            with stage('test.interna'):
+                temporary = np.ones(MB)
+                del temporary
+        report = self.tracker.report(self.snapshot['memory'])
+        self.assertGreaterEqual(report['stages']['test.esterna']['peak_kb'], 8 * 1024)
+        self.assertGreaterEqual(report['stages']['test.interna']['peak_kb'], 8 * 1024)
+
+    def test_handler_saves_report_with_allocation_sites(self):
+        with stage('test.allocazione'):
+            kept = np.empty(MB)  # funzione C: l'allocazione è attribuita a questa riga
+        with tempfile.TemporaryDirectory() as output_dir, contextlib.redirect_stdout(io.StringIO()):
+            handler = HoldoutResultsHandler(metrics={'accuracy': 1.0}, y_true=[0, 1], y_pred=[0, 1],
+                                            y_pred_proba=[0.0, 1.0], filename_prefix='holdout_test',
+                                            output_dir=output_dir, plots=False, timer_snapshot=self.snapshot)
+            handler.save_results()
+            with open(os.path.join(output_dir, 'holdout_test_memory.json')) as f:
+                report = json.load(f)
+        self.assertIn('test.allocazione', report['stages'])
+        self.assertIn('results.csv', report['stages'])
+        top_site = report['top_allocation_sites'][0]
+        self.assertTrue(top_site['site'].startswith(os.path.abspath(__file__)))
+        self.assertGreaterEqual(top_site['size_kb'], 8 * 1024)
+        del kept
+
+
+if __name__ == '__main__':
+    unittest.main()
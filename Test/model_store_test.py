@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from ModelDevelopment.knn_scratch import KNN
+from ModelDevelopment.model_store import MANIFEST_NAME
+from Preprocessing.dataset import Dataset
+from Preprocessing.imputer import MeanImputer
+
+
+class TestModelStore(unittest.TestCase):
+    """Test per il salvataggio e il caricamento (in memory mapping) dei modelli KNN"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'modello')
+        rng = np.random.default_rng(0)
+        X = rng.normal(0, 1, (400, 5)) * [1, 10, 1, 5, 1]
+        self.dataset = Dataset(X, (X[:, 0] + X[:, 1] / 10 > 0).astype(int), ['a', 'b', 'c', 'd', 'e'], 'classe')
+        self.x_test = rng.normal(0, 1, (60, 5)) * [1, 10, 1, 5, 1]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assert_same_predictions(self, model, loaded):
+        np.testing.assert_array_equal(loaded.kneighbors(self.x_test), model.kneighbors(self.x_test))
+        self.assertEqual(loaded.test(self.x_test), model.test(self.x_test))
+        self.assertEqual(loaded.test_proba(self.x_test), model.test_proba(self.x_test))
+
+    def test_round_trip_with_memmap(self):
+        model = KNN(self.dataset, None, 5)
+        model.save(self.path)
+        loaded = KNN.load(self.path)
+
+        self.assertIsInstance(loaded._x, np.memmap)
+        self.assertEqual(loaded.k, 5)
+        self.assertEqual(loaded.feature_names, ['a', 'b', 'c', 'd', 'e'])
+        self.assert_same_predictions(model, loaded)
+
+    def test_round_trip_with_preprocessing_and_index(self):
+        for options in ({'scaling': 'standard'}, {'pca': 0.9, 'scaling': 'minmax'},
+                        {'prototypes': 'enn', 'lsh_tables': 4, 'lsh_bits': 6}):
+            model = KNN(self.dataset, None, 5, **options)
+            model.save(self.path)
+            loaded = KNN.load(self.path, mmap=False)
+
+            self.assertEqual(loaded.options, model.options)
+            self.assert_same_predictions(model, loaded)
+
+    def test_saves_imputer_and_manifest(self):
+        imputer = MeanImputer().fit(np.array([[1.0, np.nan], [3.0, 4.0]]), ['a', 'b'])
+        KNN(self.dataset, None, 3).save(self.path, imputer=imputer)
+        loaded = KNN.load(self.path)
+
+        np.testing.assert_array_equal(loaded.imputer.means, [2.0, 4.0])
+        with open(os.path.join(self.path, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest['version'], 1)
+        self.assertEqual(manifest['metric'], 'euclidean')
+
+    def test_overwrite_and_version_check(self):
+        KNN(self.dataset, None, 3).save(self.path)
+        KNN(self.dataset, None, 7).save(self.path)
+        self.assertEqual(KNN.load(self.path).k, 7)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ['modello'])
+
+        manifest_path = os.path.join(self.path, MANIFEST_NAME)
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        manifest['version'] = 99
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
+        with self.assertRaises(ValueError):
+            KNN.load(self.path)
+        with self.assertRaises(FileNotFoundError):
+            KNN.load(os.path.join(self.tmp_dir.name, 'assente'))
+
+    def test_loaded_model_accepts_new_samples(self):
+        """I nuovi campioni vengono copiati in memoria: il modello salvato su disco non cambia"""
+        KNN(self.dataset, None, 5).save(self.path)
+        loaded = KNN.load(self.path)
+        loaded.add_samples(self.x_test, np.zeros(len(self.x_test), dtype=int))
+
+        self.assertEqual(loaded.n_samples, 460)
+        self.assertEqual(KNN.load(self.path).n_samples, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
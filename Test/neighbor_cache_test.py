@@ -0,0 +1,76 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from ModelDevelopment.knn_scratch import KNN
+from ModelDevelopment.neighbor_cache import NeighborCache
+
+
+class TestNeighborCache(unittest.TestCase):
+    """Test per la cache LRU dei vicini del KNN"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # Feature ordinali come nel dataset Wisconsin: molte righe ripetute
+        self.X = rng.integers(1, 11, (400, 5)).astype(np.float64)
+        self.y = (self.X[:, 0] + self.X[:, 1] > 11).astype(np.int64)
+        self.x_test = rng.integers(1, 11, (60, 5)).astype(np.float64)
+
+    def test_lru_eviction_and_counters(self):
+        cache = NeighborCache(max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)  # 'b' diventa la meno recente
+        cache.put('c', 3)
+        self.assertIsNone(cache.get('b'))
+        info = cache.info()
+        self.assertEqual((info['hits'], info['misses'], info['evictions'], info['size']), (1, 1, 1, 2))
+        with self.assertRaises(ValueError):
+            NeighborCache(0)
+
+    def test_cached_results_match_uncached(self):
+        plain = KNN(self.X, self.y, 5, scaling='standard')
+        cached = KNN(self.X, self.y, 5, scaling='standard', cache_size=1000)
+        for _ in range(2):
+            indices, distances = cached.kneighbors(self.x_test, return_distance=True)
+            expected_indices, expected_distances = plain.kneighbors(self.x_test, return_distance=True)
+            np.testing.assert_array_equal(indices, expected_indices)
+            np.testing.assert_allclose(distances, expected_distances)
+            self.assertEqual(cached.test(self.x_test), plain.test(self.x_test))
+            for got, expected in zip(cached.test_with_proba(self.x_test), plain.test_with_proba(self.x_test)):
+                np.testing.assert_array_equal(got, expected)
+
+    def test_repeated_rows_hit_cache(self):
+        model = KNN(self.X, self.y, 3, cache_size=1000)
+        batch = np.vstack([self.x_test[:10]] * 3)  # duplicati nella stessa richiesta
+        model.test(batch)
+        info = model.cache_info()
+        self.assertEqual((info['hits'], info['misses'], info['size']), (0, 10, 10))
+        model.test(self.x_test[:10])
+        self.assertEqual(model.cache_info()['hits'], 10)
+
+    def test_cache_invalidated_when_training_changes(self):
+        model = KNN(self.X[:200], self.y[:200], 5, cache_size=1000)
+        model.kneighbors(self.x_test)
+        model.add_samples(self.X[200:], self.y[200:])
+        self.assertEqual(len(model._cache), 0)
+        np.testing.assert_array_equal(model.kneighbors(self.x_test), KNN(self.X, self.y, 5).kneighbors(self.x_test))
+
+        model.remove_samples(np.arange(100))
+        self.assertEqual(model.cache_info()['invalidations'], 2)
+        expected = KNN(self.X[100:], self.y[100:], 5).kneighbors(self.x_test)
+        np.testing.assert_array_equal(model.kneighbors(self.x_test), expected)
+
+    def test_cache_size_restored_on_load(self):
+        model = KNN(self.X, self.y, 5, cache_size=50)
+        with tempfile.TemporaryDirectory() as tmp:
+            model.save(f"{tmp}/modello")
+            loaded = KNN.load(f"{tmp}/modello")
+            loaded.test(self.x_test)
+            self.assertEqual(loaded.cache_info()['max_entries'], 50)
+            self.assertEqual(loaded.cache_info()['evictions'], len(np.unique(self.x_test, axis=0)) - 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
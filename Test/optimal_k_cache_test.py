@@ -0,0 +1,75 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from ModelEvaluation import cross_validation
+from ModelEvaluation.cross_validation import find_optimal_k
+from ModelEvaluation.optimal_k_cache import OptimalKCache
+from Preprocessing.dataset import Dataset
+
+
+class TestOptimalKCache(unittest.TestCase):
+    """Test per la memorizzazione della ricerca del k ottimale"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp_dir.name, 'k_cache.json')
+        rng = np.random.default_rng(0)
+        X = rng.integers(1, 11, (150, 4)).astype(np.float32)
+        self.dataset = Dataset(X, (X[:, 0] + X[:, 1] > 11).astype(np.int8))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def search(self, cache, **kwargs):
+        """Esegue find_optimal_k contando i fold valutati; restituisce (k, fold valutati)."""
+        evaluated = []
+
+        def counting_accuracy(k, knn_options, fold):
+            evaluated.append(k)
+            return original(k, knn_options, fold)
+        original = cross_validation._fold_accuracy
+        with patch('ModelEvaluation.cross_validation._fold_accuracy', counting_accuracy), \
+                contextlib.redirect_stdout(io.StringIO()):
+            best_k = find_optimal_k(self.dataset, None, cache=cache, **kwargs)
+        return best_k, evaluated
+
+    def test_repeated_search_is_not_recomputed(self):
+        cache = OptimalKCache(self.cache_path)
+        best_k, evaluated = self.search(cache, k_range=range(1, 6), k_folds=3)
+        self.assertEqual(len(evaluated), 5 * 3)
+
+        self.assertEqual(self.search(cache, k_range=range(1, 6), k_folds=3), (best_k, []))
+        # Anche da un nuovo processo (nuova istanza che legge il file)
+        self.assertEqual(self.search(OptimalKCache(self.cache_path), k_range=range(1, 6), k_folds=3), (best_k, []))
+
+    def test_wider_range_computes_only_missing_k(self):
+        cache = OptimalKCache(self.cache_path)
+        self.search(cache, k_range=range(1, 6), k_folds=3)
+        _, evaluated = self.search(cache, k_range=range(1, 9), k_folds=3)
+        self.assertEqual(sorted(set(evaluated)), [6, 7, 8])
+        self.assertEqual(sorted(cache.scores(self.dataset.fingerprint, 3)), list(range(1, 9)))
+
+    def test_key_depends_on_folds_and_options(self):
+        cache = OptimalKCache(self.cache_path)
+        self.search(cache, k_range=range(1, 4), k_folds=3)
+        self.assertEqual(len(self.search(cache, k_range=range(1, 4), k_folds=4)[1]), 3 * 4)
+        _, evaluated = self.search(cache, k_range=range(1, 4), k_folds=3, knn_options={'scaling': 'standard'})
+        self.assertEqual(len(evaluated), 3 * 3)
+
+    def test_corrupted_file_is_ignored(self):
+        with open(self.cache_path, 'w') as f:
+            f.write('{non json')
+        cache = OptimalKCache(self.cache_path)
+        self.assertEqual(cache.scores(self.dataset.fingerprint, 5), {})
+        _, evaluated = self.search(cache, k_range=range(1, 3), k_folds=3)
+        self.assertEqual(len(evaluated), 2 * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from ModelDevelopment.knn_scratch import KNN
+from Preprocessing.pca import PCA
+
+
+class TestPCA(unittest.TestCase):
+    """Test per la riduzione PCA calcolata con la SVD"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        base = rng.normal(0, 1, (500, 2))
+        # Quattro colonne, di cui due quasi copie delle prime due: due componenti spiegano quasi tutto
+        self.X = np.hstack([base, base @ [[1.0, 0.5], [0.2, 1.0]] + rng.normal(0, 0.01, (500, 2))])
+
+    def test_keeps_components_for_variance_ratio(self):
+        pca = PCA(variance_ratio=0.99).fit(self.X)
+
+        self.assertEqual(pca.n_components_, 2)
+        self.assertGreaterEqual(pca.explained_variance_ratio.sum(), 0.99)
+        self.assertEqual(pca.transform(self.X).shape, (500, 2))
+
+    def test_matches_svd_of_centered_data(self):
+        pca = PCA(n_components=2).fit(self.X)
+        _, _, vt = np.linalg.svd(self.X - self.X.mean(axis=0), full_matrices=False)
+
+        np.testing.assert_allclose(np.abs(pca.components), np.abs(vt[:2]), atol=1e-8)
+
+    def test_blockwise_fit_matches_single_block(self):
+        expected = PCA(variance_ratio=0.99).fit(self.X).transform(self.X)
+        with patch('Preprocessing.pca.BLOCK_ROWS', 64):
+            blockwise = PCA(variance_ratio=0.99).fit(self.X).transform(self.X)
+
+        np.testing.assert_allclose(blockwise, expected, atol=1e-10)
+
+    def test_transform_requires_fit(self):
+        with self.assertRaises(RuntimeError):
+            PCA().transform(self.X)
+        with self.assertRaises(ValueError):
+            PCA(variance_ratio=1.5)
+
+    def test_knn_fits_pca_on_training_data_only(self):
+        """Il KNN con l'opzione pca calcola le componenti sul training set e proietta il test allo stesso modo"""
+        y = (self.X[:, 0] > 0).astype(int)
+        knn = KNN(self.X[:400], y[:400], 5, pca=0.99)
+
+        np.testing.assert_allclose(knn.pca.mean, self.X[:400].mean(axis=0))
+        self.assertEqual(knn._x.shape, (400, 2))
+        accuracy = np.mean(np.array(knn.test(self.X[400:])) == y[400:])
+        self.assertGreater(accuracy, 0.9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import unittest
+
+import numpy as np
+
+from ModelDevelopment.knn_scratch import KNN
+from ModelServing.prediction_server import MicroBatcher, PredictionServer, parse_samples
+from Preprocessing.dataset import Dataset
+from Preprocessing.imputer import MeanImputer
+
+
+async def http_request(port, method, path, payload=None):
+    """Invia una richiesta HTTP al server locale e restituisce (stato, corpo JSON)."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                 + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(content)
+
+
+class TestPredictionServer(unittest.TestCase):
+    """Test per il server di predizione con micro-batching"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        X = rng.normal(0, 1, (300, 3))
+        self.model = KNN(Dataset(X, (X[:, 0] > 0).astype(int), ['a', 'b', 'c']), None, 5)
+        self.x_test = rng.normal(0, 1, (40, 3))
+
+    def run_with_server(self, scenario, batch_window_ms=20.0):
+        async def run():
+            server = PredictionServer(self.model, batch_window_ms=batch_window_ms)
+            _, port = await server.start(port=0)
+            try:
+                return await scenario(port), server.stats.snapshot()
+            finally:
+                await server.stop()
+        return asyncio.run(run())
+
+    def test_concurrent_requests_are_batched(self):
+        async def scenario(port):
+            return await asyncio.gather(*[http_request(port, 'POST', '/predict', {'samples': [row.tolist()]})
+                                          for row in self.x_test])
+
+        responses, stats = self.run_with_server(scenario)
+
+        self.assertTrue(all(status == 200 for status, _ in responses))
+        predictions = [body['predictions'][0] for _, body in responses]
+        probabilities = [body['probabilities'][0] for _, body in responses]
+        self.assertEqual(predictions, self.model.test(self.x_test))
+        self.assertEqual(probabilities, self.model.test_proba(self.x_test))
+        self.assertEqual(stats['requests'], len(self.x_test))
+        self.assertLess(stats['batches'], len(self.x_test))
+        self.assertGreater(stats['latency_p99_ms'], 0)
+
+    def test_stats_and_errors(self):
+        async def scenario(port):
+            return (await http_request(port, 'GET', '/stats'),
+                    await http_request(port, 'POST', '/predict', {'samples': [[1.0, 2.0]]}),
+                    await http_request(port, 'GET', '/predict'),
+                    await http_request(port, 'GET', '/altro'))
+
+        (stats_status, stats), bad_shape, wrong_method, not_found = self.run_with_server(scenario)[0]
+
+        self.assertEqual(stats_status, 200)
+        self.assertIn('latency_p50_ms', stats)
+        self.assertEqual(bad_shape[0], 400)
+        self.assertEqual(wrong_method[0], 405)
+        self.assertEqual(not_found[0], 404)
+
+    def test_parse_samples_by_name_with_imputer(self):
+        imputer = MeanImputer().fit(np.array([[1.0, 2.0, 3.0], [3.0, 4.0, 5.0]]), ['a', 'b', 'c'])
+        rows = parse_samples({'samples': [{'a': 0.5, 'c': None}]}, ['a', 'b', 'c'], imputer)
+
+        np.testing.assert_array_equal(rows, [[0.5, 3.0, 4.0]])
+        with self.assertRaises(ValueError):
+            parse_samples({'samples': [[1.0, None, 2.0]]}, ['a', 'b', 'c'])
+
+    def test_mixed_widths_in_one_batch_do_not_stop_the_batcher(self):
+        """Senza nomi di feature, richieste di larghezza diversa nello stesso batch ricevono un errore"""
+        rng = np.random.default_rng(1)
+        X = rng.normal(0, 1, (100, 3))
+        model = KNN(X, (X[:, 0] > 0).astype(int), 3)
+        self.assertIsNone(model.feature_names)
+
+        async def run():
+            batcher = MicroBatcher(model, batch_window_ms=50.0)
+            batcher.start()
+            try:
+                mixed = await asyncio.wait_for(asyncio.gather(batcher.predict(np.ones((1, 3))),
+                                                              batcher.predict(np.ones((1, 2))),
+                                                              return_exceptions=True), timeout=5)
+                # Il batcher continua a servire le richieste successive
+                after = await asyncio.wait_for(batcher.predict(self.x_test[:2]), timeout=5)
+                return mixed, after, batcher.stats.errors
+            finally:
+                await batcher.stop()
+
+        mixed, (predictions, _), errors = asyncio.run(run())
+        self.assertTrue(all(isinstance(result, ValueError) for result in mixed))
+        self.assertEqual(errors, 2)
+        self.assertEqual(predictions.tolist(), model.test(self.x_test[:2]))
+
+        # Il server rifiuta comunque i campioni con un numero di feature diverso da quello del modello
+        with self.assertRaises(ValueError):
+            parse_samples({'samples': [[1.0, 2.0]]}, None, None, model.n_features)
+
+
+if __name__ == '__main__':
+    unittest.main()
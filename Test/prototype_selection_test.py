@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from ModelDevelopment.knn_scratch import KNN
+from ModelDevelopment.prototype_selection import condensed_indices, edited_indices, select_prototypes
+
+
+class TestPrototypeSelection(unittest.TestCase):
+    """Test per la selezione dei prototipi (editing di Wilson e condensazione di Hart)"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # Due nuvole ben separate più alcuni punti con l'etichetta sbagliata
+        self.X = np.vstack([rng.normal(0, 1, (200, 2)), rng.normal(8, 1, (200, 2))])
+        self.y = np.repeat([0, 1], 200)
+        self.noisy = np.array([5, 17, 250])
+        self.y_noisy = self.y.copy()
+        self.y_noisy[self.noisy] = 1 - self.y_noisy[self.noisy]
+
+    def test_edited_removes_mislabeled_samples(self):
+        kept = edited_indices(KNN(self.X, self.y_noisy, 5))
+
+        self.assertFalse(np.isin(self.noisy, kept).any())
+        self.assertGreater(len(kept), 390)
+
+    def test_condensed_set_classifies_training_set(self):
+        """I prototipi della condensazione classificano correttamente tutto il training set con 1-NN"""
+        model = KNN(self.X, self.y, 1)
+        prototypes = condensed_indices(model)
+        reduced = KNN(self.X[prototypes], self.y[prototypes], 1)
+
+        self.assertLess(len(prototypes), 40)
+        self.assertEqual(reduced.test(self.X), self.y.tolist())
+
+    def test_condensed_consistent_with_small_blocks(self):
+        model = KNN(self.X, self.y, 1)
+        with patch('ModelDevelopment.prototype_selection.QUERY_BLOCK_ROWS', 7):
+            prototypes = condensed_indices(model, batch_rows=3)
+
+        self.assertEqual(KNN(self.X[prototypes], self.y[prototypes], 1).test(self.X), self.y.tolist())
+
+    def test_knn_option_reduces_training_set(self):
+        knn = KNN(self.X, self.y_noisy, 3, prototypes='enn_cnn')
+
+        np.testing.assert_array_equal(knn._x, self.X[knn.prototype_indices])
+        self.assertLess(knn.compression_ratio, 0.1)
+        self.assertEqual(knn.test([[0, 0], [8, 8]]), [0, 1])
+        self.assertEqual(KNN(self.X, self.y, 3).compression_ratio, 1.0)
+
+    def test_invalid_method(self):
+        with self.assertRaises(ValueError):
+            select_prototypes(KNN(self.X, self.y, 3), 'random')
+
+
+if __name__ == '__main__':
+    unittest.main()
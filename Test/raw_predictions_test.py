@@ -0,0 +1,53 @@
+import os
+import unittest
+
+import numpy as np
+
+from ModelEvaluation.raw_predictions import MemmapRunPredictions
+
+
+class TestMemmapRunPredictions(unittest.TestCase):
+    """Test per il contenitore su memmap delle predizioni grezze"""
+
+    def setUp(self):
+        self.store = MemmapRunPredictions(n_runs=3, max_test_size=4)
+
+    def tearDown(self):
+        if os.path.exists(self.store.directory):
+            self.store.close()
+
+    def test_append_and_read_back_runs_of_different_size(self):
+        """Ogni run viene riletto con la sua lunghezza effettiva"""
+        self.store.append([0, 1, 1], [0, 1, 0], [0.1, 0.9, 0.4])
+        self.store.append([1, 0, 0, 1], [1, 0, 1, 1], [0.8, 0.2, 0.6, 0.7])
+
+        self.assertEqual(len(self.store), 2)
+        first, second = list(self.store)
+        np.testing.assert_array_equal(first['y_true'], [0, 1, 1])
+        np.testing.assert_array_equal(second['y_pred'], [1, 0, 1, 1])
+        np.testing.assert_allclose(second['y_pred_proba'], [0.8, 0.2, 0.6, 0.7], rtol=1e-6)
+        np.testing.assert_array_equal(self.store[-1]['y_true'], [1, 0, 0, 1])
+
+    def test_labels_are_stored_as_int8_on_disk(self):
+        self.assertEqual(self.store.y_true.dtype, np.int8)
+        self.assertEqual(self.store.y_pred_proba.dtype, np.float32)
+        self.assertIsInstance(self.store.y_true, np.memmap)
+
+    def test_append_rejects_oversized_runs(self):
+        with self.assertRaises(ValueError):
+            self.store.append([0] * 5, [0] * 5, [0.0] * 5)
+
+    def test_append_rejects_more_runs_than_allocated(self):
+        for _ in range(3):
+            self.store.append([0], [0], [0.0])
+        with self.assertRaises(IndexError):
+            self.store.append([0], [0], [0.0])
+
+    def test_close_removes_temporary_directory(self):
+        directory = self.store.directory
+        self.store.close()
+        self.assertFalse(os.path.exists(directory))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from ModelEvaluation.results_handler import HoldoutResultsHandler, KFoldResultsHandler
+
+# Budget (in microsecondi) per l'import dei validatori in modalità solo metriche.
+# Con matplotlib/seaborn importati a livello di modulo si superavano abbondantemente i 700 ms.
+HEADLESS_IMPORT_BUDGET_US = 500_000
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VALIDATOR_MODULES = [
+    'ModelEvaluation.holdout_validation',
+    'ModelEvaluation.cross_validation',
+    'ModelEvaluation.stratified_shuffle_split_validation',
+]
+
+
+def _run_importtime(modules):
+    """
+    Importa i moduli in un interprete pulito con 'python -X importtime' e
+    restituisce un dizionario {modulo: tempo cumulativo in microsecondi}.
+    """
+    code = "; ".join(f"import {m}" for m in modules)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    timings = {}
+    for line in result.stderr.splitlines():
+        # Formato: "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+class TestHeadlessImport(unittest.TestCase):
+    """Benchmark di avvio: il percorso solo metriche non deve caricare lo stack grafico."""
+
+    def test_validators_do_not_import_plotting_stack(self):
+        timings = _run_importtime(VALIDATOR_MODULES)
+        self.assertNotIn('matplotlib', timings)
+        self.assertNotIn('seaborn', timings)
+
+    def test_validators_import_within_budget(self):
+        timings = _run_importtime(VALIDATOR_MODULES)
+        total_us = sum(timings[m] for m in VALIDATOR_MODULES)
+        self.assertLess(total_us, HEADLESS_IMPORT_BUDGET_US,
+                        f"Import dei validatori: {total_us / 1000:.0f} ms "
+                        f"(budget {HEADLESS_IMPORT_BUDGET_US / 1000:.0f} ms)")
+
+
+class TestMetricsOnlyMode(unittest.TestCase):
+    """Test per la modalità solo metriche degli handler."""
+
+    def setUp(self):
+        self.metrics = {'accuracy': 0.75, 'error_rate': 0.25, 'sensitivity': 0.5,
+                        'specificity': 1.0, 'gmean': 0.7071, 'auc': 0.75}
+        self.y_true = [0, 0, 1, 1]
+        self.y_pred = [0, 0, 0, 1]
+        self.y_pred_proba = [0.2, 0.4, 0.4, 0.8]
+
+    def test_holdout_metrics_only_writes_csv_without_plots(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            handler = HoldoutResultsHandler(metrics=self.metrics, y_true=self.y_true, y_pred=self.y_pred,
+                                            y_pred_proba=self.y_pred_proba, filename_prefix='holdout_test',
+                                            output_dir=output_dir, plots=False)
+            handler.save_results()
+            self.assertEqual(os.listdir(output_dir), ['holdout_test_results.csv'])
+
+    def test_kfold_metrics_only_writes_csv_without_plots(self):
+        raw = {'y_true': self.y_true, 'y_pred': self.y_pred, 'y_pred_proba': self.y_pred_proba}
+        with tempfile.TemporaryDirectory() as output_dir:
+            handler = KFoldResultsHandler(all_fold_metrics=[self.metrics, self.metrics],
+                                          all_fold_raw_data=[raw, raw], filename_prefix='kfold_test',
+                                          output_dir=output_dir, plots=False)
+            handler.save_results()
+            self.assertEqual(os.listdir(output_dir), ['kfold_test_results.csv'])
+
+
+if __name__ == '__main__':
+    unittest.main()
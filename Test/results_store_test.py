@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from ModelEvaluation.results_store import SQLiteResultsStore, dataset_fingerprint
+
+
+def _metrics(accuracy, auc=0.9):
+    return {'accuracy': accuracy, 'error_rate': 1 - accuracy, 'sensitivity': accuracy,
+            'specificity': accuracy, 'gmean': accuracy, 'auc': auc}
+
+
+class TestSQLiteResultsStore(unittest.TestCase):
+    """Test per l'archivio SQLite dei risultati."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, 'results.sqlite')
+        self.store = SQLiteResultsStore(self.db_path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_save_run_inserts_one_row_per_fold(self):
+        """Ogni fold viene salvato come riga separata, con le durate e i tempi per fase"""
+        run_id = self.store.save_run('kfold', {'k': 3, 'k_folds': 2}, [_metrics(0.9), _metrics(0.8)],
+                                     dataset_fingerprint='abc', run_durations=[0.1, 0.2],
+                                     timings={'evaluation': 0.3, 'total': 0.3})
+        with sqlite3.connect(self.db_path) as conn:
+            n_runs, duration = conn.execute("SELECT n_runs, duration_s FROM runs WHERE run_id = ?",
+                                            (run_id,)).fetchone()
+            fold_rows = conn.execute("SELECT run_index, accuracy, duration_s FROM run_metrics "
+                                     "WHERE run_id = ? ORDER BY run_index", (run_id,)).fetchall()
+            stages = conn.execute("SELECT COUNT(*) FROM run_timings WHERE run_id = ?", (run_id,)).fetchone()[0]
+        self.assertEqual(n_runs, 2)
+        self.assertAlmostEqual(duration, 0.3)
+        self.assertEqual(fold_rows, [(1, 0.9, 0.1), (2, 0.8, 0.2)])
+        self.assertEqual(stages, 2)
+
+    def test_best_configs_orders_by_mean_metric(self):
+        """best_configs restituisce le configurazioni ordinate per media della metrica"""
+        self.store.save_run('kfold', {'k': 1, 'k_folds': 2}, [_metrics(0.7), _metrics(0.8)], 'abc')
+        self.store.save_run('kfold', {'k': 5, 'k_folds': 2}, [_metrics(0.95), _metrics(0.9)], 'abc')
+        self.store.save_run('holdout', {'k': 3, 'test_perc': 0.2}, [_metrics(0.99)], 'other')
+
+        best = self.store.best_configs(metric='accuracy', method='kfold')
+
+        self.assertEqual(list(best['k']), [5, 1])
+        self.assertAlmostEqual(best['mean_accuracy'].iloc[0], 0.925)
+        self.assertEqual(best['n_runs'].iloc[0], 2)
+
+    def test_best_configs_rejects_unknown_metric(self):
+        with self.assertRaises(ValueError):
+            self.store.best_configs(metric='f1')
+
+    def test_dataset_fingerprint_is_format_independent(self):
+        """La stessa tabella in formato lista o numerico produce la stessa impronta"""
+        X = [[1, 2], [3, 4]]
+        Y = [0, 1]
+        self.assertEqual(dataset_fingerprint(X, Y), dataset_fingerprint([[1.0, 2.0], [3.0, 4.0]], [0, 1]))
+        self.assertNotEqual(dataset_fingerprint(X, Y), dataset_fingerprint(X, [1, 0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import contextlib
+import copy
+import io
+import unittest
+
+import numpy as np
+
+from Benchmark.run_benchmarks import build_parser, compare, run_suite
+from Preprocessing.dataset import Dataset
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    """Test per la suite di benchmark e il confronto con il baseline"""
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(0)
+        X = rng.integers(1, 11, (300, 9)).astype(np.float32)
+        base = Dataset(X, (X[:, 0] + X[:, 1] > 11).astype(np.int8))
+        args = build_parser().parse_args(['--rows', '200', '--features', '9', '4', '--queries', '50',
+                                          '--max-k', '3', '--folds', '3', '--experiments', '2', '--repeat', '1'])
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.results = run_suite(args, base)
+
+    def test_grid_covers_every_case(self):
+        cases = self.results['results']
+        for name in ('knn.fit', 'knn.test', 'knn.test_proba', 'data.k_fold_split', 'knn.find_optimal_k'):
+            self.assertIn(f'{name}[rows=200,features=9]', cases)
+            self.assertIn(f'{name}[rows=200,features=4]', cases)
+        # I casi che non dipendono dalle feature vengono misurati una sola volta per numero di righe
+        for name in ('data.stratified_shuffle_split', 'metrics.calculate_metrics',
+                     'results.holdout_handler', 'results.kfold_handler'):
+            self.assertIn(f'{name}[rows=200]', cases)
+        result = cases['knn.test[rows=200,features=9]']
+        self.assertAlmostEqual(result['throughput'], 50 / result['seconds'])
+        self.assertGreater(result['peak_kb'], 0)
+
+    def test_compare_flags_slowdowns_beyond_threshold(self):
+        current = copy.deepcopy(self.results)
+        baseline = copy.deepcopy(self.results)
+        current['results']['knn.find_optimal_k[rows=200,features=9]']['seconds'] = 0.2
+        baseline['results']['knn.find_optimal_k[rows=200,features=9]']['seconds'] = 0.1
+        del baseline['results']['knn.fit[rows=200,features=4]']
+        statuses = {row['case']: row['status'] for row in compare(current, baseline, threshold=0.25)}
+
+        self.assertEqual(statuses['knn.find_optimal_k[rows=200,features=9]'], 'regressione')
+        self.assertEqual(statuses['knn.fit[rows=200,features=4]'], 'nuovo')
+        self.assertEqual(statuses['knn.test[rows=200,features=9]'], 'ok')
+
+    def test_compare_ignores_tiny_absolute_differences(self):
+        current = copy.deepcopy(self.results)
+        baseline = copy.deepcopy(self.results)
+        current['results']['knn.fit[rows=200,features=9]']['seconds'] = 0.002
+        baseline['results']['knn.fit[rows=200,features=9]']['seconds'] = 0.001
+        rows = compare(current, baseline, threshold=0.25)
+        self.assertNotIn('regressione', {row['status'] for row in rows})
+
+
+if __name__ == '__main__':
+    unittest.main()
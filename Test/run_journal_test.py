@@ -0,0 +1,145 @@
+import contextlib
+import io
+import os
+import random
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from ModelEvaluation import cross_validation, stratified_shuffle_split_validation as sss_validation
+from ModelEvaluation.cross_validation import kfold_validation
+from ModelEvaluation.run_journal import RunJournal
+from ModelEvaluation.stratified_shuffle_split_validation import stratified_shuffle_split_validation
+
+KFOLD_HANDLER = 'ModelEvaluation.cross_validation.KFoldResultsHandler'
+SSS_HANDLER = 'ModelEvaluation.stratified_shuffle_split_validation.StratifiedShuffleSplitResultsHandler'
+
+
+def interrupt_after(function, n_calls):
+    """Avvolge function in modo che la chiamata numero n_calls + 1 simuli un Ctrl+C."""
+    calls = []
+
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        if len(calls) > n_calls:
+            raise KeyboardInterrupt
+        return function(*args, **kwargs)
+    return wrapper, calls
+
+
+class TestRunJournal(unittest.TestCase):
+    """Test per il journal delle validazioni e la ripresa con resume"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.checkpoint_dir = os.path.join(self.tmp_dir.name, 'checkpoints')
+        rng = np.random.default_rng(0)
+        self.X = rng.integers(1, 11, (120, 4)).astype(float)
+        self.Y = (self.X[:, 0] + self.X[:, 1] + rng.normal(0, 2, 120) > 11).astype(int)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def run_captured(self, handler, validation, *args, **kwargs):
+        """Esegue la validazione sostituendo l'handler: restituisce metriche, dati grezzi e prefisso ricevuti."""
+        captured = {}
+
+        def capture(**handler_kwargs):
+            metrics = next(value for key, value in handler_kwargs.items() if key.endswith('_metrics'))
+            raw_data = next(value for key, value in handler_kwargs.items() if key.endswith('_raw_data'))
+            # Copia dei dati grezzi: il memmap viene chiuso al termine della validazione
+            captured['metrics'] = metrics
+            captured['raw'] = [{name: np.array(values) for name, values in run.items()} for run in raw_data]
+            captured['prefix'] = handler_kwargs['filename_prefix']
+            return MagicMock()
+
+        with patch(handler, side_effect=capture), contextlib.redirect_stdout(io.StringIO()):
+            validation(*args, **kwargs)
+        return captured
+
+    def assert_same_results(self, resumed, reference):
+        self.assertEqual(resumed['metrics'], reference['metrics'])
+        self.assertEqual(len(resumed['raw']), len(reference['raw']))
+        for resumed_run, reference_run in zip(resumed['raw'], reference['raw']):
+            for name in ('y_true', 'y_pred', 'y_pred_proba'):
+                np.testing.assert_array_equal(resumed_run[name], reference_run[name])
+
+    def test_torn_tail_is_truncated(self):
+        path = os.path.join(self.tmp_dir.name, 'journal.jsonl')
+        journal = RunJournal(path)
+        journal.begin({'prefix': 'test'})
+        journal.record_run(0, {'accuracy': 0.9}, 0.1, {'row': 0, 'length': 3})
+        valid_size = os.path.getsize(path)
+        with open(path, 'ab') as f:
+            f.write(b'{"type": "run", "index": 1, "metr')
+
+        reloaded = RunJournal(path)
+        self.assertEqual(reloaded.header['prefix'], 'test')
+        self.assertEqual([run['metrics'] for run in reloaded.runs], [{'accuracy': 0.9}])
+        self.assertEqual(os.path.getsize(path), valid_size)
+
+        with self.assertRaises(ValueError):
+            reloaded.record_run(2, {}, 0.0, None)
+
+    def test_kfold_resume_matches_uninterrupted_run(self):
+        random.seed(1)
+        reference = self.run_captured(KFOLD_HANDLER, kfold_validation, self.X, self.Y, 3, 5)
+
+        random.seed(1)
+        failing, calls = interrupt_after(cross_validation.evaluate_split, 2)
+        with patch('ModelEvaluation.cross_validation.evaluate_split', side_effect=failing), \
+                self.assertRaises(KeyboardInterrupt), contextlib.redirect_stdout(io.StringIO()):
+            kfold_validation(self.X, self.Y, 3, 5, checkpoint_dir=self.checkpoint_dir)
+        journal_files = [f for f in os.listdir(self.checkpoint_dir) if f.endswith('.jsonl')]
+        self.assertEqual(len(journal_files), 1)
+        interrupted = RunJournal(os.path.join(self.checkpoint_dir, journal_files[0]))
+        self.assertEqual(len(interrupted.runs), 2)
+
+        # Lo stato di random alla ripresa è diverso: i fold devono comunque essere quelli originali
+        random.seed(999)
+        resumed_calls, calls = interrupt_after(cross_validation.evaluate_split, 100)
+        with patch('ModelEvaluation.cross_validation.evaluate_split', side_effect=resumed_calls):
+            resumed = self.run_captured(KFOLD_HANDLER, kfold_validation, self.X, self.Y, 3, 5,
+                                        checkpoint_dir=self.checkpoint_dir, resume=True)
+
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(resumed['prefix'], interrupted.header['prefix'])
+        self.assert_same_results(resumed, reference)
+        # A esecuzione completata journal e predizioni grezze vengono eliminati
+        self.assertEqual(os.listdir(self.checkpoint_dir), [])
+
+    def test_shuffle_split_resume_matches_uninterrupted_run(self):
+        reference = self.run_captured(SSS_HANDLER, stratified_shuffle_split_validation,
+                                      self.X, self.Y, 3, 6)
+
+        failing, calls = interrupt_after(sss_validation.evaluate_split, 4)
+        with patch('ModelEvaluation.stratified_shuffle_split_validation.evaluate_split', side_effect=failing), \
+                self.assertRaises(KeyboardInterrupt), contextlib.redirect_stdout(io.StringIO()):
+            stratified_shuffle_split_validation(self.X, self.Y, 3, 6, checkpoint_dir=self.checkpoint_dir)
+
+        resumed_calls, calls = interrupt_after(sss_validation.evaluate_split, 100)
+        with patch('ModelEvaluation.stratified_shuffle_split_validation.evaluate_split', side_effect=resumed_calls):
+            resumed = self.run_captured(SSS_HANDLER, stratified_shuffle_split_validation,
+                                        self.X, self.Y, 3, 6, checkpoint_dir=self.checkpoint_dir, resume=True)
+
+        self.assertEqual(len(calls), 2)
+        self.assert_same_results(resumed, reference)
+        self.assertEqual(os.listdir(self.checkpoint_dir), [])
+
+    def test_without_resume_the_journal_starts_over(self):
+        failing, calls = interrupt_after(sss_validation.evaluate_split, 2)
+        with patch('ModelEvaluation.stratified_shuffle_split_validation.evaluate_split', side_effect=failing), \
+                self.assertRaises(KeyboardInterrupt), contextlib.redirect_stdout(io.StringIO()):
+            stratified_shuffle_split_validation(self.X, self.Y, 3, 6, checkpoint_dir=self.checkpoint_dir)
+
+        resumed_calls, calls = interrupt_after(sss_validation.evaluate_split, 100)
+        with patch('ModelEvaluation.stratified_shuffle_split_validation.evaluate_split', side_effect=resumed_calls):
+            self.run_captured(SSS_HANDLER, stratified_shuffle_split_validation,
+                              self.X, self.Y, 3, 6, checkpoint_dir=self.checkpoint_dir)
+        self.assertEqual(len(calls), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
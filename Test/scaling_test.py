@@ -0,0 +1,71 @@
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from ModelDevelopment.knn_scratch import KNN
+from Preprocessing.pca import PCA
+from Preprocessing.scaling import FeatureScaler
+
+
+class TestFeatureScaler(unittest.TestCase):
+    """Test per la scalatura delle feature applicata come pesi nella distanza del KNN"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # Feature con scale molto diverse e una feature costante
+        self.X = rng.normal(0, 1, (300, 4)) * [1.0, 50.0, 0.01, 0.0] + [0.0, 10.0, 3.0, 7.0]
+        self.y = (self.X[:, 0] + 100 * self.X[:, 2] > 0).astype(int)
+        self.x_test = rng.normal(0, 1, (60, 4)) * [1.0, 50.0, 0.01, 0.0] + [0.0, 10.0, 3.0, 7.0]
+
+    def test_statistics(self):
+        standard = FeatureScaler('standard').fit(self.X)
+        minmax = FeatureScaler('minmax').fit(self.X)
+
+        np.testing.assert_allclose(standard.offset, self.X.mean(axis=0))
+        np.testing.assert_allclose(standard.scale[:3], self.X.std(axis=0)[:3])
+        np.testing.assert_allclose(minmax.scale[:3], np.ptp(self.X, axis=0)[:3])
+        # Feature costante: scala 1 invece di una divisione per zero
+        self.assertEqual(standard.scale[3], 1.0)
+        self.assertEqual(minmax.scale[3], 1.0)
+
+    def test_blockwise_fit_matches_single_block(self):
+        expected = FeatureScaler('standard').fit(self.X)
+        with patch('Preprocessing.scaling.BLOCK_ROWS', 64):
+            blockwise = FeatureScaler('standard').fit(self.X)
+
+        np.testing.assert_allclose(blockwise.offset, expected.offset)
+        np.testing.assert_allclose(blockwise.scale, expected.scale)
+
+    def test_invalid_method(self):
+        with self.assertRaises(ValueError):
+            FeatureScaler('robust')
+
+    def test_weighted_distances_match_scaled_data(self):
+        """Le distanze pesate coincidono con quelle calcolate su una copia scalata dei dati"""
+        for method in ('standard', 'minmax'):
+            scaler = FeatureScaler(method).fit(self.X)
+            fused = KNN(self.X, self.y, 5, scaling=method)
+            reference = KNN(scaler.transform(self.X), self.y, 5)
+
+            np.testing.assert_allclose(fused.euclidean_distance(self.x_test),
+                                       reference.euclidean_distance(scaler.transform(self.x_test)), atol=1e-8)
+            self.assertEqual(fused.test(self.x_test), reference.test(scaler.transform(self.x_test)))
+
+    def test_knn_uses_training_statistics_only(self):
+        knn = KNN(self.X[:200], self.y[:200], 5, scaling='standard')
+
+        np.testing.assert_allclose(knn.scaler.offset, self.X[:200].mean(axis=0))
+        np.testing.assert_allclose(knn.scaler.scale[:3], self.X[:200].std(axis=0)[:3])
+
+    def test_scaling_with_pca_matches_pca_on_scaled_data(self):
+        scaler = FeatureScaler('standard').fit(self.X)
+        fused = KNN(self.X, self.y, 5, pca=0.99, scaling='standard')
+        pca = PCA(variance_ratio=0.99).fit(scaler.transform(self.X))
+
+        self.assertEqual(fused.pca.n_components_, pca.n_components_)
+        np.testing.assert_allclose(fused._x, pca.transform(scaler.transform(self.X)), atol=1e-8)
+
+
+if __name__ == '__main__':
+    unittest.main()
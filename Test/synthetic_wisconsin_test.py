@@ -0,0 +1,75 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from Benchmark.synthetic_wisconsin import PROJECT_ROOT, WisconsinProfile, write_synthetic_csv
+from Preprocessing.data_cleaner import clean_data
+from Preprocessing.feature_target_variables import load_data
+
+SOURCE_CSV = os.path.join(PROJECT_ROOT, 'version_1.csv')
+
+
+class TestSyntheticWisconsin(unittest.TestCase):
+    """Test per il generatore di dataset sintetici con lo schema di version_1.csv"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.profile = WisconsinProfile.fit(SOURCE_CSV)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, name, n_rows, **kwargs):
+        return write_synthetic_csv(os.path.join(self.tmp_dir.name, name), n_rows, self.profile, **kwargs)
+
+    def test_profile_round_trip(self):
+        path = os.path.join(self.tmp_dir.name, 'profile.json')
+        self.profile.save(path)
+        self.assertEqual(WisconsinProfile.load(path).data, self.profile.data)
+
+    def test_same_schema_and_messy_values(self):
+        path = self.write('synthetic.csv', 20_000, block_rows=7_000)
+        real = pd.read_csv(SOURCE_CSV, dtype=str, keep_default_na=False)
+        synthetic = pd.read_csv(path, dtype=str, keep_default_na=False)
+
+        self.assertEqual(list(synthetic.columns), list(real.columns))
+        self.assertEqual(len(synthetic), 20_000)
+        self.assertTrue(synthetic['Bland Chromatin'].str.contains(',').any())
+        self.assertTrue((synthetic['Single Epithelial Cell Size'] == 'nan').any())
+        self.assertTrue((synthetic['classtype_v1'] == '').any())
+        self.assertTrue(synthetic.drop(columns=['Blood Pressure', 'Heart Rate']).duplicated().any())
+        self.assertEqual(set(synthetic['classtype_v1']), {'2.0', '4.0', ''})
+
+    def test_class_conditional_distributions_match_source(self):
+        def class_means(path):
+            with contextlib.redirect_stdout(io.StringIO()):
+                dataset = load_data(clean_data(path, use_cache=False, interactive=False), use_cache=False)
+            return dataset.y.mean(), [dataset.X[dataset.y == label].mean(axis=0) for label in (0, 1)]
+
+        source_copy = os.path.join(self.tmp_dir.name, 'source.csv')
+        with open(SOURCE_CSV) as src, open(source_copy, 'w') as dst:
+            dst.write(src.read())
+        real_prior, real_means = class_means(source_copy)
+        synthetic_prior, synthetic_means = class_means(self.write('synthetic.csv', 30_000))
+
+        self.assertAlmostEqual(synthetic_prior, real_prior, delta=0.02)
+        for real, synthetic in zip(real_means, synthetic_means):
+            np.testing.assert_allclose(synthetic, real, atol=0.6)
+
+    def test_output_is_reproducible(self):
+        first = self.write('first.csv', 5_000, seed=3, block_rows=2_000)
+        second = self.write('second.csv', 5_000, seed=3, block_rows=2_000)
+        with open(first, 'rb') as f1, open(second, 'rb') as f2:
+            self.assertEqual(f1.read(), f2.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import contextlib
+import csv
+import io
+import os
+import tempfile
+import threading
+import unittest
+
+from ModelEvaluation.results_handler import HoldoutResultsHandler
+from Monitoring.timing import TIMER, StageTimer, run_profiled, timed
+
+
+class TestStageTimer(unittest.TestCase):
+    """Test per la strumentazione dei tempi per fase"""
+
+    def test_stages_and_counters_accumulate(self):
+        timer = StageTimer()
+        for _ in range(3):
+            with timer.stage('fase'):
+                pass
+        timer.count('campioni', 10)
+        snapshot = timer.snapshot()
+        self.assertEqual(snapshot['calls'], {'fase': 3})
+        self.assertEqual(snapshot['counters'], {'campioni': 10})
+        self.assertGreaterEqual(snapshot['seconds']['fase'], 0)
+
+    def test_since_reports_only_new_activity(self):
+        timer = StageTimer()
+        with timer.stage('prima'):
+            pass
+        snapshot = timer.snapshot()
+        with timer.stage('dopo'):
+            pass
+        timer.count('campioni', 2)
+        breakdown = timer.since(snapshot)
+        self.assertEqual(set(breakdown['seconds']), {'dopo'})
+        self.assertEqual(breakdown['calls'], {'dopo': 1})
+        self.assertEqual(breakdown['counters'], {'campioni': 2})
+
+    def test_stage_recorded_when_exception_raised(self):
+        timer = StageTimer()
+        with self.assertRaises(ValueError):
+            with timer.stage('errore'):
+                raise ValueError()
+        self.assertEqual(timer.calls['errore'], 1)
+
+    def test_timed_decorator_is_thread_safe(self):
+        snapshot = TIMER.snapshot()
+
+        @timed('test.thread')
+        def work():
+            return 1
+
+        threads = [threading.Thread(target=lambda: [work() for _ in range(200)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(TIMER.since(snapshot)['calls']['test.thread'], 800)
+
+    def test_handler_saves_timing_breakdown(self):
+        snapshot = TIMER.snapshot()
+        with TIMER.stage('test.handler'):
+            pass
+        with tempfile.TemporaryDirectory() as output_dir, contextlib.redirect_stdout(io.StringIO()):
+            handler = HoldoutResultsHandler(metrics={'accuracy': 1.0}, y_true=[0, 1], y_pred=[0, 1],
+                                            y_pred_proba=[0.0, 1.0], filename_prefix='holdout_test',
+                                            output_dir=output_dir, plots=False, timer_snapshot=snapshot)
+            handler.save_results()
+            with open(os.path.join(output_dir, 'holdout_test_timings.csv')) as f:
+                rows = {row['stage']: row for row in csv.DictReader(f)}
+        self.assertEqual(rows['test.handler']['calls'], '1')
+        self.assertIn('results.csv', rows)
+
+    def test_run_profiled_writes_sorted_stats(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            result, stats_path = run_profiled(sorted, [3, 1, 2], output_dir=output_dir)
+            self.assertEqual(result, [1, 2, 3])
+            with open(stats_path) as f:
+                self.assertIn("Ordered by: cumulative time", f.read())
+            self.assertTrue(os.path.exists(stats_path[:-len('.txt')] + '.prof'))
+
+
+if __name__ == '__main__':
+    unittest.main()
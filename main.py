@@ -1,12 +1,31 @@
+import argparse
 import os
+import sys
 import pandas as pd
 import time
 
+from ModelDevelopment.knn_scratch import KNN
 from ModelEvaluation.holdout_validation import holdout_validation
 from ModelEvaluation.cross_validation import kfold_validation, find_optimal_k
 from ModelEvaluation.stratified_shuffle_split_validation import stratified_shuffle_split_validation
+from ModelEvaluation.optimal_k_cache import OptimalKCache
+from ModelEvaluation.results_store import SQLiteResultsStore
+from ModelDevelopment.prototype_selection import PROTOTYPE_METHODS
+from ModelServing import batch_predict
+from Monitoring.memory import enable_memory_profiling
+from Monitoring.timing import TIMER, run_profiled
+from Preprocessing.binary_dataset import BINARY_SUFFIX
 from Preprocessing.feature_target_variables import load_data
-from Preprocessing.data_cleaner import clean_data
+from Preprocessing.data_cleaner import clean_data, imputer_path
+from Preprocessing.imputer import MeanImputer
+from Preprocessing.scaling import SCALING_METHODS
+
+# Codici di uscita della modalità non interattiva (per script e scheduler)
+EXIT_OK = 0
+EXIT_FAILURE = 1        # errore durante la validazione o il salvataggio
+EXIT_USAGE = 2          # argomenti non validi (codice standard di argparse)
+EXIT_DATA_ERROR = 3     # dataset mancante, illeggibile o non valido
+EXIT_INTERRUPTED = 130  # interruzione con Ctrl+C
 
 def clear_screen():
     """
@@ -14,7 +33,64 @@ def clear_screen():
     """
     print("\n" * 100)
 
-def run_holdout_validation(X, Y, k):
+def ask_knn_options():
+    """Chiede le opzioni facoltative del modello KNN (invio per non usarle)."""
+    knn_options = {}
+    while True:
+        try:
+            pca_str = input("Riduzione PCA: quota di varianza da mantenere (es. 0.95, invio per nessuna): ").strip()
+            if pca_str:
+                pca = float(pca_str)
+                if not 0 < pca <= 1:
+                    raise ValueError("La quota di varianza deve essere compresa tra 0 (escluso) e 1.")
+                knn_options['pca'] = pca
+            break
+        except ValueError as e:
+            print(f"Input non valido: {e}. Riprova.")
+            time.sleep(1)
+    while True:
+        scaling = input("Scalatura delle feature (standard/minmax, invio per nessuna): ").strip().lower()
+        if not scaling:
+            break
+        if scaling in SCALING_METHODS:
+            knn_options['scaling'] = scaling
+            break
+        print(f"Input non valido: usare uno tra {', '.join(SCALING_METHODS)}. Riprova.")
+        time.sleep(1)
+    while True:
+        prototypes = input("Selezione dei prototipi (enn/cnn/enn_cnn, invio per nessuna): ").strip().lower()
+        if not prototypes:
+            break
+        if prototypes in PROTOTYPE_METHODS:
+            knn_options['prototypes'] = prototypes
+            break
+        print(f"Input non valido: usare uno tra {', '.join(PROTOTYPE_METHODS)}. Riprova.")
+        time.sleep(1)
+    while True:
+        try:
+            tables_str = input("Ricerca approssimata LSH: numero di tabelle (es. 16, invio per ricerca esatta): ").strip()
+            if tables_str:
+                lsh_tables = int(tables_str)
+                lsh_bits = int(input("Bit per tabella (più bit = più veloce, recall minore; es. 24): ").strip())
+                if lsh_tables < 1 or not 1 <= lsh_bits <= 62:
+                    raise ValueError("servono almeno 1 tabella e da 1 a 62 bit per tabella.")
+                knn_options['lsh_tables'] = lsh_tables
+                knn_options['lsh_bits'] = lsh_bits
+            break
+        except ValueError as e:
+            print(f"Input non valido: {e}. Riprova.")
+            time.sleep(1)
+    return knn_options
+
+def check_k(k, train_size, where="nel training set"):
+    """Verifica che k sia minore della dimensione del training set; altrimenti stampa l'errore e restituisce False."""
+    if k >= train_size:
+        print(f"Errore: Il numero di vicini (k={k}) non può essere >= alla dimensione del training set "
+              f"{where} ({train_size}).")
+        return False
+    return True
+
+def run_holdout_validation(X, Y, k, plots=True, results_store=None, knn_options=None):
     """Esegue la validazione Holdout, richiedendo l'input finché non è valido."""
     while True:
         try:
@@ -27,14 +103,12 @@ def run_holdout_validation(X, Y, k):
             print(f"Input non valido: {e}. Riprova.")
             time.sleep(2)
 
-    train_size = int(len(X) * (1 - test_perc))
-    if k >= train_size:
-        print(f"Errore: Il numero di vicini (k={k}) non può essere >= alla dimensione del training set ({train_size}).")
+    if not check_k(k, int(len(X) * (1 - test_perc)), "dell'holdout"):
         return
 
-    holdout_validation(X, Y, k, test_perc)
+    holdout_validation(X, Y, k, test_perc, plots=plots, results_store=results_store, knn_options=knn_options)
 
-def run_kfold_validation(X, Y, k):
+def run_kfold_validation(X, Y, k, plots=True, results_store=None, knn_options=None):
     while True:
         try:
             K_folds_str = input("Inserisci il numero di fold (K) per la Cross Validation: ")
@@ -47,15 +121,12 @@ def run_kfold_validation(X, Y, k):
             time.sleep(2)
 
     # controllo se k= numero di vicini consultati dal KNN è minore della dimensione del training set in ogni fold
-    train_size_per_fold = int(len(X) * (1 - 1/K_folds))
-    if k >= train_size_per_fold:
-        print(f"Errore: Il numero di vicini (k={k}) non può essere >="
-              f" alla dimensione del training set in ogni fold ({train_size_per_fold}).")
+    if not check_k(k, int(len(X) * (1 - 1/K_folds)), "in ogni fold"):
         return
 
-    kfold_validation(X, Y, k, K_folds)
+    kfold_validation(X, Y, k, K_folds, plots=plots, results_store=results_store, knn_options=knn_options)
 
-def run_stratified_shuffle_split_validation(X, Y, k):
+def run_stratified_shuffle_split_validation(X, Y, k, plots=True, results_store=None, knn_options=None):
     while True:
         try:
             n_experiments = input("Inserisci il numero di Esperimenti per la Stratified shuffle split Validation: ")
@@ -68,12 +139,10 @@ def run_stratified_shuffle_split_validation(X, Y, k):
             time.sleep(2)
     # controllo se k= numero di vicini consultati dal KNN è minore della dimensione del training set in ogni esperimento
     # la proporzione di test è fissa al 20%
-    train_size_per_experiment = int(len(X) * (1 - 0.2))
-    if k >= train_size_per_experiment:
-        print(f"Errore: Il numero di vicini (k={k}) non può essere >="
-              f" alla dimensione del training set in ogni esperimento ({train_size_per_experiment}).")
+    if not check_k(k, int(len(X) * (1 - 0.2)), "in ogni esperimento"):
         return
-    stratified_shuffle_split_validation(X, Y, k, n_experiments)
+    stratified_shuffle_split_validation(X, Y, k, n_experiments, plots=plots, results_store=results_store,
+                                        knn_options=knn_options)
 
 
 def main():
@@ -104,7 +173,7 @@ def main():
 
     # load_data ora gestisce il loop di richiesta file internamente se cleaned_path è None
     try:
-        X, Y = load_data(cleaned_path)
+        dataset = load_data(cleaned_path)
     except KeyboardInterrupt:
         print("\nOperazione annullata dall'utente.")
         return
@@ -112,7 +181,12 @@ def main():
         print(f"\nERRORE IRRECUPERABILE: {e}")
         return
 
-    print(f"Dataset caricato: {len(X)} campioni con {len(X.columns)} feature.")
+    print(f"Dataset caricato: {len(dataset)} campioni con {dataset.n_features} feature.")
+
+    # Tutte le esecuzioni vengono registrate anche nel database SQLite dei risultati
+    results_store = SQLiteResultsStore()
+    # La ricerca del k ottimale viene memorizzata: stesso dataset e opzioni -> nessun ricalcolo
+    optimal_k_cache = OptimalKCache()
     time.sleep(2)
     input("\nPremi Invio per continuare al menu principale...")
 
@@ -145,13 +219,16 @@ def main():
             print("Uscita dal programma. Arrivederci!")
             break
 
+        # Opzioni del modello KNN, usate sia nella ricerca di k sia nella validazione
+        knn_options = ask_knn_options()
+
         while True:
             try:
                 # sara chiesto il numero di vicini k per KNN in ogni caso, posso usare lo stesso input
                 print("\nConfigurazione KNN:")
                 print("="*50)
                 print("Ricerca del valore k ottimale in corso...")
-                optimal_k = find_optimal_k(X, Y)
+                optimal_k = find_optimal_k(dataset, dataset.y, knn_options=knn_options, cache=optimal_k_cache)
                 print(f"Il valore suggerito per k (basato su Error Rate) è: {optimal_k}")
                 
                 k_neighbors_str = input(f"Inserisci il numero di vicini (k) per KNN (invio per usare {optimal_k}): ").strip()
@@ -168,12 +245,15 @@ def main():
                 print(f"Input non valido: {e}. Riprova.")
                 time.sleep(1)
 
+        # In modalità solo metriche non vengono generati grafici (e matplotlib non viene importato)
+        plots = input("Vuoi generare anche i grafici? (s/n, invio per sì): ").strip().lower() != 'n'
+
         if choice == 1:
-            run_holdout_validation(X, Y, k_neighbors)
+            run_holdout_validation(dataset, dataset.y, k_neighbors, plots, results_store, knn_options)
         elif choice == 2:
-            run_kfold_validation(X, Y, k_neighbors)
+            run_kfold_validation(dataset, dataset.y, k_neighbors, plots, results_store, knn_options)
         elif choice == 3:
-            run_stratified_shuffle_split_validation(X, Y, k_neighbors)
+            run_stratified_shuffle_split_validation(dataset, dataset.y, k_neighbors, plots, results_store, knn_options)
 
         another_run = input("\nVuoi eseguire un'altra operazione? (s/n): ").lower()
 
@@ -182,5 +262,167 @@ def main():
             print("Uscita dal programma. Arrivederci!")
             break
 
+def build_parser():
+    """Argomenti della modalità non interattiva (python main.py --data ... --method ...)."""
+    def positive_int(value):
+        number = int(value)
+        if number < 1:
+            raise argparse.ArgumentTypeError(f"atteso un intero positivo, ricevuto {value}")
+        return number
+
+    parser = argparse.ArgumentParser(
+        prog='main.py',
+        description="Esegue senza prompt la pipeline di classificazione k-NN: pulizia, caricamento, "
+                    "ricerca di k (se non indicato) e validazione.",
+        epilog="Senza argomenti il programma parte in modalità interattiva. "
+               "'python main.py predict ...' classifica un CSV con un modello salvato. "
+               f"Codici di uscita: {EXIT_OK} successo, {EXIT_FAILURE} errore nella validazione, "
+               f"{EXIT_USAGE} argomenti non validi, {EXIT_DATA_ERROR} dataset non valido, "
+               f"{EXIT_INTERRUPTED} interrotto.")
+    parser.add_argument('--data', required=True,
+                        help=f"CSV grezzo da pulire, oppure dataset già pulito (_cleaned.csv o {BINARY_SUFFIX})")
+    parser.add_argument('--method', required=True, choices=['holdout', 'kfold', 'sss'],
+                        help="Metodo di validazione: holdout, K-Fold o Stratified Shuffle Split")
+    parser.add_argument('--k', type=positive_int, help="Numero di vicini (default: k ottimale da cross validation)")
+    parser.add_argument('--test-size', type=float, default=0.2, help="Quota del test set per l'holdout")
+    parser.add_argument('--folds', type=int, default=5, help="Numero di fold per la K-Fold")
+    parser.add_argument('--experiments', type=int, default=10, help="Numero di esperimenti dello Stratified Shuffle Split")
+    parser.add_argument('--no-plots', action='store_true', help="Salva solo le metriche, senza grafici")
+    parser.add_argument('--no-k-cache', action='store_true',
+                        help="Ricalcola la ricerca del k ottimale senza usare i punteggi memorizzati")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="Fold/esperimenti valutati in parallelo (0 o negativo: tutti i core)")
+    parser.add_argument('--pca', type=float, help="Riduzione PCA: quota di varianza da mantenere")
+    parser.add_argument('--scaling', choices=SCALING_METHODS, help="Scalatura delle feature")
+    parser.add_argument('--prototypes', choices=PROTOTYPE_METHODS, help="Selezione dei prototipi")
+    parser.add_argument('--lsh-tables', type=positive_int, help="Ricerca approssimata LSH: numero di tabelle")
+    parser.add_argument('--lsh-bits', type=int, default=24, help="Bit per tabella LSH")
+    parser.add_argument('--save-model', metavar='CARTELLA',
+                        help="Addestra il modello sull'intero dataset e lo salva (vedi KNN.save)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Esegue la pipeline sotto cProfile e salva le statistiche ordinate in output/")
+    parser.add_argument('--memory-profile', action='store_true',
+                        help="Registra picchi e allocazioni di memoria per fase (tracemalloc) e li salva con i risultati")
+    parser.add_argument('--checkpoint-dir', default=os.path.join('output', 'checkpoints'), metavar='CARTELLA',
+                        help="Cartella del journal in cui K-Fold e Stratified Shuffle Split registrano ogni "
+                             "fold/esperimento completato")
+    parser.add_argument('--resume', action='store_true',
+                        help="Riprende una K-Fold o uno Stratified Shuffle Split interrotto con gli stessi dati e "
+                             "parametri, saltando i fold/esperimenti già completati")
+    return parser
+
+def parse_args(argv):
+    """Legge e valida gli argomenti; con argomenti non validi termina con il codice EXIT_USAGE."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not 0 < args.test_size < 1:
+        parser.error("--test-size deve essere compreso tra 0 e 1 (esclusi).")
+    if args.folds <= 1:
+        parser.error("--folds deve essere maggiore di 1.")
+    if args.experiments <= 1:
+        parser.error("--experiments deve essere maggiore di 1.")
+    if args.pca is not None and not 0 < args.pca <= 1:
+        parser.error("--pca deve essere compreso tra 0 (escluso) e 1.")
+    if not 1 <= args.lsh_bits <= 62:
+        parser.error("--lsh-bits deve essere compreso tra 1 e 62.")
+    return args
+
+def knn_options_from_args(args):
+    """Opzioni del modello KNN indicate sulla riga di comando (come quelle di ask_knn_options)."""
+    knn_options = {name: getattr(args, name) for name in ('pca', 'scaling', 'prototypes')
+                   if getattr(args, name) is not None}
+    if args.lsh_tables is not None:
+        knn_options['lsh_tables'] = args.lsh_tables
+        knn_options['lsh_bits'] = args.lsh_bits
+    return knn_options
+
+def run_batch(args):
+    """Esegue la pipeline completa senza prompt né pause; restituisce il codice di uscita."""
+    pd.set_option('display.max_rows', None)
+    pd.set_option('display.max_columns', None)
+
+    # Dataset: i file già puliti vengono caricati direttamente, gli altri prima puliti
+    try:
+        data_path = args.data
+        if not data_path.endswith(('_cleaned.csv', BINARY_SUFFIX)):
+            data_path = clean_data(data_path, interactive=False)
+            if data_path is None:
+                return EXIT_DATA_ERROR
+        dataset = load_data(data_path, interactive=False)
+    except (OSError, ValueError, KeyError, pd.errors.ParserError) as e:
+        print(f"\nERRORE nel caricamento del dataset '{args.data}': {e}", file=sys.stderr)
+        return EXIT_DATA_ERROR
+    print(f"Dataset caricato: {len(dataset)} campioni con {dataset.n_features} feature.")
+
+    knn_options = knn_options_from_args(args)
+    plots = not args.no_plots
+    try:
+        k = args.k if args.k is not None else find_optimal_k(
+            dataset, dataset.y, knn_options=knn_options, n_jobs=args.jobs,
+            cache=None if args.no_k_cache else OptimalKCache())
+        results_store = SQLiteResultsStore()
+        if args.method == 'holdout':
+            if not check_k(k, int(len(dataset) * (1 - args.test_size)), "dell'holdout"):
+                return EXIT_USAGE
+            holdout_validation(dataset, dataset.y, k, args.test_size, plots=plots, results_store=results_store,
+                               knn_options=knn_options)
+        elif args.method == 'kfold':
+            if not check_k(k, int(len(dataset) * (1 - 1 / args.folds)), "in ogni fold"):
+                return EXIT_USAGE
+            kfold_validation(dataset, dataset.y, k, args.folds, plots=plots, results_store=results_store,
+                             knn_options=knn_options, n_jobs=args.jobs, checkpoint_dir=args.checkpoint_dir,
+                             resume=args.resume)
+        else:
+            if not check_k(k, int(len(dataset) * (1 - 0.2)), "in ogni esperimento"):
+                return EXIT_USAGE
+            stratified_shuffle_split_validation(dataset, dataset.y, k, args.experiments, plots=plots,
+                                                results_store=results_store, knn_options=knn_options,
+                                                n_jobs=args.jobs, checkpoint_dir=args.checkpoint_dir,
+                                                resume=args.resume)
+
+        if args.save_model:
+            model = KNN(dataset, None, k, **knn_options)
+            imputer_file = imputer_path(data_path)
+            imputer = MeanImputer.load(imputer_file) if os.path.exists(imputer_file) else None
+            model.save(args.save_model, imputer=imputer)
+            print(f"Modello (k={k}) salvato in '{args.save_model}'.")
+    except Exception as e:
+        print(f"\nERRORE durante l'esecuzione: {e}", file=sys.stderr)
+        return EXIT_FAILURE
+    print(f"\nTempi per fase:\n{TIMER.report()}")
+    return EXIT_OK
+
+def cli(argv=None):
+    """
+    Punto di ingresso: senza argomenti menu interattivo, 'predict ...' classificazione di un CSV
+    con un modello salvato (vedi ModelServing.batch_predict), altrimenti modalità non interattiva.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    try:
+        if not argv:
+            main()
+            return EXIT_OK
+        if argv[0] == 'predict':
+            try:
+                return batch_predict.main(argv[1:])
+            except (OSError, ValueError, KeyError, pd.errors.ParserError) as e:
+                # Cartella del modello o CSV da classificare mancanti, illeggibili o non validi
+                print(f"\nERRORE nella classificazione: {e}", file=sys.stderr)
+                return EXIT_DATA_ERROR
+        args = parse_args(argv)
+        if args.memory_profile:
+            if args.jobs != 1:
+                print("Profilazione della memoria: fold ed esperimenti eseguiti in sequenza (--jobs 1).")
+                args.jobs = 1
+            enable_memory_profiling()
+        if not args.profile:
+            return run_batch(args)
+        exit_code, stats_path = run_profiled(run_batch, args, name='profile')
+        print(f"Statistiche di cProfile salvate in '{stats_path}' (e nel file .prof accanto).")
+        return exit_code
+    except KeyboardInterrupt:
+        print("\nOperazione annullata dall'utente.", file=sys.stderr)
+        return EXIT_INTERRUPTED
+
 if __name__ == "__main__":
-    main()
+    sys.exit(cli())